@@ -0,0 +1,105 @@
+"""
+In-memory TTL cache for upstream Metrolinx responses
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    size: int
+    expires_at: float
+    # Upstream validators for conditional revalidation once the entry has expired
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class ResponseCache:
+    """LRU cache with per-entry TTL and a cap on the total cached body size.
+
+    Sizes are the upstream response body length in bytes, which is a close
+    proxy for the memory held by the decoded JSON.
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int = 10_000):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def peek(self, key: Hashable) -> Optional[CacheEntry]:
+        """Entry for key even if it has expired, without counting a hit or miss"""
+        return self._entries.get(key)
+
+    def set(self, key: Hashable, value: Any, size: int, ttl: float, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = CacheEntry(value=value, size=size, expires_at=time.monotonic() + ttl, etag=etag, last_modified=last_modified)
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes or len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        self._remove(key)
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry.size
+
+
+class TransformMemo:
+    """Remembers the last transformed result for each (transformer, args).
+
+    A result is reused only while the raw input is the very same object,
+    i.e. while it is still being served from the response cache.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[Any, Any]]" = OrderedDict()
+
+    def apply(self, raw: Any, fn: Callable, *args: Any) -> Any:
+        key = (fn, args)
+        cached = self._entries.get(key)
+        if cached is not None and cached[0] is raw:
+            self._entries.move_to_end(key)
+            return cached[1]
+        result = fn(raw, *args)
+        self._entries[key] = (raw, result)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return result
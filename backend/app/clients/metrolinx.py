@@ -1,24 +1,454 @@
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import time
 import httpx
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import date
-from typing import Optional
-from app.config import METROLINX_API_KEY
+from time import perf_counter
+from typing import Any, Callable, Optional
+from urllib.parse import urlencode
+from app.clients.cache import CacheEntry, ResponseCache, TransformMemo
+from app.clients.persistent import PersistentCache
+from app.clients.ratelimit import Priority, QueueTimeout, RateLimiter
+from app.clients.resilience import CircuitBreaker, LatencyWindow
+from app.clients.singleflight import SingleFlight
+from app.config import (
+    METROLINX_API_KEY,
+    METROLINX_BASE_URL,
+    UPSTREAM_TIMEOUT,
+    UPSTREAM_CONNECT_TIMEOUT,
+    UPSTREAM_MAX_CONNECTIONS,
+    UPSTREAM_MAX_KEEPALIVE,
+    UPSTREAM_KEEPALIVE_EXPIRY,
+    UPSTREAM_HTTP2,
+    UPSTREAM_RATE_LIMIT,
+    UPSTREAM_RATE_BURST,
+    UPSTREAM_QUEUE_TIMEOUT,
+    UPSTREAM_BACKGROUND_QUEUE_TIMEOUT,
+    UPSTREAM_RATE_LIMITED_PAUSE,
+    UPSTREAM_HEDGE,
+    UPSTREAM_HEDGE_PERCENTILE,
+    UPSTREAM_HEDGE_MIN_DELAY,
+    UPSTREAM_RETRIES,
+    UPSTREAM_RETRY_BACKOFF,
+    UPSTREAM_BREAKER_THRESHOLD,
+    UPSTREAM_BREAKER_COOLDOWN,
+    CACHE_MAX_BYTES,
+    CACHE_TTL_REFERENCE,
+    CACHE_TTL_SERVICE_UPDATE,
+    CACHE_TTL_NEXT_SERVICE,
+    CACHE_TTL_GTFS_REALTIME,
+    PERSISTENT_CACHE_PATH,
+    PERSISTENT_CACHE_TTL,
+)
+from app.metrics import Metrics, phase
+from app.responses import memoized
+
+try:
+    from google.transit import gtfs_realtime_pb2
+except ImportError:
+    gtfs_realtime_pb2 = None
+
+BASE_URL = METROLINX_BASE_URL
+
+logger = logging.getLogger(__name__)
+
+# Endpoint prefix -> cache TTL in seconds; first match wins, unlisted endpoints are not cached
+CACHE_TTLS = [
+    ("Stop/NextService/", CACHE_TTL_NEXT_SERVICE),
+    ("Stop/All", CACHE_TTL_REFERENCE),
+    ("Stop/Details/", CACHE_TTL_REFERENCE),
+    ("Schedule/Line/All/", CACHE_TTL_REFERENCE),
+    ("ServiceUpdate/", CACHE_TTL_SERVICE_UPDATE),
+    ("ServiceataGlance/", CACHE_TTL_SERVICE_UPDATE),
+    ("Gtfs/Feed/", CACHE_TTL_GTFS_REALTIME),
+]
+
+# Endpoint prefixes of reference data kept in the on-disk cache when one is configured
+PERSISTENT_ENDPOINTS = (
+    "Stop/All",
+    "Stop/Details/",
+    "Schedule/Line/All/",
+    "Schedule/Line/Stop/",
+    "Schedule/Trip/",
+)
+
+# Endpoint prefix -> client method, used to label upstream metrics; first match wins
+ENDPOINT_METHODS = [
+    ("Stop/All", "get_stops_all"),
+    ("Stop/NextService/", "get_stop_next_service"),
+    ("Stop/Details/", "get_stop_details"),
+    ("Schedule/Journey/", "get_journey"),
+    ("Schedule/Line/All/", "get_lines_all"),
+    ("Schedule/Line/Stop/", "get_line_stops"),
+    ("Schedule/Line/", "get_line_schedule"),
+    ("Schedule/Trip/", "get_trip_schedule"),
+    ("Fares/", "get_fares"),
+    ("ServiceUpdate/ServiceAlert/", "get_service_alerts"),
+    ("ServiceUpdate/InformationAlert/", "get_information_alerts"),
+    ("ServiceUpdate/UnionDepartures/", "get_union_departures"),
+    ("ServiceUpdate/Exceptions/Train", "get_exceptions_train"),
+    ("ServiceUpdate/Exceptions/Bus", "get_exceptions_bus"),
+    ("ServiceUpdate/Exceptions/All", "get_exceptions_all"),
+    ("ServiceataGlance/Buses/", "get_service_buses"),
+    ("ServiceataGlance/Trains/", "get_service_trains"),
+    ("ServiceataGlance/UPX/", "get_service_upx"),
+    ("Gtfs/Feed/Alerts", "get_gtfs_alerts"),
+    ("Gtfs/Feed/TripUpdates", "get_gtfs_trip_updates"),
+    ("Gtfs/Feed/VehiclePosition", "get_gtfs_vehicle_positions"),
+]
+
+# Endpoint prefix -> rate limiter priority of user-facing calls; unlisted endpoints are NORMAL
+ENDPOINT_PRIORITIES = [
+    ("Schedule/Journey/", Priority.INTERACTIVE),
+    ("Stop/NextService/", Priority.INTERACTIVE),
+    ("Fares/", Priority.INTERACTIVE),
+]
+
+# Set by background refreshers that must see upstream, not the response cache
+_bypass_cache: ContextVar[bool] = ContextVar("bypass_cache", default=False)
+# Set by background jobs to queue behind user-facing calls, overriding ENDPOINT_PRIORITIES
+_priority: ContextVar[Optional[Priority]] = ContextVar("upstream_priority", default=None)
+
+
+class UpstreamUnavailable(httpx.HTTPStatusError):
+    """A call we did not send upstream; carries a synthetic response so routes map its status as usual"""
+
+    def __init__(self, message: str, endpoint: str, status_code: int):
+        request = httpx.Request("GET", f"{BASE_URL}/{endpoint}")
+        super().__init__(message, request=request, response=httpx.Response(status_code, request=request))
+
+
+def cache_ttl(endpoint: str) -> float:
+    for prefix, ttl in CACHE_TTLS:
+        if endpoint.startswith(prefix):
+            return ttl
+    return 0
+
+
+def _store_key(endpoint: str, params: tuple) -> Optional[str]:
+    """On-disk cache key, or None for endpoints that are not persisted"""
+    if not endpoint.startswith(PERSISTENT_ENDPOINTS):
+        return None
+    return f"{endpoint}?{urlencode(params)}" if params else endpoint
+
+
+def endpoint_priority(endpoint: str) -> Priority:
+    for prefix, priority in ENDPOINT_PRIORITIES:
+        if endpoint.startswith(prefix):
+            return priority
+    return Priority.NORMAL
+
+
+def _retry_after(response: httpx.Response) -> float:
+    try:
+        return max(0.0, float(response.headers.get("retry-after", "")))
+    except ValueError:
+        return UPSTREAM_RATE_LIMITED_PAUSE
+
+
+def _retryable(error: Exception) -> bool:
+    """Connection failures are retried; a read that already timed out is not worth repeating"""
+    if isinstance(error, httpx.TimeoutException):
+        return isinstance(error, (httpx.ConnectTimeout, httpx.PoolTimeout))
+    return isinstance(error, httpx.TransportError)
+
+
+def _upstream_failure(error: Exception) -> bool:
+    """Errors that say nothing about the data, so stale cached data may stand in"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return isinstance(error, httpx.TransportError)
+
+
+def endpoint_method(endpoint: str) -> str:
+    for prefix, method in ENDPOINT_METHODS:
+        if endpoint.startswith(prefix):
+            return method
+    return "other"
+
+
+def decode_body(content: bytes, content_type: str) -> Any:
+    """JSON body, or a GTFS-realtime FeedMessage when upstream answers with protobuf"""
+    if "protobuf" in content_type or "octet-stream" in content_type:
+        if gtfs_realtime_pb2 is None:
+            raise RuntimeError("Upstream sent a protobuf feed; install 'gtfs-realtime-bindings' to decode it")
+        return gtfs_realtime_pb2.FeedMessage.FromString(content)
+    return json.loads(content)
+
+
+def _decode(response: httpx.Response) -> Any:
+    return decode_body(response.content, response.headers.get("content-type", ""))
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
 
-BASE_URL = "https://api.openmetrolinx.com/OpenDataAPI/api/V1"
 
 class MetrolinxClient:
-    def __init__(self):
-        self.timeout = 10
-    
+    def __init__(self, http: Optional[httpx.AsyncClient] = None, cache: Optional[ResponseCache] = None, metrics: Optional[Metrics] = None,
+                 store: Optional[PersistentCache] = None):
+        self.timeout = UPSTREAM_TIMEOUT
+        self._http = http
+        self._owns_http = http is None
+        self.cache = cache if cache is not None else ResponseCache(CACHE_MAX_BYTES)
+        self.metrics = metrics if metrics is not None else Metrics()
+        if store is None and PERSISTENT_CACHE_PATH:
+            store = PersistentCache(PERSISTENT_CACHE_PATH, PERSISTENT_CACHE_TTL)
+        self.store = store
+        self._memo = TransformMemo()
+        self._flights = SingleFlight()
+        self.limiter = RateLimiter(UPSTREAM_RATE_LIMIT, UPSTREAM_RATE_BURST, {
+            Priority.INTERACTIVE: UPSTREAM_QUEUE_TIMEOUT,
+            Priority.NORMAL: UPSTREAM_QUEUE_TIMEOUT,
+            Priority.BACKGROUND: UPSTREAM_BACKGROUND_QUEUE_TIMEOUT,
+        })
+        self._latency = defaultdict(LatencyWindow)
+        self._breakers = defaultdict(lambda: CircuitBreaker(UPSTREAM_BREAKER_THRESHOLD, UPSTREAM_BREAKER_COOLDOWN))
+        self.hedges = 0
+        self.retries = 0
+        self.stale_served = 0
+
+    async def start(self):
+        """Open the pooled upstream connection and the on-disk cache (called from the app lifespan)"""
+        if self.store is not None:
+            try:
+                await asyncio.to_thread(self.store.open)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning("Persistent cache at %s unavailable, continuing without it: %s", self.store.path, e)
+                self.store = None
+        if self._http is not None:
+            return
+        http2 = UPSTREAM_HTTP2
+        if http2 and not _http2_available():
+            logger.warning("UPSTREAM_HTTP2 is set but the 'h2' package is not installed; using HTTP/1.1")
+            http2 = False
+        self._http = httpx.AsyncClient(
+            base_url=BASE_URL,
+            timeout=httpx.Timeout(self.timeout, connect=UPSTREAM_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=UPSTREAM_MAX_CONNECTIONS,
+                max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE,
+                keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+            ),
+            http2=http2,
+            verify=False,
+        )
+        self._owns_http = True
+
+    async def close(self):
+        """Close the pooled upstream connection and the on-disk cache"""
+        if self.store is not None:
+            await asyncio.to_thread(self.store.close)
+        if self._http is not None and self._owns_http:
+            await self._http.aclose()
+        self._http = None
+
     async def _get(self, endpoint: str, params: Optional[dict] = None):
         """Helper method for GET requests"""
-        if params is None:
-            params = {}
+        if self._http is None:
+            raise RuntimeError("MetrolinxClient used before start()")
+        params = dict(params or {})
+        ttl = cache_ttl(endpoint)
+        cache_key = (endpoint, tuple(sorted(params.items())))
+        if ttl > 0 and not _bypass_cache.get():
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        # Concurrent callers for the same endpoint and params share one upstream call
+        with phase("upstream"):
+            return await self._flights.do(cache_key, lambda: self._fetch(endpoint, params, cache_key, ttl))
+
+    async def _fetch(self, endpoint: str, params: dict, cache_key: tuple, ttl: float):
         params["key"] = METROLINX_API_KEY
-        
-        async with httpx.AsyncClient(timeout=self.timeout, verify=False) as client:
-            response = await client.get(f"{BASE_URL}/{endpoint}", params=params)
-            response.raise_for_status()
-            return response.json()
+        stale = self.cache.peek(cache_key) if ttl > 0 else None
+        store_key = _store_key(*cache_key) if self.store is not None else None
+        if store_key is not None:
+            stored = await self._load_stored(store_key)
+            if stored is not None:
+                # Written by this or another worker, possibly before a restart
+                remaining = stored.expires_at - time.time()
+                if remaining > 0 and not _bypass_cache.get():
+                    self.cache.set(cache_key, stored.value, stored.size, min(ttl, remaining), stored.etag, stored.last_modified)
+                    return stored.value
+                if stale is None:
+                    stale = stored
+        # Revalidate an expired entry instead of downloading it again when upstream gave validators
+        headers = {}
+        if stale is not None and stale.etag:
+            headers["If-None-Match"] = stale.etag
+        if stale is not None and stale.last_modified:
+            headers["If-Modified-Since"] = stale.last_modified
+
+        try:
+            response = await self._call(endpoint, params, headers)
+            if response.status_code != 304:
+                response.raise_for_status()
+        except httpx.HTTPError as e:
+            if stale is None or not _upstream_failure(e):
+                raise
+            # Expired data beats an error while upstream is failing
+            self.stale_served += 1
+            logger.info("Serving stale %s after upstream failure: %s", endpoint, e)
+            return stale.value
+
+        if response.status_code == 304 and stale is not None:
+            # Same object as before, so memoized transforms and rendered ETags still apply
+            self.cache.set(cache_key, stale.value, stale.size, ttl, stale.etag, stale.last_modified)
+            if store_key is not None:
+                await self._save_stored(self.store.touch, store_key)
+            return stale.value
+        data = _decode(response)
+        etag, last_modified = response.headers.get("etag"), response.headers.get("last-modified")
+        if ttl > 0:
+            self.cache.set(cache_key, data, len(response.content), ttl, etag, last_modified)
+        if store_key is not None:
+            await self._save_stored(self.store.set, store_key, response.content, etag, last_modified)
+        return data
+
+    async def _load_stored(self, store_key: str) -> Optional[CacheEntry]:
+        """On-disk entry as a cache entry with wall-clock expiry; disk errors count as a miss"""
+        try:
+            stored = await asyncio.to_thread(self.store.get, store_key)
+            if stored is None:
+                return None
+            value = json.loads(stored.body)
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning("Reading %s from the persistent cache failed: %s", store_key, e)
+            return None
+        return CacheEntry(value=value, size=len(stored.body), expires_at=stored.expires_at, etag=stored.etag, last_modified=stored.last_modified)
+
+    async def _save_stored(self, write: Callable, *args: Any):
+        try:
+            await asyncio.to_thread(write, *args)
+        except sqlite3.Error as e:
+            logger.warning("Writing %s to the persistent cache failed: %s", args[0], e)
+
+    async def _call(self, endpoint: str, params: dict, headers: dict) -> httpx.Response:
+        """Retries with jittered backoff behind the endpoint's circuit breaker"""
+        method = endpoint_method(endpoint)
+        breaker = self._breakers[method]
+        if not breaker.allow():
+            raise UpstreamUnavailable(f"Metrolinx {method} is failing; not retrying for up to {breaker.cooldown:g}s", endpoint, 503)
+        priority = _priority.get()
+        if priority is None:
+            priority = endpoint_priority(endpoint)
+
+        for attempt in range(UPSTREAM_RETRIES + 1):
+            last_attempt = attempt == UPSTREAM_RETRIES
+            try:
+                response = await self._hedged(endpoint, params, headers, method, priority)
+            except UpstreamUnavailable:
+                raise
+            except httpx.TransportError as e:
+                if last_attempt or not _retryable(e):
+                    breaker.record_failure()
+                    raise
+            else:
+                if response.status_code < 500:
+                    breaker.record_success()
+                    return response
+                if last_attempt:
+                    breaker.record_failure()
+                    return response
+            self.retries += 1
+            await asyncio.sleep(random.uniform(0, UPSTREAM_RETRY_BACKOFF * 2 ** attempt))
+
+    async def _hedged(self, endpoint: str, params: dict, headers: dict, method: str, priority: Priority) -> httpx.Response:
+        """Send a second request when the first is slower than the endpoint's usual p95; first good answer wins"""
+        latency = self._latency[method]
+        started = perf_counter()
+        tasks = {asyncio.ensure_future(self._attempt(endpoint, params, headers, method, priority))}
+        try:
+            delay = latency.percentile(UPSTREAM_HEDGE_PERCENTILE) if UPSTREAM_HEDGE else None
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=max(delay, UPSTREAM_HEDGE_MIN_DELAY))
+                # Hedges only spend spare rate limit tokens
+                if not done and self.limiter.try_acquire():
+                    self.hedges += 1
+                    tasks.add(asyncio.ensure_future(self._attempt(endpoint, params, headers, method, priority, acquired=True)))
+            finished = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    finished = task
+                    if task.exception() is None and task.result().status_code < 500:
+                        # Timed from the first request, so fast hedges do not drag the percentile down
+                        latency.observe(perf_counter() - started)
+                        return task.result()
+            return finished.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _attempt(self, endpoint: str, params: dict, headers: dict, method: str, priority: Priority, acquired: bool = False) -> httpx.Response:
+        if not acquired:
+            try:
+                await self.limiter.acquire(priority)
+            except QueueTimeout as e:
+                raise UpstreamUnavailable(str(e), endpoint, 503) from None
+
+        with self.metrics.upstream_call(method) as outcome:
+            response = await self._http.get(f"/{endpoint}", params=params, headers=headers)
+            outcome.append(str(response.status_code))
+        if response.status_code == 429:
+            # Our quota is shared, so every caller backs off, not just this one
+            self.limiter.pause(_retry_after(response))
+        return response
+
+    @contextmanager
+    def fresh(self):
+        """Within this block, calls skip cache lookups (results are still cached)"""
+        token = _bypass_cache.set(True)
+        try:
+            yield
+        finally:
+            _bypass_cache.reset(token)
+
+    @contextmanager
+    def priority(self, priority: Priority):
+        """Within this block, upstream calls queue for the rate limiter at the given priority"""
+        token = _priority.set(priority)
+        try:
+            yield
+        finally:
+            _priority.reset(token)
+
+    def flight_stats(self) -> dict:
+        return {
+            "calls": self._flights.calls,
+            "coalesced": self._flights.coalesced,
+            "in_flight": self._flights.in_flight(),
+        }
+
+    def resilience_stats(self) -> dict:
+        return {
+            "hedges": self.hedges,
+            "retries": self.retries,
+            "stale_served": self.stale_served,
+            "open_circuits": sorted(method for method, breaker in self._breakers.items() if breaker.state != CircuitBreaker.CLOSED),
+        }
+
+    def transform(self, raw: Any, fn: Callable, *args: Any) -> Any:
+        """Apply a transformer, reusing the previous result while raw is the same object.
+
+        Raw payloads are shared by cache hits and by coalesced concurrent calls,
+        so those callers also share a single transformed result.
+        """
+        started = perf_counter()
+        with phase("transform"):
+            result = self._memo.apply(raw, fn, *args)
+        self.metrics.observe_transform(getattr(fn, "__name__", "transform"), perf_counter() - started)
+        return memoized(result)
     
     # ========== Stop Methods ==========
     
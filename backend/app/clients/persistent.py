@@ -0,0 +1,124 @@
+"""
+On-disk cache of slow-changing upstream responses, shared by every worker on the host
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT NOT NULL,
+    service_date TEXT NOT NULL,
+    body BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (key, service_date)
+)
+"""
+
+
+@dataclass
+class StoredResponse:
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+    expires_at: float
+
+
+class PersistentCache:
+    """Raw upstream bodies in SQLite, keyed by endpoint (with params) and service date.
+
+    WAL mode lets the uvicorn workers of a host read concurrently while one
+    writes, so a restart or a new worker starts warm instead of refetching
+    reference data. Rows of past service dates are dropped on open; expired
+    rows of the current one remain usable for conditional revalidation and
+    as stale fallback. Expiry uses wall-clock time since rows outlive the
+    process that wrote them. Methods block, so callers on the event loop
+    run them in a thread.
+    """
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(_SCHEMA)
+        self._db = db
+        self.purge()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def get(self, key: str, service_date: Optional[str] = None) -> Optional[StoredResponse]:
+        """The stored response, expired or not; callers decide whether an expired one is still useful"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, etag, last_modified, stored_at, expires_at FROM responses WHERE key = ? AND service_date = ?",
+                (key, service_date or date.today().isoformat())
+            ).fetchone()
+        if row is None or row[4] <= time.time():
+            self.misses += 1
+        else:
+            self.hits += 1
+        return StoredResponse(*row) if row is not None else None
+
+    def set(self, key: str, body: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None, service_date: Optional[str] = None):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, service_date or date.today().isoformat(), body, etag, last_modified, now, now + self.ttl)
+            )
+        self.writes += 1
+
+    def touch(self, key: str, service_date: Optional[str] = None):
+        """Extend an entry that upstream confirmed is unchanged"""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE responses SET stored_at = ?, expires_at = ? WHERE key = ? AND service_date = ?",
+                (now, now + self.ttl, key, service_date or date.today().isoformat())
+            )
+
+    def invalidate(self, prefix: str = "") -> int:
+        """Drop entries whose key starts with prefix (all of them by default); returns how many"""
+        pattern = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        with self._lock:
+            return self._db.execute("DELETE FROM responses WHERE key LIKE ? ESCAPE '\\'", (pattern,)).rowcount
+
+    def purge(self) -> int:
+        """Drop entries of past service dates; today's expired ones stay for revalidation and fallback"""
+        with self._lock:
+            removed = self._db.execute("DELETE FROM responses WHERE service_date < ?", (date.today().isoformat(),)).rowcount
+        if removed:
+            logger.info("Purged %d entries from the persistent cache at %s", removed, self.path)
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM responses").fetchone()
+        return {"entries": entries, "bytes": size, "hits": self.hits, "misses": self.misses, "writes": self.writes}
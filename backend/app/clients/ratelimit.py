@@ -0,0 +1,124 @@
+"""
+Token-bucket rate limiting of upstream calls with priority queueing
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from enum import IntEnum
+from typing import Dict, List, Optional, Tuple
+
+
+class Priority(IntEnum):
+    """Lower values are served first"""
+    INTERACTIVE = 0
+    NORMAL = 1
+    BACKGROUND = 2
+
+
+class QueueTimeout(Exception):
+    """Raised when a call waited longer than allowed for a rate limit token"""
+
+
+class RateLimiter:
+    """Token bucket refilled at rate tokens per second, holding at most burst tokens.
+
+    Callers that find no token queue by priority (FIFO within a priority),
+    and a single timer hands out tokens as they accrue. A waiter that times
+    out is skipped. pause() empties the bucket for a while, e.g. after an
+    upstream 429, so every caller backs off together. A rate of 0 disables
+    limiting.
+    """
+
+    def __init__(self, rate: float, burst: int, max_wait: Dict[Priority, float]):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_wait = max_wait
+        self.tokens = float(self.burst)
+        self.timeouts = 0
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def acquire(self, priority: Priority):
+        if self.rate <= 0:
+            return
+        self._refill()
+        if not self._waiters and self.tokens >= 1:
+            self.tokens -= 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), waiter))
+        self._dispatch()
+        max_wait = self.max_wait[priority]
+        try:
+            await asyncio.wait_for(waiter, max_wait)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise QueueTimeout(f"Waited more than {max_wait:g}s for an upstream request slot") from None
+
+    def try_acquire(self) -> bool:
+        """Take a token only if one is free right now and nobody is queued"""
+        if self.rate <= 0:
+            return True
+        self._refill()
+        if not self._waiters and self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def pause(self, seconds: float):
+        """Hand out no tokens for the given time and start refilling from empty afterwards"""
+        if self.rate <= 0:
+            return
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+        if self._waiters:
+            self._reschedule()
+
+    def stats(self) -> Dict[str, float]:
+        waiting = {priority.name.lower(): 0 for priority in Priority}
+        for priority, _, waiter in self._waiters:
+            if not waiter.done():
+                waiting[Priority(priority).name.lower()] += 1
+        return {
+            "rate": self.rate,
+            "tokens": round(self.tokens, 2),
+            "timeouts": self.timeouts,
+            **{f"waiting_{name}": count for name, count in waiting.items()},
+        }
+
+    def _refill(self):
+        now = time.monotonic()
+        if now < self._paused_until:
+            self._updated = now
+            return
+        start = max(self._updated, self._paused_until)
+        self.tokens = min(float(self.burst), self.tokens + (now - start) * self.rate)
+        self._updated = now
+
+    def _dispatch(self):
+        self._timer = None
+        self._refill()
+        while self._waiters:
+            _, _, waiter = self._waiters[0]
+            if waiter.done():
+                # Timed out or cancelled while queued
+                heapq.heappop(self._waiters)
+                continue
+            if self.tokens < 1:
+                break
+            heapq.heappop(self._waiters)
+            self.tokens -= 1
+            waiter.set_result(None)
+        if self._waiters:
+            self._reschedule()
+
+    def _reschedule(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        now = time.monotonic()
+        delay = max(0.0, self._paused_until - now) + max(0.0, 1 - self.tokens) / self.rate
+        self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
@@ -0,0 +1,64 @@
+"""
+Building blocks for resilient upstream calls: latency windows for hedging and circuit breakers
+"""
+import time
+from collections import deque
+from typing import Deque, Optional
+
+
+class LatencyWindow:
+    """Latencies of the most recent successful calls, for percentile estimates"""
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._recent: Deque[float] = deque(maxlen=size)
+
+    def observe(self, seconds: float):
+        self._recent.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """None until min_samples calls have been observed"""
+        if len(self._recent) < self.min_samples:
+            return None
+        ordered = sorted(self._recent)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class CircuitBreaker:
+    """Opens after threshold consecutive failures and fails calls fast for cooldown seconds.
+
+    After the cooldown a single probe call is let through (half-open): its
+    success closes the circuit, its failure opens it for another cooldown.
+    A probe that never reports back is replaced after a further cooldown.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self._changed_at = 0.0
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic()
+        if now - self._changed_at < self.cooldown:
+            return False
+        self.state = self.HALF_OPEN
+        self._changed_at = now
+        return True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+            self.state = self.OPEN
+            self._changed_at = time.monotonic()
@@ -6,4 +6,123 @@ load_dotenv()
 METROLINX_API_KEY = os.getenv("METROLINX_API_KEY")
 
 if not METROLINX_API_KEY:
-    raise RuntimeError("METROLINX_API_KEY not set")
\ No newline at end of file
+    raise RuntimeError("METROLINX_API_KEY not set")
+
+# Upstream HTTP connection pool
+UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", "10"))
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "5"))
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "100"))
+UPSTREAM_MAX_KEEPALIVE = int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "20"))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30"))
+UPSTREAM_HTTP2 = os.getenv("UPSTREAM_HTTP2", "false").lower() in ("1", "true", "yes")
+
+# Client-side rate limit for the API key quota (requests per second; 0 disables it)
+UPSTREAM_RATE_LIMIT = float(os.getenv("UPSTREAM_RATE_LIMIT", "10"))
+UPSTREAM_RATE_BURST = int(os.getenv("UPSTREAM_RATE_BURST", "20"))
+# Longest wait for a rate limit slot before the call fails (seconds)
+UPSTREAM_QUEUE_TIMEOUT = float(os.getenv("UPSTREAM_QUEUE_TIMEOUT", "5"))
+UPSTREAM_BACKGROUND_QUEUE_TIMEOUT = float(os.getenv("UPSTREAM_BACKGROUND_QUEUE_TIMEOUT", "120"))
+# Back-off after an upstream 429 without a Retry-After header (seconds)
+UPSTREAM_RATE_LIMITED_PAUSE = float(os.getenv("UPSTREAM_RATE_LIMITED_PAUSE", "2"))
+
+# Upstream resilience: hedging after the endpoint's p95 latency, retries on 5xx and
+# connection errors, and a per-endpoint circuit breaker
+UPSTREAM_HEDGE = os.getenv("UPSTREAM_HEDGE", "true").lower() in ("1", "true", "yes")
+UPSTREAM_HEDGE_PERCENTILE = float(os.getenv("UPSTREAM_HEDGE_PERCENTILE", "0.95"))
+UPSTREAM_HEDGE_MIN_DELAY = float(os.getenv("UPSTREAM_HEDGE_MIN_DELAY", "0.05"))
+UPSTREAM_RETRIES = int(os.getenv("UPSTREAM_RETRIES", "2"))
+UPSTREAM_RETRY_BACKOFF = float(os.getenv("UPSTREAM_RETRY_BACKOFF", "0.2"))
+UPSTREAM_BREAKER_THRESHOLD = int(os.getenv("UPSTREAM_BREAKER_THRESHOLD", "5"))
+UPSTREAM_BREAKER_COOLDOWN = float(os.getenv("UPSTREAM_BREAKER_COOLDOWN", "30"))
+
+# Upstream response cache (TTLs in seconds)
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTL_REFERENCE = float(os.getenv("CACHE_TTL_REFERENCE", str(6 * 60 * 60)))
+CACHE_TTL_SERVICE_UPDATE = float(os.getenv("CACHE_TTL_SERVICE_UPDATE", "30"))
+CACHE_TTL_NEXT_SERVICE = float(os.getenv("CACHE_TTL_NEXT_SERVICE", "5"))
+CACHE_TTL_GTFS_REALTIME = float(os.getenv("CACHE_TTL_GTFS_REALTIME", "5"))
+
+# On-disk cache of reference data shared by the workers of a host (disabled unless PERSISTENT_CACHE_PATH is set)
+PERSISTENT_CACHE_PATH = os.getenv("PERSISTENT_CACHE_PATH")
+PERSISTENT_CACHE_TTL = float(os.getenv("PERSISTENT_CACHE_TTL", str(12 * 60 * 60)))
+
+# Background refresh of realtime feeds (seconds)
+FEED_REFRESH_ALERTS = float(os.getenv("FEED_REFRESH_ALERTS", "30"))
+FEED_REFRESH_UNION_DEPARTURES = float(os.getenv("FEED_REFRESH_UNION_DEPARTURES", "15"))
+FEED_REFRESH_EXCEPTIONS = float(os.getenv("FEED_REFRESH_EXCEPTIONS", "60"))
+FEED_MAX_AGE = float(os.getenv("FEED_MAX_AGE", "300"))
+FEED_REFRESH_VEHICLES = float(os.getenv("FEED_REFRESH_VEHICLES", "5"))
+FEED_REFRESH_TRIP_UPDATES = float(os.getenv("FEED_REFRESH_TRIP_UPDATES", "10"))
+FEED_REFRESH_SERVICE_GLANCE = float(os.getenv("FEED_REFRESH_SERVICE_GLANCE", "15"))
+# Trips late by at least this many seconds count as delayed in fleet aggregates
+FLEET_DELAY_THRESHOLD = int(os.getenv("FLEET_DELAY_THRESHOLD", "300"))
+# Positions older than this are not served at all
+VEHICLE_MAX_AGE = float(os.getenv("VEHICLE_MAX_AGE", "60"))
+# Largest /api/vehicles/bbox side in degrees (the whole network fits in about 3 x 4)
+VEHICLE_BBOX_MAX_DEG = float(os.getenv("VEHICLE_BBOX_MAX_DEG", "10"))
+# When set, workers read feed snapshots published here by `python -m app.fetcher` instead of polling
+FEED_SNAPSHOT_DIR = os.getenv("FEED_SNAPSHOT_DIR")
+
+# Server-sent event subscriptions
+SUBSCRIPTION_POLL_INTERVAL = float(os.getenv("SUBSCRIPTION_POLL_INTERVAL", "5"))
+SUBSCRIPTION_HEARTBEAT = float(os.getenv("SUBSCRIPTION_HEARTBEAT", "15"))
+SUBSCRIPTION_QUEUE_SIZE = int(os.getenv("SUBSCRIPTION_QUEUE_SIZE", "16"))
+SUBSCRIPTION_MAX_TOPICS = int(os.getenv("SUBSCRIPTION_MAX_TOPICS", "500"))
+
+# /api/batch limits
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "20"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+# Longest a single sub-request may run before its result becomes a 504 (seconds)
+BATCH_ITEM_TIMEOUT = float(os.getenv("BATCH_ITEM_TIMEOUT", "10"))
+
+# Bulk next-service streaming
+NEXT_SERVICE_BULK_MAX = int(os.getenv("NEXT_SERVICE_BULK_MAX", "50"))
+NEXT_SERVICE_BULK_CONCURRENCY = int(os.getenv("NEXT_SERVICE_BULK_CONCURRENCY", "10"))
+
+# In-memory stop index (name search and nearby queries)
+STOP_INDEX_REFRESH = float(os.getenv("STOP_INDEX_REFRESH", str(6 * 60 * 60)))
+STOP_INDEX_RETRY = float(os.getenv("STOP_INDEX_RETRY", "60"))
+STOP_INDEX_DETAILS_CONCURRENCY = int(os.getenv("STOP_INDEX_DETAILS_CONCURRENCY", "8"))
+
+# Local GTFS static journey planner (disabled unless GTFS_STATIC_PATH is set)
+GTFS_STATIC_PATH = os.getenv("GTFS_STATIC_PATH")
+PLANNER_MAX_TRANSFERS = int(os.getenv("PLANNER_MAX_TRANSFERS", "4"))
+PLANNER_MIN_TRANSFER_SECONDS = int(os.getenv("PLANNER_MIN_TRANSFER_SECONDS", "180"))
+
+# Upstream journey results cached per start-time bucket (disabled when JOURNEY_CACHE_TTL is 0)
+JOURNEY_CACHE_TTL = float(os.getenv("JOURNEY_CACHE_TTL", "900"))
+JOURNEY_BUCKET_MINUTES = int(os.getenv("JOURNEY_BUCKET_MINUTES", "30"))
+# Journeys fetched per bucket; requests may ask for up to 10
+JOURNEY_FETCH_SIZE = int(os.getenv("JOURNEY_FETCH_SIZE", "10"))
+# Requests for a bucket after which the next bucket is prefetched
+JOURNEY_PREFETCH_HITS = int(os.getenv("JOURNEY_PREFETCH_HITS", "3"))
+JOURNEY_CACHE_MAX_ENTRIES = int(os.getenv("JOURNEY_CACHE_MAX_ENTRIES", "5000"))
+
+# Scheduled departures per stop, built from every line schedule of a service day
+DEPARTURES_CONCURRENCY = int(os.getenv("DEPARTURES_CONCURRENCY", "8"))
+# Boards missing line schedules that failed to load are rebuilt after this many seconds
+DEPARTURES_RETRY = float(os.getenv("DEPARTURES_RETRY", "300"))
+DEPARTURES_MAX_DAYS = int(os.getenv("DEPARTURES_MAX_DAYS", "3"))
+# Dates served: yesterday (for trips past midnight) through this many days ahead;
+# keep DEPARTURES_MAX_DAYS at least DEPARTURES_DAYS_AHEAD + 2 so served boards are not evicted
+DEPARTURES_DAYS_AHEAD = int(os.getenv("DEPARTURES_DAYS_AHEAD", "1"))
+# Window after the start time when no end is given (seconds)
+DEPARTURES_WINDOW = int(os.getenv("DEPARTURES_WINDOW", str(2 * 60 * 60)))
+
+# Startup warm-up gating /ready (seconds until ready regardless; 0 skips warm-up)
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "60"))
+# Major stations whose stop details are preloaded during warm-up
+WARMUP_STOPS = [code.strip() for code in os.getenv("WARMUP_STOPS", "UN").split(",") if code.strip()]
+
+# Fare matrix (persisted when FARE_MATRIX_PATH is set)
+FARE_MATRIX_PATH = os.getenv("FARE_MATRIX_PATH")
+FARE_SAVE_INTERVAL = float(os.getenv("FARE_SAVE_INTERVAL", "300"))
+FARE_WARMUP_STOPS = [code.strip() for code in os.getenv("FARE_WARMUP_STOPS", "").split(",") if code.strip()]
+FARE_BULK_MAX = int(os.getenv("FARE_BULK_MAX", "100"))
+FARE_BULK_CONCURRENCY = int(os.getenv("FARE_BULK_CONCURRENCY", "8"))
+
+# Serialize trusted transformer output directly (orjson when installed), skipping response_model re-validation
+FAST_RESPONSES = os.getenv("FAST_RESPONSES", "false").lower() in ("1", "true", "yes")
+
+# Upstream base URL (override to point at a local stand-in such as benchmarks/stub_server.py)
+METROLINX_BASE_URL = os.getenv("METROLINX_BASE_URL", "https://api.openmetrolinx.com/OpenDataAPI/api/V1")
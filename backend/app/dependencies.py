@@ -0,0 +1,68 @@
+from typing import Optional
+from fastapi import Request
+from app.clients.metrolinx import MetrolinxClient
+from app.services.alert_index import AlertIndexes
+from app.services.departures import DepartureStore
+from app.services.fares import FareMatrix
+from app.services.journey_cache import JourneyCache
+from app.services.planner import LocalJourneyPlanner
+from app.services.refresher import FeedRefresher
+from app.services.stop_index import StopIndexManager
+from app.services.subscriptions import SubscriptionHub
+from app.services.trips import ActiveTrips
+from app.services.vehicles import Fleet
+
+
+def get_client(request: Request) -> MetrolinxClient:
+    """Shared MetrolinxClient created by the app lifespan"""
+    return request.app.state.metrolinx
+
+
+def get_feeds(request: Request) -> FeedRefresher:
+    """Background refresher holding the realtime feed snapshots"""
+    return request.app.state.feeds
+
+
+def get_stop_index(request: Request) -> StopIndexManager:
+    """Background-built index of stops by name and location"""
+    return request.app.state.stop_index
+
+
+def get_planner(request: Request) -> LocalJourneyPlanner:
+    """Local GTFS static journey planner (may not be loaded)"""
+    return request.app.state.planner
+
+
+def get_fare_matrix(request: Request) -> FareMatrix:
+    """Lazily filled, persisted fare matrix"""
+    return request.app.state.fares
+
+
+def get_fleet(request: Request) -> Fleet:
+    """Live vehicle positions merged with trip delays"""
+    return request.app.state.fleet
+
+
+def get_subscriptions(request: Request) -> SubscriptionHub:
+    """Server-sent event topics shared by all subscribers"""
+    return request.app.state.subscriptions
+
+
+def get_active_trips(request: Request) -> ActiveTrips:
+    """Trips in progress from the ServiceataGlance feeds"""
+    return request.app.state.trips
+
+
+def get_alert_indexes(request: Request) -> AlertIndexes:
+    """Line, stop and severity indexes over the alert and exception feeds"""
+    return request.app.state.alert_indexes
+
+
+def get_journey_cache(request: Request) -> Optional[JourneyCache]:
+    """Bucketed upstream journey results (None when JOURNEY_CACHE_TTL is 0)"""
+    return request.app.state.journey_cache
+
+
+def get_departures(request: Request) -> DepartureStore:
+    """Columnar scheduled departures per stop, loaded once per service day"""
+    return request.app.state.departures
@@ -0,0 +1,45 @@
+"""
+Feed fetcher process: the only poller of realtime feeds when workers share snapshots.
+
+Run one per host next to the uvicorn workers, with the same FEED_SNAPSHOT_DIR:
+
+    FEED_SNAPSHOT_DIR=/dev/shm/go-feeds python -m app.fetcher
+"""
+import asyncio
+import logging
+import signal
+from app.clients.metrolinx import MetrolinxClient
+from app.config import FEED_SNAPSHOT_DIR
+from app.services.feeds import build_fetcher
+
+logger = logging.getLogger(__name__)
+
+
+async def run(directory: str):
+    client = MetrolinxClient()
+    await client.start()
+    fetcher = build_fetcher(client, directory)
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+    await fetcher.start()
+    logger.info("Publishing feed snapshots to %s", directory)
+    try:
+        await stopping.wait()
+    finally:
+        await fetcher.stop()
+        await client.close()
+
+
+def main():
+    if not FEED_SNAPSHOT_DIR:
+        raise SystemExit("FEED_SNAPSHOT_DIR must be set for the fetcher")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    # One line per poll drowns out refresh failures
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    asyncio.run(run(FEED_SNAPSHOT_DIR))
+
+
+if __name__ == "__main__":
+    main()
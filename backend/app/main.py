@@ -1,18 +1,156 @@
-from fastapi import FastAPI
-from app.routes import stops, journeys, alerts, schedules
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.clients.metrolinx import MetrolinxClient
+from app.config import (
+    STOP_INDEX_REFRESH,
+    STOP_INDEX_RETRY,
+    STOP_INDEX_DETAILS_CONCURRENCY,
+    GTFS_STATIC_PATH,
+    PLANNER_MAX_TRANSFERS,
+    PLANNER_MIN_TRANSFER_SECONDS,
+    FARE_MATRIX_PATH,
+    FARE_SAVE_INTERVAL,
+    FARE_WARMUP_STOPS,
+    FARE_BULK_CONCURRENCY,
+    SUBSCRIPTION_POLL_INTERVAL,
+    SUBSCRIPTION_HEARTBEAT,
+    SUBSCRIPTION_QUEUE_SIZE,
+    SUBSCRIPTION_MAX_TOPICS,
+    FEED_SNAPSHOT_DIR,
+    FLEET_DELAY_THRESHOLD,
+    JOURNEY_CACHE_TTL,
+    JOURNEY_BUCKET_MINUTES,
+    JOURNEY_FETCH_SIZE,
+    JOURNEY_PREFETCH_HITS,
+    JOURNEY_CACHE_MAX_ENTRIES,
+    DEPARTURES_CONCURRENCY,
+    DEPARTURES_RETRY,
+    DEPARTURES_MAX_DAYS,
+    WARMUP_TIMEOUT,
+    WARMUP_STOPS,
+)
+from app.metrics import Metrics, MetricsMiddleware
+from app.responses import ConditionalMiddleware
+from app.services.alert_index import AlertIndexes
+from app.services.departures import DepartureStore
+from app.services.fares import FareMatrix
+from app.services.feeds import build_refresher, build_shared
+from app.services.journey_cache import JourneyCache
+from app.services.planner import LocalJourneyPlanner
+from app.services.stop_index import StopIndexManager
+from app.services.subscriptions import SubscriptionHub
+from app.services.trips import ActiveTrips
+from app.services.vehicles import Fleet
+from app.services.warmup import build_warmup
+from app.routes import stops, journeys, alerts, schedules, vehicles, trips, batch
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled upstream client shared by every router for the app lifetime
+    client = MetrolinxClient(metrics=app.state.metrics)
+    await client.start()
+    app.state.metrolinx = client
+    # With a fetcher process, realtime feeds cost one set of upstream calls per host, not per worker
+    feeds = build_shared(client, FEED_SNAPSHOT_DIR) if FEED_SNAPSHOT_DIR else build_refresher(client)
+    app.state.feeds = feeds
+    await feeds.start()
+    app.state.fleet = Fleet(feeds)
+    app.state.trips = ActiveTrips(feeds, FLEET_DELAY_THRESHOLD)
+    app.state.alert_indexes = AlertIndexes(feeds)
+    subscriptions = SubscriptionHub(client, feeds, SUBSCRIPTION_POLL_INTERVAL, SUBSCRIPTION_HEARTBEAT, SUBSCRIPTION_QUEUE_SIZE, SUBSCRIPTION_MAX_TOPICS)
+    app.state.subscriptions = subscriptions
+    stop_index = StopIndexManager(client, STOP_INDEX_REFRESH, STOP_INDEX_RETRY, STOP_INDEX_DETAILS_CONCURRENCY)
+    app.state.stop_index = stop_index
+    await stop_index.start()
+    planner = LocalJourneyPlanner(GTFS_STATIC_PATH, PLANNER_MAX_TRANSFERS, PLANNER_MIN_TRANSFER_SECONDS)
+    app.state.planner = planner
+    await planner.start()
+    journey_cache = None
+    if JOURNEY_CACHE_TTL > 0:
+        journey_cache = JourneyCache(client, JOURNEY_BUCKET_MINUTES, JOURNEY_CACHE_TTL, JOURNEY_FETCH_SIZE, JOURNEY_PREFETCH_HITS, JOURNEY_CACHE_MAX_ENTRIES)
+    app.state.journey_cache = journey_cache
+    departures = DepartureStore(client, DEPARTURES_CONCURRENCY, DEPARTURES_RETRY, DEPARTURES_MAX_DAYS)
+    app.state.departures = departures
+    await departures.start()
+    fares = FareMatrix(client, FARE_MATRIX_PATH, FARE_SAVE_INTERVAL, FARE_WARMUP_STOPS, FARE_BULK_CONCURRENCY)
+    app.state.fares = fares
+    await fares.start()
+    # Serve liveness checks right away but keep /ready failing until caches are warm
+    warmup = build_warmup(client, feeds, stop_index, departures, WARMUP_STOPS, WARMUP_TIMEOUT)
+    app.state.warmup = warmup
+    await warmup.start()
+    try:
+        yield
+    finally:
+        await warmup.stop()
+        await fares.stop()
+        await departures.stop()
+        if journey_cache is not None:
+            await journey_cache.stop()
+        await planner.stop()
+        await stop_index.stop()
+        await subscriptions.stop()
+        await feeds.stop()
+        await client.close()
+
 
 app = FastAPI(
     title="GO Transit Unofficial API",
     version="1.0.0",
-    description="Unofficial API for GO Transit information including trip planning, schedules, alerts, and real-time data"
+    description="Unofficial API for GO Transit information including trip planning, schedules, alerts, and real-time data",
+    lifespan=lifespan
 )
 
+metrics = Metrics()
+app.state.metrics = metrics
+app.add_middleware(ConditionalMiddleware)
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+
 # Include all routers
 app.include_router(stops.router)
 app.include_router(journeys.router)
 app.include_router(alerts.router)
 app.include_router(schedules.router)
+app.include_router(vehicles.router)
+app.include_router(trips.router)
+app.include_router(batch.router)
 
 @app.get("/health")
-def health():
-    return {"status": "ok"}
+def health(request: Request):
+    state = request.app.state
+    client = state.metrolinx
+    return {
+        "status": "ok",
+        "cache": client.cache.stats(),
+        "persistent_cache": client.store.stats() if client.store is not None else None,
+        "upstream": client.flight_stats(),
+        "rate_limit": client.limiter.stats(),
+        "resilience": client.resilience_stats(),
+        "journey_cache": state.journey_cache.stats() if state.journey_cache is not None else None,
+        "departures": state.departures.stats(),
+        "feeds": state.feeds.status(),
+        "subscriptions": state.subscriptions.status(),
+    }
+
+@app.get("/ready")
+def ready(request: Request):
+    """Readiness for the load balancer: 503 until the startup warm-up has finished"""
+    status = request.app.state.warmup.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics(request: Request):
+    client = request.app.state.metrolinx
+    gauges = {f"response_cache_{name}": value for name, value in client.cache.stats().items()}
+    if client.store is not None:
+        persistent = await asyncio.to_thread(client.store.stats)
+        gauges.update({f"persistent_cache_{name}": value for name, value in persistent.items()})
+    gauges.update({f"upstream_flights_{name}": value for name, value in client.flight_stats().items()})
+    gauges.update({f"upstream_rate_limit_{name}": value for name, value in client.limiter.stats().items()})
+    resilience = client.resilience_stats()
+    gauges.update({f"upstream_{name}": resilience[name] for name in ("hedges", "retries", "stale_served")})
+    gauges["upstream_open_circuits"] = len(resilience["open_circuits"])
+    return PlainTextResponse(request.app.state.metrics.render(gauges), media_type="text/plain; version=0.0.4")
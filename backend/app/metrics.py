@@ -0,0 +1,197 @@
+"""
+Request, upstream and transform metrics, exposed in the Prometheus text format
+"""
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds in seconds; the implicit +Inf bucket catches the rest
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestTiming:
+    """Wall time a request spent in each phase.
+
+    Phases may overlap themselves (concurrent upstream calls in one request),
+    so a phase accumulates time while at least one instance of it is active.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = defaultdict(float)
+        self._active: Dict[str, int] = defaultdict(int)
+        self._since: Dict[str, float] = {}
+
+    def enter(self, phase: str):
+        if self._active[phase] == 0:
+            self._since[phase] = time.perf_counter()
+        self._active[phase] += 1
+
+    def exit(self, phase: str):
+        self._active[phase] -= 1
+        if self._active[phase] == 0:
+            self.phases[phase] += time.perf_counter() - self._since.pop(phase)
+
+    def server_timing(self) -> str:
+        """Server-Timing header value; whatever is not upstream, transform or plan is serialize"""
+        total = time.perf_counter() - self.started
+        entries = [f"{phase};dur={seconds * 1000:.1f}" for phase, seconds in self.phases.items()]
+        serialize = max(0.0, total - sum(self.phases.values()))
+        entries.append(f"serialize;dur={serialize * 1000:.1f}")
+        entries.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_timing: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Attribute the enclosed wall time to a phase of the current request, if any"""
+    timing = _timing.get()
+    if timing is None:
+        yield
+        return
+    timing.enter(name)
+    try:
+        yield
+    finally:
+        timing.exit(name)
+
+
+class Metrics:
+    def __init__(self):
+        self.requests: Dict[Tuple[str, str], Histogram] = defaultdict(Histogram)
+        self.responses: Dict[Tuple[str, str, int], int] = defaultdict(int)
+        self.requests_in_flight = 0
+        self.upstream: Dict[str, Histogram] = defaultdict(Histogram)
+        self.upstream_responses: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.upstream_in_flight: Dict[str, int] = defaultdict(int)
+        self.transforms: Dict[str, Histogram] = defaultdict(Histogram)
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float):
+        self.requests[(method, route)].observe(seconds)
+        self.responses[(method, route, status)] += 1
+
+    @contextmanager
+    def upstream_call(self, method: str) -> Iterator[List[str]]:
+        """Time one upstream call; the caller puts the response status in the yielded list"""
+        outcome: List[str] = []
+        self.upstream_in_flight[method] += 1
+        started = time.perf_counter()
+        try:
+            yield outcome
+        except Exception as e:
+            if not outcome:
+                outcome.append(type(e).__name__)
+            raise
+        finally:
+            self.upstream_in_flight[method] -= 1
+            self.upstream[method].observe(time.perf_counter() - started)
+            self.upstream_responses[(method, outcome[0] if outcome else "cancelled")] += 1
+
+    def observe_transform(self, name: str, seconds: float):
+        self.transforms[name].observe(seconds)
+
+    def render(self, gauges: Optional[Dict[str, float]] = None) -> str:
+        lines: List[str] = []
+        _histograms(lines, "http_request_duration_seconds", "Request latency by route",
+                    {(("method", method), ("route", route)): h for (method, route), h in self.requests.items()})
+        _family(lines, "http_responses_total", "counter", "Responses by route and status",
+                {(("method", method), ("route", route), ("status", str(status))): n for (method, route, status), n in self.responses.items()})
+        _family(lines, "http_requests_in_flight", "gauge", "Requests being handled", {(): self.requests_in_flight})
+        _histograms(lines, "upstream_request_duration_seconds", "Metrolinx call latency by client method",
+                    {(("method", method),): h for method, h in self.upstream.items()})
+        _family(lines, "upstream_responses_total", "counter", "Metrolinx responses by client method and status",
+                {(("method", method), ("status", status)): n for (method, status), n in self.upstream_responses.items()})
+        _family(lines, "upstream_requests_in_flight", "gauge", "Metrolinx calls in progress by client method",
+                {(("method", method),): n for method, n in self.upstream_in_flight.items()})
+        _histograms(lines, "transform_duration_seconds", "Transformer run time",
+                    {(("transformer", name),): h for name, h in self.transforms.items()})
+        for name, value in (gauges or {}).items():
+            _family(lines, name, "gauge", None, {(): value})
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _family(lines: List[str], name: str, kind: str, help_text: Optional[str], samples: dict):
+    if help_text:
+        lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in sorted(samples.items()):
+        lines.append(f"{name}{_labels(labels)} {value}")
+
+
+def _histograms(lines: List[str], name: str, help_text: str, histograms: Dict[tuple, Histogram]):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(labels, (('le', str(bound)),))} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {histogram.sum:.6f}")
+        lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+
+class MetricsMiddleware:
+    """Times every HTTP request by route template and adds a Server-Timing header"""
+
+    def __init__(self, app, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = _timing.set(timing)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        self.metrics.requests_in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            self.metrics.requests_in_flight -= 1
+            _timing.reset(token)
+            # Label by route template so path parameters do not explode the series count
+            route = scope.get("route")
+            self.metrics.observe_request(
+                scope["method"], getattr(route, "path", "unmatched"), status, time.perf_counter() - timing.started
+            )
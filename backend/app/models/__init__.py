@@ -1,24 +1,50 @@
-from .stops import Stop, StopDetails, NextService
-from .journeys import JourneyResponse, JourneyService, JourneyTrip, JourneyStop, Fare, FareResponse
+from .stops import Stop, StopDetails, NextService, NearbyStop
+from .journeys import (
+    JourneyResponse, JourneyService, JourneyTrip, JourneyStop, Fare, FareResponse,
+    FarePair, BulkFareRequest, BulkFareResult, BulkFareResponse,
+)
 from .alerts import Alert, ServiceException, UnionDeparture
-from .schedules import Line, LineSchedule, TripSchedule, TripStop
+from .schedules import Line, LineStop, ScheduleStop, ScheduleTrip, LineSchedule, TripSchedule, TripStop, StopDeparture, StopDepartures
+from .vehicles import Vehicle, VehiclesResponse
+from .trips import ActiveTrip, ActiveTripsResponse, LineStatus, FleetStatus
+from .batch import BatchRequestItem, BatchRequest, BatchResult, BatchResponse
 
 __all__ = [
     "Stop",
     "StopDetails", 
     "NextService",
+    "NearbyStop",
     "JourneyResponse",
     "JourneyService",
     "JourneyTrip",
     "JourneyStop",
     "Fare",
     "FareResponse",
+    "FarePair",
+    "BulkFareRequest",
+    "BulkFareResult",
+    "BulkFareResponse",
     "Alert",
     "ServiceException",
     "UnionDeparture",
     "Line",
+    "LineStop",
+    "ScheduleStop",
+    "ScheduleTrip",
     "LineSchedule",
     "TripSchedule",
     "TripStop",
+    "StopDeparture",
+    "StopDepartures",
+    "Vehicle",
+    "VehiclesResponse",
+    "ActiveTrip",
+    "ActiveTripsResponse",
+    "LineStatus",
+    "FleetStatus",
+    "BatchRequestItem",
+    "BatchRequest",
+    "BatchResult",
+    "BatchResponse",
 ]
 
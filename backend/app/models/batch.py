@@ -0,0 +1,24 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any
+
+class BatchRequestItem(BaseModel):
+    """Single GET sub-request against another /api route"""
+    id: Optional[str] = Field(None, description="Caller-chosen id echoed back in the result")
+    path: str = Field(..., description="Route path, e.g. /api/stops/UN/next-service")
+    params: Dict[str, str] = Field(default_factory=dict, description="Query parameters")
+
+class BatchRequest(BaseModel):
+    """Batch of sub-requests run concurrently"""
+    requests: List[BatchRequestItem]
+
+class BatchResult(BaseModel):
+    """Outcome of one sub-request"""
+    id: Optional[str] = None
+    path: str
+    status: int
+    body: Optional[Any] = None
+    error: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    """Results in the same order as the sub-requests"""
+    results: List[BatchResult]
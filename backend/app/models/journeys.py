@@ -50,3 +50,25 @@ class FareResponse(BaseModel):
     operational_day: Optional[str] = None
     fares: List[Fare]
 
+
+class FarePair(BaseModel):
+    """Origin/destination pair to price"""
+    from_stop: str
+    to_stop: str
+
+class BulkFareRequest(BaseModel):
+    """Many origin/destination pairs priced for one operational day"""
+    pairs: List[FarePair]
+    operational_day: Optional[str] = None
+
+class BulkFareResult(BaseModel):
+    """Fares for one pair, or the error that prevented pricing it"""
+    from_stop: str
+    to_stop: str
+    fares: List[Fare] = Field(default_factory=list)
+    error: Optional[str] = None
+
+class BulkFareResponse(BaseModel):
+    """Bulk fare results in request order"""
+    operational_day: Optional[str] = None
+    results: List[BulkFareResult]
@@ -13,23 +13,35 @@ class LineStop(BaseModel):
     stop_code: str
     stop_name: str
     sequence: int
-    scheduled_time: Optional[str] = None
+    scheduled_time: Optional[int] = None  # Seconds after midnight
+
+class ScheduleStop(BaseModel):
+    """Entry in a line schedule's stop table"""
+    code: str
+    name: str
+
+class ScheduleTrip(BaseModel):
+    """Trip in a line schedule"""
+    trip_number: str
+    display: Optional[str] = None
+    times: List[Optional[int]] = Field(default_factory=list)  # Seconds after midnight per stop-table entry, None if not served
 
 class LineSchedule(BaseModel):
-    """Schedule for a line"""
+    """Schedule for a line; each stop is listed once and trips index into that table"""
     line_code: str
     line_name: str
     direction: str
     date: str
-    trips: List[dict] = Field(default_factory=list)  # Will contain trip details
+    stops: List[ScheduleStop] = Field(default_factory=list)
+    trips: List[ScheduleTrip] = Field(default_factory=list)
 
 class TripStop(BaseModel):
     """Stop on a trip"""
     stop_code: str
     stop_name: str
     sequence: int
-    scheduled_arrival: Optional[str] = None
-    scheduled_departure: Optional[str] = None
+    scheduled_arrival: Optional[int] = None  # Seconds after midnight
+    scheduled_departure: Optional[int] = None  # Seconds after midnight
 
 class TripSchedule(BaseModel):
     """Complete trip schedule"""
@@ -40,3 +52,20 @@ class TripSchedule(BaseModel):
     date: str
     stops: List[TripStop]
 
+class StopDeparture(BaseModel):
+    """Scheduled departure from a stop"""
+    departure_time: int  # Seconds after midnight of the service day (may exceed 24h)
+    trip_number: str
+    line_code: str
+    line_name: str
+    direction: str
+    display: Optional[str] = None
+
+class StopDepartures(BaseModel):
+    """Scheduled departures from a stop within a time window"""
+    stop_code: str
+    stop_name: str
+    date: str
+    start: int  # Seconds after midnight
+    end: int  # Seconds after midnight
+    departures: List[StopDeparture] = Field(default_factory=list)
@@ -38,3 +38,13 @@ class NextService(BaseModel):
     """Next service information for a stop"""
     stop_code: str
     lines: List[NextServiceLine]
+
+class NearbyStop(BaseModel):
+    """Stop with its distance from a query point"""
+    id: str
+    name: str
+    type: str
+    public_id: Optional[str] = None
+    latitude: float
+    longitude: float
+    distance_km: float
@@ -0,0 +1,46 @@
+from pydantic import BaseModel
+from typing import Optional, List
+
+class ActiveTrip(BaseModel):
+    """Trip in progress from the ServiceataGlance feeds"""
+    trip_number: str
+    mode: str  # "train", "bus", "upx"
+    line_code: str
+    route_number: Optional[str] = None
+    direction: Optional[str] = None
+    display: Optional[str] = None
+    start_time: Optional[str] = None
+    end_time: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    in_motion: Optional[bool] = None
+    delay_seconds: int = 0  # Positive is late
+    course: Optional[float] = None
+    first_stop_code: Optional[str] = None
+    last_stop_code: Optional[str] = None
+    previous_stop_code: Optional[str] = None
+    next_stop_code: Optional[str] = None
+    at_station_code: Optional[str] = None
+    modified_at: Optional[str] = None
+
+class ActiveTripsResponse(BaseModel):
+    """Active trips as of the latest poll"""
+    count: int
+    trips: List[ActiveTrip]
+
+class LineStatus(BaseModel):
+    """Per-line aggregate over active trips"""
+    line_code: str
+    mode: str
+    active_trips: int
+    delayed_trips: int  # Late by at least the delay threshold
+    average_delay_seconds: float
+    max_delay_seconds: int
+
+class FleetStatus(BaseModel):
+    """Fleet-wide aggregate over active trips, computed once per poll"""
+    active_trips: int
+    delayed_trips: int
+    average_delay_seconds: float
+    delay_threshold_seconds: int
+    lines: List[LineStatus]
@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import Optional, List
+
+class Vehicle(BaseModel):
+    """Live vehicle position from the GTFS-realtime feeds"""
+    vehicle_id: str
+    label: Optional[str] = None
+    trip_id: Optional[str] = None
+    route_id: Optional[str] = None
+    line_code: Optional[str] = None
+    latitude: float
+    longitude: float
+    bearing: Optional[float] = None
+    speed: Optional[float] = None  # metres per second
+    timestamp: Optional[int] = None  # POSIX seconds of the position fix
+    delay_seconds: Optional[int] = None  # From TripUpdates; positive is late
+
+class VehiclesResponse(BaseModel):
+    """Vehicle positions as of the feed timestamp"""
+    timestamp: Optional[int] = None
+    count: int
+    vehicles: List[Vehicle]
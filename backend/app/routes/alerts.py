@@ -1,92 +1,119 @@
-import httpx
-from fastapi import APIRouter, HTTPException
-from typing import List
-from app.clients.metrolinx import MetrolinxClient
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from typing import Dict, List, Optional
+from app.dependencies import get_feeds, get_subscriptions, get_alert_indexes
 from app.models.alerts import Alert, ServiceException, UnionDeparture
-from app import transformers as transform
+from app.responses import memoized, respond, event_stream
+from app.services import feeds as feed_names
+from app.services.alert_index import AlertIndexes
+from app.services.refresher import FeedRefresher, FeedSnapshot, FeedUnavailable
+from app.services.subscriptions import SubscriptionHub, TooManyTopics
 
 router = APIRouter(prefix="/api/alerts", tags=["alerts"])
-client = MetrolinxClient()
+
+async def _snapshot(feeds: FeedRefresher, name: str) -> FeedSnapshot:
+    try:
+        return await feeds.get(name)
+    except FeedUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+# Last combined /all payload, reused while both feeds are unchanged so its ETag rendering is too
+_combined: Dict[str, dict] = {}
+
+def _combine_alerts(service: FeedSnapshot, information: FeedSnapshot) -> dict:
+    combined = _combined.get("all")
+    if combined is None or combined["service_alerts"] is not service.data or combined["information_alerts"] is not information.data:
+        combined = _combined["all"] = {"service_alerts": service.data, "information_alerts": information.data}
+    return memoized(combined)
+
+async def _serve(feeds: FeedRefresher, name: str, response: Response):
+    """Serve a feed from memory, reporting how old the data is in the Age header"""
+    snapshot = await _snapshot(feeds, name)
+    response.headers["Age"] = str(int(snapshot.age))
+    return respond(snapshot.data, response)
+
+@router.get("", response_model=List[Alert])
+async def query_alerts(
+    response: Response,
+    line: Optional[str] = Query(None, description="Line code (e.g., LW)"),
+    stop: Optional[str] = Query(None, description="Stop code (e.g., UN)"),
+    severity: Optional[str] = Query(None, description="High, Medium or Low"),
+    alert_type: Optional[str] = Query(None, alias="type", description="Service or Information"),
+    indexes: AlertIndexes = Depends(get_alert_indexes)
+):
+    """
+    Get service and information alerts matching every given filter.
+
+    Alerts that name no lines (or no stops) are network-wide and match any line (or stop).
+    """
+    try:
+        index, age = await indexes.alerts()
+    except FeedUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    response.headers["Age"] = str(int(age))
+    return respond(index.query(line=line, stop=stop, severity=severity, alert_type=alert_type), response)
 
 @router.get("/service", response_model=List[Alert])
-async def get_service_alerts():
+async def get_service_alerts(response: Response, feeds: FeedRefresher = Depends(get_feeds)):
     """Get service alert messages"""
-    try:
-        raw = await client.get_service_alerts()
-        return transform.transform_alerts(raw, "Service")
-    except httpx.HTTPStatusError as e:
-        raise HTTPException(status_code=e.response.status_code, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching service alerts: {str(e)}")
+    return await _serve(feeds, feed_names.SERVICE_ALERTS, response)
 
 @router.get("/information", response_model=List[Alert])
-async def get_information_alerts():
+async def get_information_alerts(response: Response, feeds: FeedRefresher = Depends(get_feeds)):
     """Get information alert messages"""
-    try:
-        raw = await client.get_information_alerts()
-        return transform.transform_alerts(raw, "Information")
-    except httpx.HTTPStatusError as e:
-        raise HTTPException(status_code=e.response.status_code, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching information alerts: {str(e)}")
+    return await _serve(feeds, feed_names.INFORMATION_ALERTS, response)
 
 @router.get("/all")
-async def get_all_alerts():
+async def get_all_alerts(response: Response, feeds: FeedRefresher = Depends(get_feeds)):
     """Get all alert types combined"""
+    service, information = await asyncio.gather(
+        _snapshot(feeds, feed_names.SERVICE_ALERTS),
+        _snapshot(feeds, feed_names.INFORMATION_ALERTS)
+    )
+    response.headers["Age"] = str(int(max(service.age, information.age)))
+
+    return respond(_combine_alerts(service, information), response)
+
+@router.get("/exceptions", response_model=List[ServiceException])
+async def query_exceptions(
+    response: Response,
+    line: Optional[str] = Query(None, description="Line code (e.g., LW)"),
+    stop: Optional[str] = Query(None, description="Stop code (e.g., UN)"),
+    date: Optional[str] = Query(None, description="Scheduled date in YYYY-MM-DD format"),
+    indexes: AlertIndexes = Depends(get_alert_indexes)
+):
+    """Get schedule exceptions matching every given filter"""
     try:
-        service_raw = await client.get_service_alerts()
-        information_raw = await client.get_information_alerts()
-        
-        return {
-            "service_alerts": transform.transform_alerts(service_raw, "Service"),
-            "information_alerts": transform.transform_alerts(information_raw, "Information")
-        }
-    except httpx.HTTPStatusError as e:
-        raise HTTPException(status_code=e.response.status_code, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching alerts: {str(e)}")
+        index, age = await indexes.exceptions()
+    except FeedUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    response.headers["Age"] = str(int(age))
+    return respond(index.query(line=line, stop=stop, date=date), response)
 
 @router.get("/exceptions/train", response_model=List[ServiceException])
-async def get_train_exceptions():
+async def get_train_exceptions(response: Response, feeds: FeedRefresher = Depends(get_feeds)):
     """Get train schedule exceptions (cancellations, etc.)"""
-    try:
-        raw = await client.get_exceptions_train()
-        return transform.transform_exceptions(raw)
-    except httpx.HTTPStatusError as e:
-        raise HTTPException(status_code=e.response.status_code, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching train exceptions: {str(e)}")
+    return await _serve(feeds, feed_names.EXCEPTIONS_TRAIN, response)
 
 @router.get("/exceptions/bus", response_model=List[ServiceException])
-async def get_bus_exceptions():
+async def get_bus_exceptions(response: Response, feeds: FeedRefresher = Depends(get_feeds)):
     """Get bus schedule exceptions"""
-    try:
-        raw = await client.get_exceptions_bus()
-        return transform.transform_exceptions(raw)
-    except httpx.HTTPStatusError as e:
-        raise HTTPException(status_code=e.response.status_code, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching bus exceptions: {str(e)}")
+    return await _serve(feeds, feed_names.EXCEPTIONS_BUS, response)
 
 @router.get("/exceptions/all", response_model=List[ServiceException])
-async def get_all_exceptions():
+async def get_all_exceptions(response: Response, feeds: FeedRefresher = Depends(get_feeds)):
     """Get all schedule exceptions"""
-    try:
-        raw = await client.get_exceptions_all()
-        return transform.transform_exceptions(raw)
-    except httpx.HTTPStatusError as e:
-        raise HTTPException(status_code=e.response.status_code, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching exceptions: {str(e)}")
+    return await _serve(feeds, feed_names.EXCEPTIONS_ALL, response)
 
 @router.get("/union/departures", response_model=List[UnionDeparture])
-async def get_union_departures():
+async def get_union_departures(response: Response, feeds: FeedRefresher = Depends(get_feeds)):
     """Get nearest departures from Union Station"""
-    try:
-        raw = await client.get_union_departures()
-        return transform.transform_union_departures(raw)
-    except httpx.HTTPStatusError as e:
-        raise HTTPException(status_code=e.response.status_code, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching Union departures: {str(e)}")
+    return await _serve(feeds, feed_names.UNION_DEPARTURES, response)
 
+@router.get("/union/departures/stream")
+async def subscribe_union_departures(subscriptions: SubscriptionHub = Depends(get_subscriptions)):
+    """Subscribe to Union Station departures as server-sent events (snapshot, then diffs keyed by trip)"""
+    try:
+        return event_stream(subscriptions.union_departures())
+    except TooManyTopics as e:
+        raise HTTPException(status_code=503, detail=str(e))
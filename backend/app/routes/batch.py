@@ -0,0 +1,53 @@
+import asyncio
+import httpx
+from fastapi import APIRouter, HTTPException, Request
+from starlette.routing import compile_path
+from app.config import BATCH_MAX_ITEMS, BATCH_CONCURRENCY, BATCH_ITEM_TIMEOUT
+from app.models.batch import BatchRequest, BatchRequestItem, BatchResult, BatchResponse
+
+router = APIRouter(prefix="/api/batch", tags=["batch"])
+
+# Streaming routes (server-sent events and NDJSON) never produce a single JSON body to embed
+_STREAMING_ROUTES = [compile_path(path)[0] for path in (
+    "/api/stops/next-service",
+    "/api/stops/{stop_code}/next-service/stream",
+    "/api/alerts/union/departures/stream",
+)]
+
+def _streaming(path: str) -> bool:
+    path = path.split("?", 1)[0].rstrip("/")
+    return any(pattern.match(path) for pattern in _STREAMING_ROUTES)
+
+async def _run_item(http: httpx.AsyncClient, item: BatchRequestItem, semaphore: asyncio.Semaphore) -> BatchResult:
+    if not item.path.startswith("/api/") or item.path.startswith("/api/batch"):
+        return BatchResult(id=item.id, path=item.path, status=400, error="path must be an /api route other than /api/batch")
+    if _streaming(item.path):
+        return BatchResult(id=item.id, path=item.path, status=400, error="streaming routes cannot be batched")
+    try:
+        async with semaphore:
+            response = await asyncio.wait_for(http.get(item.path, params=item.params), BATCH_ITEM_TIMEOUT)
+        body = response.json() if response.content else None
+    except asyncio.TimeoutError:
+        return BatchResult(id=item.id, path=item.path, status=504, error=f"Sub-request timed out after {BATCH_ITEM_TIMEOUT:g}s")
+    except Exception as e:
+        return BatchResult(id=item.id, path=item.path, status=500, error=f"Error running sub-request: {str(e)}")
+    if response.is_success:
+        return BatchResult(id=item.id, path=item.path, status=response.status_code, body=body)
+    error = body.get("detail") if isinstance(body, dict) else None
+    return BatchResult(id=item.id, path=item.path, status=response.status_code, error=str(error or response.reason_phrase))
+
+@router.post("", response_model=BatchResponse)
+async def run_batch(batch: BatchRequest, request: Request):
+    """
+    Run several GET sub-requests across stops, alerts, journeys and schedules concurrently.
+    Each sub-request gets its own status and body or error; one failing does not fail the batch.
+    """
+    if len(batch.requests) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=422, detail=f"At most {BATCH_MAX_ITEMS} sub-requests per batch")
+
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    # Dispatch in-process through the app itself so every route keeps its own validation and caching
+    transport = httpx.ASGITransport(app=request.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://batch") as http:
+        results = await asyncio.gather(*(_run_item(http, item, semaphore) for item in batch.requests))
+    return BatchResponse(results=list(results))
@@ -1,12 +1,21 @@
+import logging
 import httpx
-from fastapi import APIRouter, Query, HTTPException, Path
+from fastapi import APIRouter, Query, HTTPException, Path, Depends
 from typing import Optional
 from app.clients.metrolinx import MetrolinxClient
-from app.models.journeys import JourneyResponse, FareResponse
+from app.config import FARE_BULK_MAX
+from app.dependencies import get_client, get_planner, get_fare_matrix, get_journey_cache
+from app.metrics import phase
+from app.models.journeys import JourneyResponse, FareResponse, BulkFareRequest, BulkFareResult, BulkFareResponse
+from app.responses import respond
+from app.services.fares import FareMatrix
+from app.services.journey_cache import JourneyCache
+from app.services.planner import LocalJourneyPlanner
 from app import transformers as transform
 
 router = APIRouter(prefix="/api/journeys", tags=["journeys"])
-client = MetrolinxClient()
+
+logger = logging.getLogger(__name__)
 
 def _normalize_date(value: str) -> str:
     normalized = "".join(ch for ch in value if ch.isdigit())
@@ -18,10 +27,14 @@ def _normalize_time(value: str) -> str:
     normalized = "".join(ch for ch in value if ch.isdigit())
     if len(normalized) != 4:
         raise HTTPException(status_code=422, detail="start_time must be in HHMM or HH:MM format")
+    if int(normalized[:2]) > 23 or int(normalized[2:]) > 59:
+        raise HTTPException(status_code=422, detail="start_time must be a time of day between 00:00 and 23:59")
     return normalized
 
-async def _fetch_journeys(from_stop: str, to_stop: str, journey_date: str, start_time: str, max_journeys: int) -> JourneyResponse:
+async def _fetch_journeys(client: MetrolinxClient, cache: Optional[JourneyCache], from_stop: str, to_stop: str, journey_date: str, start_time: str, max_journeys: int) -> JourneyResponse:
     try:
+        if cache is not None:
+            return await cache.get(from_stop, to_stop, journey_date, start_time, max_journeys)
         raw_data = await client.get_journey(
             from_stop_code=from_stop,
             to_stop_code=to_stop,
@@ -29,7 +42,7 @@ async def _fetch_journeys(from_stop: str, to_stop: str, journey_date: str, start
             start_time=start_time,
             max_journeys=max_journeys
         )
-        return transform.transform_journey(raw_data, from_stop, to_stop, journey_date, start_time)
+        return client.transform(raw_data, transform.transform_journey, from_stop, to_stop, journey_date, start_time)
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 404:
             raise HTTPException(status_code=404, detail="No journeys found for the given stops")
@@ -43,28 +56,37 @@ async def get_journeys(
     to_stop: str = Path(..., description="Destination stop code"),
     journey_date: str = Path(..., description="Date in YYYYMMDD or YYYY-MM-DD format"),
     start_time: str = Path(..., description="Start time in HHMM or HH:MM format"),
-    max_journeys: int = Query(5, ge=1, le=10, description="Maximum number of journey options to return")
+    max_journeys: int = Query(5, ge=1, le=10, description="Maximum number of journey options to return"),
+    client: MetrolinxClient = Depends(get_client),
+    planner: LocalJourneyPlanner = Depends(get_planner),
+    cache: Optional[JourneyCache] = Depends(get_journey_cache)
 ):
     journey_date = _normalize_date(journey_date)
     start_time = _normalize_time(start_time)
-    return await _fetch_journeys(from_stop, to_stop, journey_date, start_time, max_journeys)
+    # Answer from the local GTFS timetable when it is loaded, upstream otherwise
+    with phase("plan"):
+        try:
+            local = planner.plan(from_stop, to_stop, journey_date, start_time, max_journeys)
+        except Exception:
+            # A planner bug must not cost the caller an answer upstream can still give
+            logger.exception("Local planning of %s to %s on %s at %s failed", from_stop, to_stop, journey_date, start_time)
+            local = None
+    if local is not None:
+        return respond(local)
+    return respond(await _fetch_journeys(client, cache, from_stop, to_stop, journey_date, start_time, max_journeys))
 
 @router.get("/fares", response_model=FareResponse)
 async def get_fares(
     from_stop: str = Query(..., description="Starting stop code"),
     to_stop: str = Query(..., description="Destination stop code"),
-    operational_day: Optional[str] = Query(None, description="Operational day in YYYY-MM-DD format")
+    operational_day: Optional[str] = Query(None, description="Operational day in YYYY-MM-DD format"),
+    fares: FareMatrix = Depends(get_fare_matrix)
 ):
     """
     Get fare information between two stops.
     """
     try:
-        if operational_day:
-            raw_data = await client.get_fares(from_stop, to_stop, operational_day)
-        else:
-            raw_data = await client.get_fares(from_stop, to_stop)
-        
-        return transform.transform_fares(raw_data, from_stop, to_stop, operational_day)
+        return respond(await fares.get(from_stop, to_stop, operational_day))
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 404:
             raise HTTPException(status_code=404, detail="No fare information found")
@@ -72,3 +94,21 @@ async def get_fares(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching fares: {str(e)}")
 
+
+@router.post("/fares/bulk", response_model=BulkFareResponse)
+async def get_bulk_fares(request: BulkFareRequest, fares: FareMatrix = Depends(get_fare_matrix)):
+    """
+    Price many origin/destination pairs in one call.
+    Pairs already in the fare matrix are answered without calling upstream.
+    """
+    if len(request.pairs) > FARE_BULK_MAX:
+        raise HTTPException(status_code=422, detail=f"At most {FARE_BULK_MAX} pairs per request")
+
+    pairs = [(pair.from_stop, pair.to_stop) for pair in request.pairs]
+    results = []
+    for (from_stop, to_stop), outcome in zip(pairs, await fares.get_many(pairs, request.operational_day)):
+        if isinstance(outcome, FareResponse):
+            results.append(BulkFareResult(from_stop=from_stop, to_stop=to_stop, fares=outcome.fares))
+        else:
+            results.append(BulkFareResult(from_stop=from_stop, to_stop=to_stop, error=f"Error fetching fares: {str(outcome)}"))
+    return BulkFareResponse(operational_day=request.operational_day, results=results)
@@ -1,16 +1,21 @@
 import httpx
-from fastapi import APIRouter, Path, Query, HTTPException
+from fastapi import APIRouter, Path, Query, HTTPException, Depends
 from typing import Optional, List
-from datetime import date
+from datetime import date, datetime, timedelta
 from app.clients.metrolinx import MetrolinxClient
-from app.models.schedules import Line, LineSchedule, TripSchedule
+from app.config import DEPARTURES_WINDOW, DEPARTURES_DAYS_AHEAD
+from app.dependencies import get_client, get_departures
+from app.models.schedules import Line, LineStop, LineSchedule, TripSchedule, StopDepartures
+from app.responses import respond
+from app.services.departures import DepartureStore, DeparturesUnavailable
+from app import transformers as transform
 
 router = APIRouter(prefix="/api/schedules", tags=["schedules"])
-client = MetrolinxClient()
 
-@router.get("/lines")
+@router.get("/lines", response_model=List[Line])
 async def get_lines(
-    schedule_date: Optional[str] = Query(None, description="Date in YYYY-MM-DD format (defaults to today)")
+    schedule_date: Optional[str] = Query(None, description="Date in YYYY-MM-DD format (defaults to today)"),
+    client: MetrolinxClient = Depends(get_client)
 ):
     """Get all lines in effect for a date"""
     if schedule_date is None:
@@ -18,19 +23,18 @@ async def get_lines(
     
     try:
         raw = await client.get_lines_all(schedule_date)
-        # Return raw for now - can add transformer if needed
-        # The structure depends on actual API response
-        return raw
+        return respond(client.transform(raw, transform.transform_lines))
     except httpx.HTTPStatusError as e:
         raise HTTPException(status_code=e.response.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching lines: {str(e)}")
 
-@router.get("/lines/{line_code}/{direction}")
+@router.get("/lines/{line_code}/{direction}", response_model=LineSchedule)
 async def get_line_schedule(
     line_code: str = Path(..., description="Line code"),
     direction: str = Path(..., description="Line direction"),
-    schedule_date: Optional[str] = Query(None, description="Date in YYYY-MM-DD format (defaults to today)")
+    schedule_date: Optional[str] = Query(None, description="Date in YYYY-MM-DD format (defaults to today)"),
+    client: MetrolinxClient = Depends(get_client)
 ):
     """Get line schedule details"""
     if schedule_date is None:
@@ -38,8 +42,7 @@ async def get_line_schedule(
     
     try:
         raw = await client.get_line_schedule(schedule_date, line_code, direction)
-        # Return raw for now - can add transformer if needed
-        return raw
+        return respond(client.transform(raw, transform.transform_line_schedule, line_code, direction, schedule_date))
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 404:
             raise HTTPException(status_code=404, detail=f"Line {line_code} {direction} not found for date {schedule_date}")
@@ -47,11 +50,12 @@ async def get_line_schedule(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching line schedule: {str(e)}")
 
-@router.get("/lines/{line_code}/{direction}/stops")
+@router.get("/lines/{line_code}/{direction}/stops", response_model=List[LineStop])
 async def get_line_stops(
     line_code: str = Path(..., description="Line code"),
     direction: str = Path(..., description="Line direction"),
-    schedule_date: Optional[str] = Query(None, description="Date in YYYY-MM-DD format (defaults to today)")
+    schedule_date: Optional[str] = Query(None, description="Date in YYYY-MM-DD format (defaults to today)"),
+    client: MetrolinxClient = Depends(get_client)
 ):
     """Get stops for a line and direction"""
     if schedule_date is None:
@@ -59,8 +63,7 @@ async def get_line_stops(
     
     try:
         raw = await client.get_line_stops(schedule_date, line_code, direction)
-        # Return raw for now - can add transformer if needed
-        return raw
+        return respond(client.transform(raw, transform.transform_line_stops))
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 404:
             raise HTTPException(status_code=404, detail=f"Line {line_code} {direction} stops not found for date {schedule_date}")
@@ -68,10 +71,11 @@ async def get_line_stops(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching line stops: {str(e)}")
 
-@router.get("/trips/{trip_number}")
+@router.get("/trips/{trip_number}", response_model=TripSchedule)
 async def get_trip_schedule(
     trip_number: str = Path(..., description="Trip number"),
-    schedule_date: Optional[str] = Query(None, description="Date in YYYY-MM-DD format (defaults to today)")
+    schedule_date: Optional[str] = Query(None, description="Date in YYYY-MM-DD format (defaults to today)"),
+    client: MetrolinxClient = Depends(get_client)
 ):
     """Get trip details with all stops"""
     if schedule_date is None:
@@ -79,8 +83,7 @@ async def get_trip_schedule(
     
     try:
         raw = await client.get_trip_schedule(schedule_date, trip_number)
-        # Return raw for now - can add transformer if needed
-        return raw
+        return respond(client.transform(raw, transform.transform_trip_schedule, trip_number, schedule_date))
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 404:
             raise HTTPException(status_code=404, detail=f"Trip {trip_number} not found for date {schedule_date}")
@@ -88,3 +91,56 @@ async def get_trip_schedule(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching trip schedule: {str(e)}")
 
+
+def _window_seconds(value: str, name: str) -> int:
+    seconds = transform.parse_seconds(value)
+    if seconds is None:
+        raise HTTPException(status_code=422, detail=f"{name} must be in HHMM or HH:MM format")
+    return seconds
+
+@router.get("/stops/{stop_code}/departures", response_model=StopDepartures)
+async def get_stop_departures(
+    stop_code: str = Path(..., description="Stop code"),
+    schedule_date: Optional[str] = Query(None, description="Date in YYYY-MM-DD format (defaults to today)"),
+    start: Optional[str] = Query(None, description="Window start in HHMM or HH:MM format (defaults to now for today, else start of day)"),
+    end: Optional[str] = Query(None, description="Window end (exclusive) in HHMM or HH:MM format; hours past 23 reach after midnight"),
+    line: Optional[str] = Query(None, description="Only departures of this line code"),
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of departures to return"),
+    departures: DepartureStore = Depends(get_departures)
+):
+    """Get scheduled departures from a stop across all lines, optionally for one line"""
+    today = date.today()
+    if schedule_date is None:
+        service_day = today
+    else:
+        try:
+            service_day = datetime.strptime(schedule_date, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(status_code=422, detail="schedule_date must be in YYYY-MM-DD format")
+    # Every new date costs a full build from upstream, so only the days around today are served
+    if not today - timedelta(days=1) <= service_day <= today + timedelta(days=DEPARTURES_DAYS_AHEAD):
+        raise HTTPException(status_code=404, detail=f"Departures are only available from yesterday to {DEPARTURES_DAYS_AHEAD} day(s) ahead")
+    schedule_date = service_day.isoformat()
+    if start is not None:
+        start_seconds = _window_seconds(start, "start")
+    elif service_day == today:
+        now = datetime.now()
+        start_seconds = now.hour * 3600 + now.minute * 60
+    else:
+        start_seconds = 0
+    end_seconds = _window_seconds(end, "end") if end is not None else start_seconds + DEPARTURES_WINDOW
+    if end_seconds < start_seconds:
+        raise HTTPException(status_code=422, detail="end must not be before start; use hours past 23 for times after midnight")
+
+    try:
+        board = await departures.get(schedule_date)
+    except DeparturesUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching departures: {str(e)}")
+    result = board.departures(stop_code, start_seconds, end_seconds, line, limit)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No line serves stop {stop_code} on {schedule_date}")
+    return respond(result)
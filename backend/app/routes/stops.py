@@ -1,30 +1,142 @@
+import asyncio
+import json
 import httpx
-from fastapi import APIRouter, Path, Query, HTTPException
+from fastapi import APIRouter, Path, Query, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from typing import List
+from app.config import NEXT_SERVICE_BULK_MAX, NEXT_SERVICE_BULK_CONCURRENCY
 from app.clients.metrolinx import MetrolinxClient
-from app.models.stops import Stop, StopDetails, NextService
+from app.dependencies import get_client, get_stop_index, get_subscriptions
+from app.models.stops import Stop, StopDetails, NextService, NearbyStop
+from app.responses import respond, event_stream
+from app.services.stop_index import StopIndex, StopIndexManager, StopIndexUnavailable
+from app.services.subscriptions import SubscriptionHub, TooManyTopics
 from app import transformers as transform
 
 router = APIRouter(prefix="/api/stops", tags=["stops"])
-client = MetrolinxClient()
 
 @router.get("", response_model=List[Stop])
-async def get_all_stops():
+async def get_all_stops(client: MetrolinxClient = Depends(get_client)):
     """Get all stops/stations"""
     try:
         raw = await client.get_stops_all()
-        return transform.transform_stops(raw)
+        return respond(client.transform(raw, transform.transform_stops))
     except httpx.HTTPStatusError as e:
         raise HTTPException(status_code=e.response.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching stops: {str(e)}")
 
+async def _stop_index(stop_index: StopIndexManager) -> StopIndex:
+    try:
+        return await stop_index.get()
+    except StopIndexUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@router.get("/search", response_model=List[Stop])
+async def search_stops(
+    q: str = Query(..., min_length=1, description="Stop code or (partial, possibly misspelled) stop name"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of stops to return"),
+    stop_index: StopIndexManager = Depends(get_stop_index)
+):
+    """Search stops by code, name prefix or fuzzy name match"""
+    index = await _stop_index(stop_index)
+    return respond(index.search(q, limit))
+
+@router.get("/nearby", response_model=List[NearbyStop])
+async def get_nearby_stops(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude"),
+    radius_km: float = Query(2.0, gt=0, le=50, description="Search radius in kilometres"),
+    limit: int = Query(10, ge=1, le=100, description="Maximum number of stops to return"),
+    stop_index: StopIndexManager = Depends(get_stop_index)
+):
+    """Get the nearest stops to a point, closest first"""
+    index = await _stop_index(stop_index)
+    if not index.has_coordinates:
+        raise HTTPException(status_code=503, detail="Stop locations are still loading")
+    return respond([
+        NearbyStop(
+            id=stop.id,
+            name=stop.name,
+            type=stop.type,
+            public_id=stop.public_id,
+            latitude=latitude,
+            longitude=longitude,
+            distance_km=round(distance, 3)
+        )
+        for stop, latitude, longitude, distance in index.nearby(lat, lon, radius_km, limit)
+    ])
+
+@router.get("/next-service")
+async def stream_next_service(
+    codes: str = Query(..., description="Comma-separated stop codes"),
+    client: MetrolinxClient = Depends(get_client)
+):
+    """
+    Get next-service predictions for many stops as NDJSON.
+    Each line is one stop's NextService (or an error object) written as soon as it is ready.
+    """
+    stop_codes = list(dict.fromkeys(code.strip() for code in codes.split(",") if code.strip()))
+    if not stop_codes:
+        raise HTTPException(status_code=422, detail="codes must list at least one stop code")
+    if len(stop_codes) > NEXT_SERVICE_BULK_MAX:
+        raise HTTPException(status_code=422, detail=f"At most {NEXT_SERVICE_BULK_MAX} stop codes per request")
+
+    semaphore = asyncio.Semaphore(NEXT_SERVICE_BULK_CONCURRENCY)
+
+    async def fetch(stop_code: str) -> str:
+        try:
+            async with semaphore:
+                raw = await client.get_stop_next_service(stop_code)
+            return client.transform(raw, transform.transform_next_service, stop_code).model_dump_json()
+        except httpx.HTTPStatusError as e:
+            error = {"stop_code": stop_code, "status": e.response.status_code, "error": str(e)}
+        except Exception as e:
+            error = {"stop_code": stop_code, "status": 500, "error": f"Error fetching next service: {str(e)}"}
+        return json.dumps(error)
+
+    async def lines():
+        tasks = [asyncio.create_task(fetch(stop_code)) for stop_code in stop_codes]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield (await next_done) + "\n"
+        finally:
+            # Client went away mid-stream: stop the remaining upstream calls
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @router.get("/{stop_code}/next-service", response_model=NextService)
-async def get_stop_next_service(stop_code: str = Path(..., description="Stop code")):
+async def get_stop_next_service(stop_code: str = Path(..., description="Stop code"), client: MetrolinxClient = Depends(get_client)):
     """Get predictions for all lines that feed a stop"""
     try:
         raw = await client.get_stop_next_service(stop_code)
-        return transform.transform_next_service(raw, stop_code)
+        return respond(client.transform(raw, transform.transform_next_service, stop_code))
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            raise HTTPException(status_code=404, detail=f"Stop {stop_code} not found")
+        raise HTTPException(status_code=e.response.status_code, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching next service: {str(e)}")
+
+@router.get("/{stop_code}/next-service/stream")
+async def subscribe_stop_next_service(
+    stop_code: str = Path(..., description="Stop code"),
+    client: MetrolinxClient = Depends(get_client),
+    subscriptions: SubscriptionHub = Depends(get_subscriptions)
+):
+    """
+    Subscribe to next-service predictions for a stop as server-sent events.
+    A "snapshot" event carries every line keyed by trip; "diff" events carry only
+    changed lines and the keys of removed ones.
+    """
+    try:
+        # Fail fast on unknown stops instead of starting a poller for them
+        await client.get_stop_next_service(stop_code)
+        return event_stream(subscriptions.next_service(stop_code))
+    except TooManyTopics as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 404:
             raise HTTPException(status_code=404, detail=f"Stop {stop_code} not found")
@@ -33,11 +145,11 @@ async def get_stop_next_service(stop_code: str = Path(..., description="Stop cod
         raise HTTPException(status_code=500, detail=f"Error fetching next service: {str(e)}")
 
 @router.get("/{stop_code}/details", response_model=StopDetails)
-async def get_stop_details(stop_code: str = Path(..., description="Stop code")):
+async def get_stop_details(stop_code: str = Path(..., description="Stop code"), client: MetrolinxClient = Depends(get_client)):
     """Get detailed stop information"""
     try:
         raw = await client.get_stop_details(stop_code)
-        return transform.transform_stop_details(raw, stop_code)
+        return respond(client.transform(raw, transform.transform_stop_details, stop_code))
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 404:
             raise HTTPException(status_code=404, detail=f"Stop {stop_code} not found")
@@ -0,0 +1,80 @@
+from fastapi import APIRouter, Query, HTTPException, Path, Depends, Response
+from typing import Optional
+from app.dependencies import get_active_trips
+from app.models.trips import ActiveTrip, ActiveTripsResponse, FleetStatus, LineStatus
+from app.responses import respond
+from app.services.refresher import FeedUnavailable
+from app.services.trips import ActiveTrips, TripTable
+
+router = APIRouter(prefix="/api/fleet", tags=["fleet"])
+
+async def _table(trips: ActiveTrips, response: Response) -> TripTable:
+    """Current trip table, reporting the age of the oldest applied feed in the Age header"""
+    try:
+        table, age = await trips.get()
+    except FeedUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    response.headers["Age"] = str(int(age))
+    return table
+
+@router.get("/status", response_model=FleetStatus)
+async def get_fleet_status(response: Response, trips: ActiveTrips = Depends(get_active_trips)):
+    """
+    Get fleet-wide status: active trips, delayed trips and average delay, overall and per line.
+    """
+    table = await _table(trips, response)
+    return respond(table.status(), response)
+
+@router.get("/trips", response_model=ActiveTripsResponse)
+async def get_active_trips_list(
+    response: Response,
+    mode: Optional[str] = Query(None, pattern="^(train|bus|upx)$", description="Only trips of this mode"),
+    trips: ActiveTrips = Depends(get_active_trips)
+):
+    """
+    Get every trip currently in progress.
+    """
+    table = await _table(trips, response)
+    return respond(table.all(mode), response)
+
+@router.get("/trips/{trip_number}", response_model=ActiveTrip)
+async def get_active_trip(
+    response: Response,
+    trip_number: str = Path(..., description="Trip number"),
+    trips: ActiveTrips = Depends(get_active_trips)
+):
+    """
+    Get the current state of a trip in progress.
+    """
+    table = await _table(trips, response)
+    trip = table.trip(trip_number)
+    if trip is None:
+        raise HTTPException(status_code=404, detail="No active trip with this number")
+    return respond(trip, response)
+
+@router.get("/lines/{line_code}", response_model=ActiveTripsResponse)
+async def get_line_trips(
+    response: Response,
+    line_code: str = Path(..., description="Line code (e.g., LW, 21)"),
+    trips: ActiveTrips = Depends(get_active_trips)
+):
+    """
+    Get trips in progress on a line.
+    """
+    table = await _table(trips, response)
+    return respond(table.line(line_code), response)
+
+@router.get("/lines/{line_code}/status", response_model=LineStatus)
+async def get_line_status(
+    response: Response,
+    line_code: str = Path(..., description="Line code (e.g., LW, 21)"),
+    trips: ActiveTrips = Depends(get_active_trips)
+):
+    """
+    Get active and delayed trip counts and delays for a line.
+    """
+    table = await _table(trips, response)
+    status = table.line_status(line_code)
+    if status is None:
+        raise HTTPException(status_code=404, detail="No active trips on this line")
+    return respond(status, response)
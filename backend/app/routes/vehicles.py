@@ -0,0 +1,72 @@
+from fastapi import APIRouter, Query, HTTPException, Path, Depends, Response
+from app.config import VEHICLE_BBOX_MAX_DEG
+from app.dependencies import get_fleet
+from app.models.vehicles import Vehicle, VehiclesResponse
+from app.responses import respond
+from app.services.refresher import FeedUnavailable
+from app.services.vehicles import Fleet, FleetSnapshot
+
+router = APIRouter(prefix="/api/vehicles", tags=["vehicles"])
+
+async def _snapshot(fleet: Fleet, response: Response) -> FleetSnapshot:
+    """Latest fleet snapshot, reporting the age of the positions in the Age header"""
+    try:
+        snapshot, age = await fleet.get()
+    except FeedUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    response.headers["Age"] = str(int(age))
+    return snapshot
+
+@router.get("", response_model=VehiclesResponse)
+async def get_vehicles(response: Response, fleet: Fleet = Depends(get_fleet)):
+    """
+    Get live positions of the whole fleet, with current delays where known.
+    """
+    snapshot = await _snapshot(fleet, response)
+    return respond(snapshot.all, response)
+
+@router.get("/bbox", response_model=VehiclesResponse)
+async def get_vehicles_in_bbox(
+    response: Response,
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    fleet: Fleet = Depends(get_fleet)
+):
+    """
+    Get live vehicles inside a bounding box.
+    """
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=422, detail="min_lat/min_lon must not exceed max_lat/max_lon")
+    if max_lat - min_lat > VEHICLE_BBOX_MAX_DEG or max_lon - min_lon > VEHICLE_BBOX_MAX_DEG:
+        raise HTTPException(status_code=422, detail=f"Bounding box sides must not exceed {VEHICLE_BBOX_MAX_DEG:g} degrees")
+    snapshot = await _snapshot(fleet, response)
+    return respond(snapshot.in_bbox(min_lat, min_lon, max_lat, max_lon), response)
+
+@router.get("/lines/{line_code}", response_model=VehiclesResponse)
+async def get_line_vehicles(
+    response: Response,
+    line_code: str = Path(..., description="Line code (e.g., LW, 21)"),
+    fleet: Fleet = Depends(get_fleet)
+):
+    """
+    Get live vehicles running on a line.
+    """
+    snapshot = await _snapshot(fleet, response)
+    return respond(snapshot.line(line_code), response)
+
+@router.get("/trips/{trip_id}", response_model=Vehicle)
+async def get_trip_vehicle(
+    response: Response,
+    trip_id: str = Path(..., description="GTFS trip ID"),
+    fleet: Fleet = Depends(get_fleet)
+):
+    """
+    Get the live vehicle operating a trip.
+    """
+    snapshot = await _snapshot(fleet, response)
+    vehicle = snapshot.trip(trip_id)
+    if vehicle is None:
+        raise HTTPException(status_code=404, detail="No live vehicle for this trip")
+    return respond(vehicle, response)
@@ -0,0 +1,118 @@
+"""
+Inverted indexes over alerts and schedule exceptions, rebuilt when their feeds change
+"""
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, Generic, Iterable, List, Optional, Set, Tuple, TypeVar
+from app.models.alerts import Alert, ServiceException
+from app.responses import memoized
+from app.services import feeds as feed_names
+from app.services.refresher import FeedRefresher
+
+T = TypeVar("T")
+
+_RESULTS_MAX_ENTRIES = 512
+
+
+def _digits(value: str) -> str:
+    # '2026-10-17', '20261017' and '2026-10-17 00:00:00' all index as '20261017'
+    return "".join(ch for ch in value if ch.isdigit())[:8]
+
+
+@dataclass(frozen=True)
+class Facet(Generic[T]):
+    """A filterable attribute: the values an item carries and how values are compared"""
+    values: Callable[[T], Iterable[str]]
+    normalize: Callable[[str], str] = str.upper
+    # Items carrying no value for this facet (e.g. network-wide alerts) match every query value
+    unscoped_matches: bool = False
+
+
+class InvertedIndex(Generic[T]):
+    """Positions of items by facet value; a query intersects the postings of each given filter.
+
+    Results keep the original item order and are memoized per query, so
+    repeated queries return the same list object (and reuse its ETag).
+    """
+
+    def __init__(self, items: List[T], facets: Dict[str, Facet[T]]):
+        self.items = items
+        self._facets = facets
+        self._postings: Dict[str, Dict[str, Set[int]]] = {name: defaultdict(set) for name in facets}
+        self._unscoped: Dict[str, Set[int]] = {name: set() for name in facets}
+        self._results: Dict[Tuple, List[T]] = {}
+        for position, item in enumerate(items):
+            for name, facet in facets.items():
+                values = [facet.normalize(value) for value in facet.values(item) if value]
+                if not values:
+                    self._unscoped[name].add(position)
+                for value in values:
+                    self._postings[name][value].add(position)
+
+    def query(self, **filters: Optional[str]) -> List[T]:
+        key = tuple(sorted((name, self._facets[name].normalize(value)) for name, value in filters.items() if value))
+        results = self._results.get(key)
+        if results is None:
+            if len(self._results) >= _RESULTS_MAX_ENTRIES:
+                self._results.clear()
+            results = self._results[key] = self._match(key)
+        return memoized(results)
+
+    def _match(self, key: Tuple) -> List[T]:
+        if not key:
+            return self.items
+        positions: Optional[Set[int]] = None
+        for name, value in key:
+            matched = self._postings[name].get(value, set())
+            if self._facets[name].unscoped_matches:
+                matched = matched | self._unscoped[name]
+            positions = matched if positions is None else positions & matched
+            if not positions:
+                return []
+        return [self.items[position] for position in sorted(positions)]
+
+
+ALERT_FACETS: Dict[str, Facet[Alert]] = {
+    "line": Facet(lambda alert: alert.affected_lines, unscoped_matches=True),
+    "stop": Facet(lambda alert: alert.affected_stops, unscoped_matches=True),
+    "severity": Facet(lambda alert: [alert.severity]),
+    "alert_type": Facet(lambda alert: [alert.alert_type]),
+}
+
+EXCEPTION_FACETS: Dict[str, Facet[ServiceException]] = {
+    "line": Facet(lambda exception: [exception.line_code]),
+    "stop": Facet(lambda exception: exception.affected_stops),
+    "date": Facet(lambda exception: [exception.scheduled_date], normalize=_digits),
+}
+
+
+class AlertIndexes:
+    """Indexes over the alert and exception feeds, rebuilt once per feed version"""
+
+    def __init__(self, feeds: FeedRefresher):
+        self.feeds = feeds
+        self._alerts: Optional[InvertedIndex[Alert]] = None
+        self._alert_versions: Tuple[int, int] = (0, 0)
+        self._exceptions: Optional[InvertedIndex[ServiceException]] = None
+        self._exception_version = 0
+
+    async def alerts(self) -> Tuple[InvertedIndex[Alert], float]:
+        """(index over service and information alerts, age of the older feed); raises FeedUnavailable"""
+        service, information = await asyncio.gather(
+            self.feeds.get(feed_names.SERVICE_ALERTS),
+            self.feeds.get(feed_names.INFORMATION_ALERTS)
+        )
+        versions = (service.version, information.version)
+        if self._alerts is None or versions != self._alert_versions:
+            self._alerts = InvertedIndex(service.data + information.data, ALERT_FACETS)
+            self._alert_versions = versions
+        return self._alerts, max(service.age, information.age)
+
+    async def exceptions(self) -> Tuple[InvertedIndex[ServiceException], float]:
+        """(index over all schedule exceptions, feed age); raises FeedUnavailable"""
+        snapshot = await self.feeds.get(feed_names.EXCEPTIONS_ALL)
+        if self._exceptions is None or snapshot.version != self._exception_version:
+            self._exceptions = InvertedIndex(snapshot.data, EXCEPTION_FACETS)
+            self._exception_version = snapshot.version
+        return self._exceptions, snapshot.age
@@ -0,0 +1,286 @@
+"""
+Columnar store of scheduled departures per stop, built from every line schedule of a service day
+"""
+import asyncio
+import logging
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import httpx
+from app.clients.metrolinx import MetrolinxClient
+from app.clients.ratelimit import Priority
+from app.models.schedules import LineSchedule, StopDeparture, StopDepartures
+from app.responses import memoized
+from app import transformers as transform
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+_RESULTS_MAX_ENTRIES = 512
+
+
+class DeparturesUnavailable(Exception):
+    """Raised when the departures of a service day could not be loaded"""
+
+
+class DepartureBoard:
+    """Departures of one service day in flat columns grouped by stop.
+
+    The departures of stop s occupy positions offsets[s] to offsets[s + 1]
+    of the seconds, trips and lines columns, ordered by time, so a window is
+    two binary searches and a line filter is a mask over that slice. The last
+    stop of each trip is an arrival and is left out. Columns are NumPy arrays
+    when NumPy is installed and array('i') otherwise.
+    """
+
+    def __init__(self, service_date: str, schedules: List[LineSchedule], missing: int = 0):
+        self.service_date = service_date
+        # Line variants whose schedule failed to load; the board is rebuilt until this is 0
+        self.missing = missing
+        self.built_at = time.monotonic()
+        self.stop_codes: List[str] = []
+        self.stop_names: List[str] = []
+        self.stop_lookup: Dict[str, int] = {}
+        self.line_codes: List[str] = []
+        self.line_names: List[str] = []
+        self.line_lookup: Dict[str, int] = {}
+        self.trip_numbers: List[str] = []
+        self.trip_displays: List[Optional[str]] = []
+        self.trip_directions: List[str] = []
+        self._results: Dict[Tuple, StopDepartures] = {}
+
+        stops, seconds, trips, lines = array("i"), array("i"), array("i"), array("i")
+        for schedule in schedules:
+            line = self._index(self.line_lookup, self.line_codes, schedule.line_code.upper())
+            if line == len(self.line_names):
+                self.line_names.append(schedule.line_name)
+            table = []
+            for stop in schedule.stops:
+                index = self._index(self.stop_lookup, self.stop_codes, stop.code.upper())
+                if index == len(self.stop_names):
+                    self.stop_names.append(stop.name)
+                table.append(index)
+            for trip_data in schedule.trips:
+                served = [(departs, table[position]) for position, departs in enumerate(trip_data.times) if departs is not None]
+                if len(served) < 2:
+                    continue
+                trip = len(self.trip_numbers)
+                self.trip_numbers.append(trip_data.trip_number)
+                self.trip_displays.append(trip_data.display)
+                self.trip_directions.append(schedule.direction)
+                served.sort()
+                for departs, stop in served[:-1]:
+                    stops.append(stop)
+                    seconds.append(departs)
+                    trips.append(trip)
+                    lines.append(line)
+
+        self.size = len(seconds)
+        if np is not None:
+            stop_column = np.frombuffer(stops, dtype=np.int32)
+            order = np.lexsort((np.frombuffer(seconds, dtype=np.int32), stop_column))
+            self._seconds = np.frombuffer(seconds, dtype=np.int32)[order]
+            self._trips = np.frombuffer(trips, dtype=np.int32)[order]
+            self._lines = np.frombuffer(lines, dtype=np.int32)[order]
+            self._offsets = np.searchsorted(stop_column[order], np.arange(len(self.stop_codes) + 1)).tolist()
+        else:
+            order = sorted(range(self.size), key=lambda position: (stops[position], seconds[position]))
+            self._seconds = array("i", (seconds[position] for position in order))
+            self._trips = array("i", (trips[position] for position in order))
+            self._lines = array("i", (lines[position] for position in order))
+            counts = [0] * (len(self.stop_codes) + 1)
+            for stop in stops:
+                counts[stop + 1] += 1
+            for stop in range(len(self.stop_codes)):
+                counts[stop + 1] += counts[stop]
+            self._offsets = counts
+
+    @staticmethod
+    def _index(lookup: Dict[str, int], values: List[str], value: str) -> int:
+        index = lookup.get(value)
+        if index is None:
+            index = lookup[value] = len(values)
+            values.append(value)
+        return index
+
+    def departures(self, stop_code: str, start: int, end: int, line_code: Optional[str], limit: int) -> Optional[StopDepartures]:
+        """Departures from stop_code at or after start and before end, or None for a stop no line serves.
+
+        Results are memoized per query, so repeated queries return the same
+        object (and reuse its ETag).
+        """
+        stop = self.stop_lookup.get(stop_code.upper())
+        if stop is None:
+            return None
+        line = self.line_lookup.get(line_code.upper(), -1) if line_code else None
+        key = (stop, start, end, line, limit)
+        result = self._results.get(key)
+        if result is None:
+            if len(self._results) >= _RESULTS_MAX_ENTRIES:
+                self._results.clear()
+            result = self._results[key] = StopDepartures(
+                stop_code=self.stop_codes[stop],
+                stop_name=self.stop_names[stop],
+                date=self.service_date,
+                start=start,
+                end=end,
+                departures=[self._departure(position) for position in self._positions(stop, start, end, line, limit)]
+            )
+        return memoized(result)
+
+    def _positions(self, stop: int, start: int, end: int, line: Optional[int], limit: int) -> List[int]:
+        first, last = self._offsets[stop], self._offsets[stop + 1]
+        if np is not None:
+            window = self._seconds[first:last]
+            low = first + int(np.searchsorted(window, start, "left"))
+            high = first + int(np.searchsorted(window, end, "left"))
+            positions = np.arange(low, high)
+            if line is not None:
+                positions = positions[self._lines[low:high] == line]
+            return positions[:limit].tolist()
+        low = bisect_left(self._seconds, start, first, last)
+        high = bisect_left(self._seconds, end, low, last)
+        positions = [position for position in range(low, high) if line is None or self._lines[position] == line]
+        return positions[:limit]
+
+    def _departure(self, position: int) -> StopDeparture:
+        trip = int(self._trips[position])
+        line = int(self._lines[position])
+        return StopDeparture(
+            departure_time=int(self._seconds[position]),
+            trip_number=self.trip_numbers[trip],
+            line_code=self.line_codes[line],
+            line_name=self.line_names[line],
+            direction=self.trip_directions[trip],
+            display=self.trip_displays[trip]
+        )
+
+
+class DepartureStore:
+    """Departure boards by service date, each loaded once from Schedule/Line/All and every line schedule.
+
+    Today's board is built in the background at startup and again after
+    midnight; other dates load on first request. Boards missing line
+    schedules that failed to load are rebuilt in the background after
+    retry_interval while the partial board keeps serving.
+    """
+
+    def __init__(self, client: MetrolinxClient, concurrency: int, retry_interval: float, max_days: int):
+        self.client = client
+        self.concurrency = concurrency
+        self.retry_interval = retry_interval
+        self.max_days = max_days
+        self.last_error: Optional[str] = None
+        self._boards: "OrderedDict[str, DepartureBoard]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run(), name="departures")
+
+    async def stop(self):
+        tasks = list(self._loading.values())
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def get(self, service_date: str) -> DepartureBoard:
+        """The board for service_date (YYYY-MM-DD); raises DeparturesUnavailable"""
+        board = self._boards.get(service_date)
+        if board is None:
+            return await asyncio.shield(self._load(service_date))
+        self._boards.move_to_end(service_date)
+        if board.missing and time.monotonic() - board.built_at >= self.retry_interval:
+            self._load(service_date, Priority.BACKGROUND)
+        return board
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "days": {service_date: {"stops": len(board.stop_codes), "departures": board.size, "missing_lines": board.missing}
+                     for service_date, board in self._boards.items()},
+            "last_error": self.last_error,
+        }
+
+    def _load(self, service_date: str, priority: Optional[Priority] = None) -> asyncio.Task:
+        # Concurrent requests for an unloaded date share one build
+        task = self._loading.get(service_date)
+        if task is None:
+            task = asyncio.create_task(self._build(service_date, priority), name=f"departures:{service_date}")
+            self._loading[service_date] = task
+            task.add_done_callback(lambda _: self._loading.pop(service_date, None))
+            task.add_done_callback(self._loaded)
+        return task
+
+    def _loaded(self, task: asyncio.Task):
+        # Background rebuilds have no caller to see their failure
+        if not task.cancelled() and task.exception() is not None:
+            logger.info("Loading %s failed: %s", task.get_name(), task.exception())
+
+    async def _build(self, service_date: str, priority: Optional[Priority]) -> DepartureBoard:
+        try:
+            if priority is None:
+                schedules, missing = await self._fetch(service_date)
+            else:
+                with self.client.priority(priority):
+                    schedules, missing = await self._fetch(service_date)
+            board = await asyncio.to_thread(DepartureBoard, service_date, schedules, missing)
+        except asyncio.CancelledError:
+            raise
+        except (DeparturesUnavailable, httpx.HTTPStatusError) as e:
+            self.last_error = str(e)
+            raise
+        except Exception as e:
+            self.last_error = str(e) or type(e).__name__
+            raise DeparturesUnavailable(f"Departures for {service_date} unavailable: {self.last_error}") from e
+        self._boards[service_date] = board
+        self._boards.move_to_end(service_date)
+        while len(self._boards) > self.max_days:
+            self._boards.popitem(last=False)
+        if not missing:
+            self.last_error = None
+        return board
+
+    async def _fetch(self, service_date: str) -> Tuple[List[LineSchedule], int]:
+        raw = await self.client.get_lines_all(service_date)
+        variants = list(dict.fromkeys((line.code, line.direction) for line in self.client.transform(raw, transform.transform_lines)))
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def load(code: str, direction: str) -> Optional[LineSchedule]:
+            try:
+                async with semaphore:
+                    raw = await self.client.get_line_schedule(service_date, code, direction)
+                return self.client.transform(raw, transform.transform_line_schedule, code, direction, service_date)
+            except Exception as e:
+                self.last_error = f"{code} {direction}: {e}"
+                logger.info("Skipping schedule of %s %s on %s: %s", code, direction, service_date, e)
+                return None
+
+        results = await asyncio.gather(*(load(code, direction) for code, direction in variants))
+        schedules = [schedule for schedule in results if schedule is not None]
+        if variants and not schedules:
+            raise DeparturesUnavailable(f"Departures for {service_date} unavailable: no line schedule could be loaded")
+        return schedules, len(variants) - len(schedules)
+
+    async def _run(self):
+        while True:
+            try:
+                await self._load(date.today().isoformat(), Priority.BACKGROUND)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Building today's departures failed: %s", e)
+                await asyncio.sleep(self.retry_interval)
+                continue
+            now = datetime.now()
+            tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+            await asyncio.sleep((tomorrow - now).total_seconds() + 60)
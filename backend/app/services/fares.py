@@ -0,0 +1,150 @@
+"""
+Fare matrix: fares keyed by stop pair and operational day, filled lazily and persisted to disk
+"""
+import asyncio
+import json
+import logging
+import os
+from datetime import date
+from itertools import permutations
+from typing import Dict, List, Optional, Tuple
+from app.clients.metrolinx import MetrolinxClient
+from app.clients.ratelimit import Priority
+from app.models.journeys import Fare, FareResponse
+from app import transformers as transform
+
+logger = logging.getLogger(__name__)
+
+# (fare type, price in cents, currency); fare type and currency strings are interned
+CompactFare = Tuple[str, int, str]
+FareKey = Tuple[str, str, str]
+
+
+def _compact(fare: Fare) -> CompactFare:
+    return (fare.fare_type, round(fare.price * 100), fare.currency)
+
+
+class FareMatrix:
+    """Fares for (from_stop, to_stop, operational_day).
+
+    Requests without an operational day are keyed under today's date, so
+    entries naturally expire at the end of the day and are pruned on save.
+    """
+
+    def __init__(self, client: MetrolinxClient, path: Optional[str], save_interval: float, warmup_stops: List[str], concurrency: int):
+        self.client = client
+        self.path = path
+        self.save_interval = save_interval
+        self.warmup_stops = warmup_stops
+        self.concurrency = concurrency
+        self._fares: Dict[FareKey, Tuple[CompactFare, ...]] = {}
+        self._strings: Dict[str, str] = {}
+        self._dirty = False
+        self._tasks: List[asyncio.Task] = []
+
+    def __len__(self) -> int:
+        return len(self._fares)
+
+    async def start(self):
+        if self.path:
+            await asyncio.to_thread(self._load)
+            self._tasks.append(asyncio.create_task(self._save_periodically(), name="fare-matrix-save"))
+        if self.warmup_stops:
+            self._tasks.append(asyncio.create_task(self.warm_up(self.warmup_stops), name="fare-matrix-warmup"))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        if self.path and self._dirty:
+            await self.save()
+
+    async def get(self, from_stop: str, to_stop: str, operational_day: Optional[str] = None) -> FareResponse:
+        key = (from_stop, to_stop, operational_day or date.today().isoformat())
+        fares = self._fares.get(key)
+        if fares is None:
+            if operational_day:
+                raw = await self.client.get_fares(from_stop, to_stop, operational_day)
+            else:
+                raw = await self.client.get_fares(from_stop, to_stop)
+            response = self.client.transform(raw, transform.transform_fares, from_stop, to_stop, operational_day)
+            self._store(key, response.fares)
+            return response
+        return FareResponse(
+            from_stop=from_stop,
+            to_stop=to_stop,
+            operational_day=operational_day,
+            fares=[Fare(fare_type=fare_type, price=cents / 100, currency=currency) for fare_type, cents, currency in fares]
+        )
+
+    async def get_many(self, pairs: List[Tuple[str, str]], operational_day: Optional[str] = None) -> List[object]:
+        """FareResponse or the exception raised, per pair and in order"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def price(from_stop: str, to_stop: str):
+            async with semaphore:
+                return await self.get(from_stop, to_stop, operational_day)
+
+        return await asyncio.gather(*(price(from_stop, to_stop) for from_stop, to_stop in pairs), return_exceptions=True)
+
+    async def warm_up(self, stops: List[str], operational_day: Optional[str] = None):
+        """Price every ordered pair of the given stops"""
+        with self.client.priority(Priority.BACKGROUND):
+            results = await self.get_many(list(permutations(stops, 2)), operational_day)
+        failed = sum(isinstance(result, Exception) for result in results)
+        logger.info("Fare matrix warm-up priced %d pairs (%d failed)", len(results) - failed, failed)
+
+    def _store(self, key: FareKey, fares: List[Fare]):
+        self._fares[key] = tuple(
+            (self._intern(fare_type), cents, self._intern(currency))
+            for fare_type, cents, currency in map(_compact, fares)
+        )
+        self._dirty = True
+
+    def _intern(self, value: str) -> str:
+        return self._strings.setdefault(value, value)
+
+    def _prune(self):
+        today = date.today().isoformat()
+        for key in [key for key in self._fares if key[2] < today]:
+            del self._fares[key]
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                data = json.load(handle)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable fare matrix %s: %s", self.path, e)
+            return
+        for entry in data.get("fares", []):
+            from_stop, to_stop, day, fares = entry
+            self._fares[(from_stop, to_stop, day)] = tuple(
+                (self._intern(fare_type), int(cents), self._intern(currency)) for fare_type, cents, currency in fares
+            )
+        self._prune()
+
+    async def save(self):
+        # Snapshot on the event loop; only the file write runs in a thread
+        self._prune()
+        entries = [[*key, [list(fare) for fare in fares]] for key, fares in self._fares.items()]
+        self._dirty = False
+        try:
+            await asyncio.to_thread(self._write, entries)
+        except OSError as e:
+            self._dirty = True
+            logger.warning("Saving fare matrix to %s failed: %s", self.path, e)
+
+    def _write(self, entries: list):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump({"version": 1, "fares": entries}, handle, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    async def _save_periodically(self):
+        while True:
+            await asyncio.sleep(self.save_interval)
+            if self._dirty:
+                await self.save()
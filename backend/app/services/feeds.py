@@ -0,0 +1,91 @@
+"""
+Realtime feeds kept warm by the background refresher, or by the fetcher process for all workers
+"""
+from functools import wraps
+from typing import Any, Awaitable, Callable
+from app.clients.metrolinx import MetrolinxClient
+from app.clients.ratelimit import Priority
+from app.services.refresher import FeedRefresher
+from app.services.snapshots import SharedFeeds, SnapshotReader, SnapshotWriter
+from app.config import (
+    FEED_REFRESH_ALERTS,
+    FEED_REFRESH_UNION_DEPARTURES,
+    FEED_REFRESH_EXCEPTIONS,
+    FEED_MAX_AGE,
+    FEED_REFRESH_VEHICLES,
+    FEED_REFRESH_TRIP_UPDATES,
+    FEED_REFRESH_SERVICE_GLANCE,
+    VEHICLE_MAX_AGE,
+)
+from app import transformers as transform
+
+SERVICE_ALERTS = "service_alerts"
+INFORMATION_ALERTS = "information_alerts"
+UNION_DEPARTURES = "union_departures"
+EXCEPTIONS_TRAIN = "exceptions_train"
+EXCEPTIONS_BUS = "exceptions_bus"
+EXCEPTIONS_ALL = "exceptions_all"
+VEHICLE_POSITIONS = "vehicle_positions"
+TRIP_DELAYS = "trip_delays"
+SERVICE_TRAINS = "service_trains"
+SERVICE_BUSES = "service_buses"
+SERVICE_UPX = "service_upx"
+
+
+def _fresh(client: MetrolinxClient, method: Callable[[], Awaitable[Any]]) -> Callable[[], Awaitable[Any]]:
+    async def fetch():
+        # Readers are served the previous snapshot meanwhile, so refreshes can wait for user calls
+        with client.fresh(), client.priority(Priority.BACKGROUND):
+            return await method()
+    return fetch
+
+
+def _memoized(client: MetrolinxClient, fn: Callable[..., Any], *args: Any) -> Callable[[Any], Any]:
+    """Memoized transform, so an upstream 304 (same raw object) keeps the same result object"""
+    # One wrapper per feed, so feeds sharing a transformer keep separate memo entries
+    @wraps(fn)
+    def transform_feed(raw):
+        return fn(raw, *args)
+
+    def apply(raw):
+        return client.transform(raw, transform_feed)
+    return apply
+
+
+# name, client method, transformer and its extra arguments, refresh interval, max age override
+FEEDS = [
+    (SERVICE_ALERTS, "get_service_alerts", transform.transform_alerts, ("Service",), FEED_REFRESH_ALERTS, None),
+    (INFORMATION_ALERTS, "get_information_alerts", transform.transform_alerts, ("Information",), FEED_REFRESH_ALERTS, None),
+    (UNION_DEPARTURES, "get_union_departures", transform.transform_union_departures, (), FEED_REFRESH_UNION_DEPARTURES, None),
+    (EXCEPTIONS_TRAIN, "get_exceptions_train", transform.transform_exceptions, (), FEED_REFRESH_EXCEPTIONS, None),
+    (EXCEPTIONS_BUS, "get_exceptions_bus", transform.transform_exceptions, (), FEED_REFRESH_EXCEPTIONS, None),
+    (EXCEPTIONS_ALL, "get_exceptions_all", transform.transform_exceptions, (), FEED_REFRESH_EXCEPTIONS, None),
+    (VEHICLE_POSITIONS, "get_gtfs_vehicle_positions", transform.transform_vehicle_positions, (), FEED_REFRESH_VEHICLES, VEHICLE_MAX_AGE),
+    (TRIP_DELAYS, "get_gtfs_trip_updates", transform.transform_trip_delays, (), FEED_REFRESH_TRIP_UPDATES, VEHICLE_MAX_AGE),
+    (SERVICE_TRAINS, "get_service_trains", transform.index_service_trips, (), FEED_REFRESH_SERVICE_GLANCE, None),
+    (SERVICE_BUSES, "get_service_buses", transform.index_service_trips, (), FEED_REFRESH_SERVICE_GLANCE, None),
+    (SERVICE_UPX, "get_service_upx", transform.index_service_trips, (), FEED_REFRESH_SERVICE_GLANCE, None),
+]
+
+
+def _register(refresher: FeedRefresher, client: MetrolinxClient, raw: bool = False) -> FeedRefresher:
+    for name, method, fn, args, interval, max_age in FEEDS:
+        feed_transform = (lambda data: data) if raw else _memoized(client, fn, *args)
+        refresher.register(name, _fresh(client, getattr(client, method)), feed_transform, interval, max_age)
+    return refresher
+
+
+def build_refresher(client: MetrolinxClient) -> FeedRefresher:
+    """Feeds polled by this process"""
+    return _register(FeedRefresher(max_age=FEED_MAX_AGE), client)
+
+
+def build_fetcher(client: MetrolinxClient, directory: str) -> FeedRefresher:
+    """Untransformed feeds polled by the fetcher process and published to directory"""
+    writer = SnapshotWriter(directory)
+    return _register(FeedRefresher(max_age=FEED_MAX_AGE, on_refresh=writer.publish), client, raw=True)
+
+
+def build_shared(client: MetrolinxClient, directory: str) -> FeedRefresher:
+    """Feeds read from the fetcher's snapshots in directory; this process does not poll them"""
+    return _register(SharedFeeds(SnapshotReader(directory), max_age=FEED_MAX_AGE), client)
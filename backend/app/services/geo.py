@@ -0,0 +1,91 @@
+"""
+Small geographic helpers: great-circle distance and a uniform grid index
+"""
+import math
+from collections import defaultdict
+from typing import Dict, Generic, Hashable, Iterator, List, Optional, Tuple, TypeVar
+
+EARTH_RADIUS_KM = 6371.0088
+
+K = TypeVar("K", bound=Hashable)
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex(Generic[K]):
+    """Points bucketed into fixed-size lat/lon cells.
+
+    Radius and bounding-box queries only look at the cells that overlap both
+    the query area and the occupied extent; a query spanning more cells than
+    are populated walks the populated cells instead, so no box costs more
+    than a scan of the points.
+    """
+
+    def __init__(self, cell_deg: float = 0.02):
+        self.cell_deg = cell_deg
+        self._cells: Dict[Tuple[int, int], List[Tuple[K, float, float]]] = defaultdict(list)
+        self._size = 0
+        # Occupied extent in cells: (min row, min col, max row, max col)
+        self._extent: Optional[Tuple[int, int, int, int]] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def insert(self, key: K, lat: float, lon: float):
+        row, col = self._cell(lat, lon)
+        self._cells[(row, col)].append((key, lat, lon))
+        self._size += 1
+        if self._extent is None:
+            self._extent = (row, col, row, col)
+        else:
+            row_lo, col_lo, row_hi, col_hi = self._extent
+            self._extent = (min(row_lo, row), min(col_lo, col), max(row_hi, row), max(col_hi, col))
+
+    def in_bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> Iterator[Tuple[K, float, float]]:
+        if self._extent is None:
+            return
+        row_lo, col_lo = self._cell(min_lat, min_lon)
+        row_hi, col_hi = self._cell(max_lat, max_lon)
+        row_lo, col_lo = max(row_lo, self._extent[0]), max(col_lo, self._extent[1])
+        row_hi, col_hi = min(row_hi, self._extent[2]), min(col_hi, self._extent[3])
+        if row_lo > row_hi or col_lo > col_hi:
+            return
+        if (row_hi - row_lo + 1) * (col_hi - col_lo + 1) > len(self._cells):
+            cells = (points for (row, col), points in self._cells.items() if row_lo <= row <= row_hi and col_lo <= col <= col_hi)
+        else:
+            cells = (self._cells.get((row, col), ()) for row in range(row_lo, row_hi + 1) for col in range(col_lo, col_hi + 1))
+        for points in cells:
+            for key, lat, lon in points:
+                if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+                    yield key, lat, lon
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Tuple[K, float]]:
+        """(key, distance_km) for points within radius_km, nearest first"""
+        dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+        coslat = max(math.cos(math.radians(lat)), 1e-6)
+        dlon = min(180.0, dlat / coslat)
+        hits = []
+        for key, plat, plon in self.in_bbox(lat - dlat, lon - dlon, lat + dlat, lon + dlon):
+            distance = haversine_km(lat, lon, plat, plon)
+            if distance <= radius_km:
+                hits.append((key, distance))
+        hits.sort(key=lambda hit: hit[1])
+        return hits
+
+    def nearest(self, lat: float, lon: float, k: int, max_radius_km: float) -> List[Tuple[K, float]]:
+        """k nearest points no further than max_radius_km, nearest first"""
+        radius = min(1.0, max_radius_km)
+        while True:
+            hits = self.within(lat, lon, radius)
+            if len(hits) >= k or radius >= max_radius_km:
+                return hits[:k]
+            radius = min(radius * 2, max_radius_km)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
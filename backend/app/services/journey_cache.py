@@ -0,0 +1,172 @@
+"""
+Journey results cached per half-hour bucket and trimmed to each request, with prefetch of hot pairs
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+from app.clients.metrolinx import MetrolinxClient
+from app.clients.ratelimit import Priority
+from app.models.journeys import JourneyResponse
+from app.responses import memoized
+from app import transformers as transform
+
+logger = logging.getLogger(__name__)
+
+# (from stop, to stop, YYYYMMDD, bucket start HHMM)
+BucketKey = Tuple[str, str, str, str]
+
+_TRIMMED_MAX_ENTRIES = 1024
+
+# Journeys departing this long before the requested time are past midnight of the next day
+_WRAP_SECONDS = 12 * 60 * 60
+
+
+def _minutes(hhmm: str) -> int:
+    return int(hhmm[:2]) * 60 + int(hhmm[2:])
+
+
+class JourneyCache:
+    """Journeys for a bucket fetched once at the bucket start with the largest page size.
+
+    A request for (start_time, max_journeys) is answered from its bucket's
+    superset: journeys leaving at or after start_time, cut to max_journeys.
+    When the superset was cut off by the page size before enough journeys
+    were found, the request goes upstream as asked. A bucket requested
+    prefetch_hits times is hot, and the following bucket of that day is
+    fetched in the background before commuters ask for it.
+    """
+
+    def __init__(self, client: MetrolinxClient, bucket_minutes: int, ttl: float, fetch_size: int, prefetch_hits: int, max_entries: int):
+        self.client = client
+        self.bucket_minutes = bucket_minutes
+        self.ttl = ttl
+        self.fetch_size = fetch_size
+        self.prefetch_hits = prefetch_hits
+        self.max_entries = max_entries
+        # key -> (superset, expires at, requests served, (from stop, to stop) as sent upstream)
+        self._buckets: "OrderedDict[BucketKey, Tuple[JourneyResponse, float, int, Tuple[str, str]]]" = OrderedDict()
+        self._trimmed: "OrderedDict[Tuple, Tuple[JourneyResponse, JourneyResponse]]" = OrderedDict()
+        self._prefetching: Set[BucketKey] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.prefetches = 0
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def bucket(self, start_time: str) -> str:
+        start = _minutes(start_time) // self.bucket_minutes * self.bucket_minutes
+        return f"{start // 60:02d}{start % 60:02d}"
+
+    async def get(self, from_stop: str, to_stop: str, journey_date: str, start_time: str, max_journeys: int) -> JourneyResponse:
+        """Journeys as the upstream call with these arguments would return them; raises what the client raises"""
+        # Only the key is case-insensitive; upstream gets the codes as the caller wrote them
+        key = (from_stop.upper(), to_stop.upper(), journey_date, self.bucket(start_time))
+        cached = self._buckets.get(key)
+        if cached is not None and cached[1] > time.monotonic():
+            superset, expires_at, served, sent = cached
+            self._buckets[key] = (superset, expires_at, served + 1, sent)
+            self._buckets.move_to_end(key)
+            self.hits += 1
+            served += 1
+        else:
+            self.misses += 1
+            sent = (from_stop, to_stop)
+            superset = await self._fetch(key, sent, served=1)
+            served = 1
+        if served == self.prefetch_hits:
+            self._prefetch_next(key, sent)
+
+        trimmed = self._trim(superset, sent, from_stop, to_stop, start_time, max_journeys)
+        if trimmed is None:
+            self.bypassed += 1
+            raw = await self.client.get_journey(from_stop, to_stop, journey_date, start_time, max_journeys)
+            return self.client.transform(raw, transform.transform_journey, from_stop, to_stop, journey_date, start_time)
+        return trimmed
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "buckets": len(self._buckets),
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "prefetches": self.prefetches,
+        }
+
+    async def _fetch(self, key: BucketKey, sent: Tuple[str, str], served: int = 0) -> JourneyResponse:
+        _, _, journey_date, bucket = key
+        from_stop, to_stop = sent
+        raw = await self.client.get_journey(from_stop, to_stop, journey_date, bucket, self.fetch_size)
+        superset = self.client.transform(raw, transform.transform_journey, from_stop, to_stop, journey_date, bucket)
+        self._buckets[key] = (superset, time.monotonic() + self.ttl, served, sent)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_entries:
+            self._buckets.popitem(last=False)
+        return superset
+
+    def _trim(self, superset: JourneyResponse, sent: Tuple[str, str], from_stop: str, to_stop: str, start_time: str, max_journeys: int) -> Optional[JourneyResponse]:
+        """The request's share of superset, or None when superset cannot answer it"""
+        memo_key = (id(superset), from_stop, to_stop, start_time, max_journeys)
+        cached = self._trimmed.get(memo_key)
+        if cached is not None and cached[0] is superset:
+            self._trimmed.move_to_end(memo_key)
+            return memoized(cached[1])
+
+        earliest = _minutes(start_time) * 60
+        journeys = []
+        for journey in superset.journeys:
+            departs = transform.parse_seconds(journey.start_time)
+            if departs is not None and departs < earliest - _WRAP_SECONDS:
+                # A 00:30 departure found by a 23:50 search leaves after midnight, not before
+                departs += 24 * 60 * 60
+            if departs is None or departs >= earliest:
+                journeys.append(journey)
+        if len(journeys) < max_journeys and len(superset.journeys) >= self.fetch_size:
+            # Upstream stopped at the page size; later journeys may exist that the superset lacks
+            return None
+        update = {"start_time": start_time, "journeys": journeys[:max_journeys]}
+        # Where upstream echoed the codes it was sent, echo this caller's instead, as its own call would
+        if superset.from_stop == sent[0]:
+            update["from_stop"] = from_stop
+        if superset.to_stop == sent[1]:
+            update["to_stop"] = to_stop
+        trimmed = superset.model_copy(update=update)
+        # Holding superset keeps its id from being reused while memoized
+        self._trimmed[memo_key] = (superset, trimmed)
+        if len(self._trimmed) > _TRIMMED_MAX_ENTRIES:
+            self._trimmed.popitem(last=False)
+        return memoized(trimmed)
+
+    def _prefetch_next(self, key: BucketKey, sent: Tuple[str, str]):
+        from_stop, to_stop, journey_date, bucket = key
+        start = _minutes(bucket) + self.bucket_minutes
+        if start >= 24 * 60:
+            return
+        next_key = (from_stop, to_stop, journey_date, f"{start // 60:02d}{start % 60:02d}")
+        cached = self._buckets.get(next_key)
+        if next_key in self._prefetching or (cached is not None and cached[1] > time.monotonic()):
+            return
+        self._prefetching.add(next_key)
+        task = asyncio.create_task(self._prefetch(next_key, sent), name=f"journey-prefetch:{'/'.join(next_key)}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _prefetch(self, key: BucketKey, sent: Tuple[str, str]):
+        try:
+            # Nobody is waiting for it, so it queues behind user calls
+            with self.client.priority(Priority.BACKGROUND):
+                await self._fetch(key, sent)
+            self.prefetches += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info("Prefetching journeys %s failed: %s", "/".join(key), e)
+        finally:
+            self._prefetching.discard(key)
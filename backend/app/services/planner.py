@@ -0,0 +1,123 @@
+"""
+Local journey planning from GTFS static data, answered in the upstream JourneyResponse shape
+"""
+import asyncio
+import hashlib
+import logging
+from datetime import datetime
+from typing import Optional
+from app.models.journeys import JourneyResponse, JourneyService, JourneyTrip, JourneyStop
+from app.services.raptor import PlannedJourney, RaptorPlanner
+from app.services.timetable import ROUTE_TYPE_VEHICLE, Timetable, load_gtfs
+
+logger = logging.getLogger(__name__)
+
+
+def _clock(seconds: int) -> str:
+    return f"{(seconds // 3600) % 24:02d}:{(seconds % 3600) // 60:02d}"
+
+
+def _duration(seconds: int) -> str:
+    return f"{seconds // 3600:02d}:{(seconds % 3600) // 60:02d}"
+
+
+class LocalJourneyPlanner:
+    """Loads a GTFS static zip in the background and plans journeys with RAPTOR.
+
+    Until the timetable is loaded (or when no path is configured) plan()
+    returns None and callers fall back to the upstream journey API.
+    """
+
+    def __init__(self, path: Optional[str], max_transfers: int, min_transfer_seconds: int):
+        self.path = path
+        self.max_transfers = max_transfers
+        self.min_transfer_seconds = min_transfer_seconds
+        self.raptor: Optional[RaptorPlanner] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.raptor is not None
+
+    async def start(self):
+        if self.path:
+            self._task = asyncio.create_task(self._load(), name="gtfs-static")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _load(self):
+        try:
+            timetable = await asyncio.to_thread(load_gtfs, self.path)
+        except Exception as e:
+            logger.error("Loading GTFS static feed %s failed: %s", self.path, e)
+            return
+        self.raptor = RaptorPlanner(timetable, self.max_transfers, self.min_transfer_seconds)
+        logger.info("Loaded GTFS timetable: %d stops, %d trips, %d patterns",
+                    len(timetable.stop_ids), len(timetable.trip_ids), len(timetable.pattern_stops))
+
+    def plan(self, from_stop: str, to_stop: str, journey_date: str, start_time: str, max_journeys: int) -> Optional[JourneyResponse]:
+        """Plan from normalized YYYYMMDD / HHMM inputs; None when there is no local answer"""
+        if self.raptor is None:
+            return None
+        try:
+            day = datetime.strptime(journey_date, "%Y%m%d").date()
+        except ValueError:
+            return None
+        depart_after = int(start_time[:2]) * 3600 + int(start_time[2:]) * 60
+        planned = self.raptor.plan(from_stop, to_stop, day, depart_after, max_journeys)
+        if not planned:
+            return None
+        return JourneyResponse(
+            from_stop=from_stop,
+            to_stop=to_stop,
+            date=journey_date,
+            start_time=start_time,
+            journeys=[self._journey_service(journey) for journey in planned]
+        )
+
+    def _journey_service(self, journey: PlannedJourney) -> JourneyService:
+        tt: Timetable = self.raptor.tt
+        trips = []
+        trip_ids = []
+        color = None
+        for leg in journey.legs:
+            stops = tt.pattern_stops[leg.pattern]
+            width = len(stops)
+            trip = tt.pattern_trips[leg.pattern][leg.trip_slot]
+            route = tt.trip_routes[trip]
+            base = leg.trip_slot * width
+            color = color or tt.route_colors[route]
+            trip_ids.append(tt.trip_ids[trip])
+            trips.append(JourneyTrip(
+                number=tt.trip_numbers[trip],
+                display=tt.trip_headsigns[trip] or tt.route_long_names[route],
+                line=tt.route_short_names[route],
+                direction=tt.trip_directions[trip],
+                vehicle_type=ROUTE_TYPE_VEHICLE.get(tt.route_types[route], "T"),
+                depart_from_code=tt.stop_ids[stops[leg.board_position]],
+                destination_stop_code=tt.stop_ids[stops[width - 1]],
+                stops=[
+                    JourneyStop(
+                        code=tt.stop_ids[stops[position]],
+                        order=position + 1,
+                        time=_clock(tt.pattern_departures[leg.pattern][base + position]
+                                    if position == leg.board_position
+                                    else tt.pattern_arrivals[leg.pattern][base + position]),
+                        is_major=position in (leg.board_position, leg.alight_position)
+                    )
+                    for position in range(leg.board_position, leg.alight_position + 1)
+                ]
+            ))
+        return JourneyService(
+            trip_hash=hashlib.sha1("|".join(trip_ids).encode()).hexdigest()[:16],
+            color=color,
+            start_time=_clock(journey.departure),
+            end_time=_clock(journey.arrival),
+            duration=_duration(journey.arrival - journey.departure),
+            transfer_count=max(0, len(trips) - 1),
+            trips=trips
+        )
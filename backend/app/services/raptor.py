@@ -0,0 +1,203 @@
+"""
+RAPTOR journey planner over a GTFS Timetable
+"""
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional, Set
+from app.services.timetable import Timetable
+
+INFINITY = 1 << 30
+
+
+@dataclass
+class Leg:
+    pattern: int
+    trip_slot: int
+    board_position: int
+    alight_position: int
+
+
+@dataclass
+class PlannedJourney:
+    departure: int
+    arrival: int
+    legs: List[Leg]
+
+
+class _TripLabel:
+    __slots__ = ("leg", "board_stop")
+
+    def __init__(self, leg: Leg, board_stop: int):
+        self.leg = leg
+        self.board_stop = board_stop
+
+
+class _WalkLabel:
+    __slots__ = ("from_stop",)
+
+    def __init__(self, from_stop: int):
+        self.from_stop = from_stop
+
+
+class RaptorPlanner:
+    """Earliest-arrival RAPTOR (Delling et al.) with a minimum change time between trips"""
+
+    def __init__(self, timetable: Timetable, max_transfers: int = 4, min_transfer_seconds: int = 180):
+        self.tt = timetable
+        self.max_rounds = max_transfers + 1
+        self.min_transfer_seconds = min_transfer_seconds
+
+    def plan(self, origin: str, destination: str, day: date, depart_after: int, max_journeys: int) -> List[PlannedJourney]:
+        """Up to max_journeys successive earliest-arrival journeys departing at or after depart_after"""
+        source = self.tt.stop_index(origin)
+        target = self.tt.stop_index(destination)
+        if source is None or target is None or source == target:
+            return []
+        services = self.tt.services_on(day)
+
+        journeys: List[PlannedJourney] = []
+        departure = depart_after
+        while len(journeys) < max_journeys:
+            journey = self._earliest_arrival(source, target, services, departure)
+            if journey is None:
+                break
+            if journeys and journey.arrival <= journeys[-1].arrival:
+                # Leaving later and arriving no later dominates the previous option
+                journeys[-1] = journey
+            else:
+                journeys.append(journey)
+            departure = journey.departure + 60
+        return journeys
+
+    def _earliest_arrival(self, source: int, target: int, services: Set[int], depart_after: int) -> Optional[PlannedJourney]:
+        tt = self.tt
+        best = [INFINITY] * len(tt.stop_ids)
+        previous = {source: depart_after}
+        labels: List[Dict[int, object]] = [{source: None}]
+        best[source] = depart_after
+
+        marked = {source}
+        # Walk labels live apart from trip labels, so a footpath never hides the trip it continues
+        walks: List[Dict[int, _WalkLabel]] = [{}]
+        for stop, seconds in tt.footpaths[source]:
+            arrival = depart_after + seconds
+            if arrival < best[stop]:
+                best[stop] = previous[stop] = arrival
+                walks[0][stop] = _WalkLabel(source)
+                marked.add(stop)
+
+        for round_number in range(1, self.max_rounds + 1):
+            slack = self.min_transfer_seconds if round_number > 1 else 0
+            queue: Dict[int, int] = {}
+            for stop in marked:
+                for pattern, position in tt.stop_patterns[stop]:
+                    if position < queue.get(pattern, INFINITY):
+                        queue[pattern] = position
+
+            # Changing between trips at the same stop needs min_transfer_seconds
+            ready = {
+                stop: arrival + (slack if isinstance(self._latest_label(labels, walks, stop), _TripLabel) else 0)
+                for stop, arrival in previous.items()
+            }
+            current: Dict[int, int] = {}
+            round_labels: Dict[int, object] = {}
+            round_walks: Dict[int, _WalkLabel] = {}
+            marked = set()
+            for pattern, first_position in queue.items():
+                self._scan_pattern(pattern, first_position, ready, current, best, target, services, round_labels, marked)
+
+            # One footpath per round, from the trip arrivals of this round; walks do not chain
+            for stop, reached in [(stop, current[stop]) for stop in marked]:
+                for other, seconds in tt.footpaths[stop]:
+                    arrival = reached + seconds
+                    if arrival < best[other] and arrival < best[target]:
+                        best[other] = current[other] = arrival
+                        round_walks[other] = _WalkLabel(stop)
+                        marked.add(other)
+
+            labels.append(round_labels)
+            walks.append(round_walks)
+            if not marked:
+                break
+            previous = {**previous, **current}
+
+        if best[target] >= INFINITY or not any(target in labels[r] or target in walks[r] for r in range(1, len(labels))):
+            return None
+        return self._reconstruct(labels, walks, len(labels) - 1, target, best[target])
+
+    @staticmethod
+    def _latest_label(labels: List[Dict[int, object]], walks: List[Dict[int, "_WalkLabel"]], stop: int) -> object:
+        for round_number in range(len(labels) - 1, -1, -1):
+            # A walk relaxed after the trips of its round, so it is the later label
+            if stop in walks[round_number]:
+                return walks[round_number][stop]
+            if stop in labels[round_number]:
+                return labels[round_number][stop]
+        return None
+
+    def _scan_pattern(self, pattern, first_position, ready, current, best, target, services, round_labels, marked):
+        tt = self.tt
+        stops = tt.pattern_stops[pattern]
+        trips = tt.pattern_trips[pattern]
+        arrivals = tt.pattern_arrivals[pattern]
+        departures = tt.pattern_departures[pattern]
+        width = len(stops)
+
+        slot = -1
+        board_position = -1
+        for position in range(first_position, width):
+            stop = stops[position]
+            if slot >= 0:
+                arrival = arrivals[slot * width + position]
+                if arrival < best[stop] and arrival < best[target]:
+                    best[stop] = current[stop] = arrival
+                    round_labels[stop] = _TripLabel(Leg(pattern, slot, board_position, position), stops[board_position])
+                    marked.add(stop)
+            ready_at = ready.get(stop)
+            if ready_at is None:
+                continue
+            if slot >= 0 and departures[slot * width + position] <= ready_at:
+                continue
+            candidate = self._earliest_trip(trips, departures, width, position, ready_at, services, slot)
+            if candidate >= 0:
+                slot = candidate
+                board_position = position
+
+    def _earliest_trip(self, trips, departures, width, position, ready, services, current_slot) -> int:
+        """First running trip slot departing position at or after ready (trips assumed not to overtake)"""
+        tt = self.tt
+        lo, hi = 0, len(trips) if current_slot < 0 else current_slot
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if departures[mid * width + position] < ready:
+                lo = mid + 1
+            else:
+                hi = mid
+        end = len(trips) if current_slot < 0 else current_slot
+        for slot in range(lo, end):
+            if tt.trip_services[trips[slot]] in services and departures[slot * width + position] >= ready:
+                return slot
+        return -1
+
+    def _reconstruct(self, labels, walks, round_number, target, arrival) -> PlannedJourney:
+        legs: List[Leg] = []
+        stop = target
+        while round_number > 0:
+            # A stop keeps its arrival from the last round that improved it
+            while stop not in labels[round_number] and stop not in walks[round_number]:
+                round_number -= 1
+            if round_number == 0:
+                break
+            walk = walks[round_number].get(stop)
+            if walk is not None:
+                stop = walk.from_stop
+            label = labels[round_number][stop]
+            legs.append(label.leg)
+            stop = label.board_stop
+            round_number -= 1
+        legs.reverse()
+
+        first = legs[0]
+        width = len(self.tt.pattern_stops[first.pattern])
+        departure = self.tt.pattern_departures[first.pattern][first.trip_slot * width + first.board_position]
+        return PlannedJourney(departure=departure, arrival=arrival, legs=legs)
@@ -0,0 +1,123 @@
+"""
+Background stale-while-revalidate refresher for realtime feeds
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class FeedUnavailable(Exception):
+    """Raised when a feed has no data, or only data older than the allowed maximum age"""
+
+
+@dataclass
+class FeedSnapshot:
+    data: Any
+    fetched_at: float
+    version: int
+
+    @property
+    def age(self) -> float:
+        return max(0.0, time.time() - self.fetched_at)
+
+
+@dataclass
+class Feed:
+    name: str
+    fetch: Callable[[], Awaitable[Any]]
+    transform: Callable[[Any], Any]
+    interval: float
+    max_age: Optional[float] = None
+    snapshot: Optional[FeedSnapshot] = None
+    last_error: Optional[str] = None
+    loaded: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class FeedRefresher:
+    """Polls registered feeds on a schedule and keeps their last good transformed result.
+
+    Readers never trigger upstream calls: they get the latest snapshot, which is
+    kept on refresh failures until it is older than max_age. on_refresh is
+    called after every attempt, e.g. to publish snapshots to other processes.
+    """
+
+    def __init__(self, max_age: float, on_refresh: Optional[Callable[[Feed], None]] = None):
+        self.max_age = max_age
+        self.on_refresh = on_refresh
+        self._feeds: Dict[str, Feed] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def register(self, name: str, fetch: Callable[[], Awaitable[Any]], transform: Callable[[Any], Any], interval: float, max_age: Optional[float] = None):
+        """Poll a feed every interval seconds; max_age overrides the refresher-wide limit"""
+        self._feeds[name] = Feed(name=name, fetch=fetch, transform=transform, interval=interval, max_age=max_age)
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._feeds)
+
+    async def start(self):
+        for feed in self._feeds.values():
+            self._tasks.append(asyncio.create_task(self._run(feed), name=f"refresh:{feed.name}"))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def get(self, name: str) -> FeedSnapshot:
+        """Latest snapshot for a feed; only waits if the first load is still running"""
+        feed = self._feeds[name]
+        if feed.snapshot is None:
+            await feed.loaded.wait()
+        return self._current(feed)
+
+    def _current(self, feed: Feed) -> FeedSnapshot:
+        name = feed.name
+        snapshot = feed.snapshot
+        if snapshot is None:
+            raise FeedUnavailable(f"{name} feed unavailable: {feed.last_error}")
+        max_age = feed.max_age if feed.max_age is not None else self.max_age
+        if snapshot.age > max_age:
+            raise FeedUnavailable(f"{name} feed is {int(snapshot.age)}s old: {feed.last_error}")
+        return snapshot
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            name: {
+                "age": round(feed.snapshot.age, 1) if feed.snapshot else None,
+                "version": feed.snapshot.version if feed.snapshot else 0,
+                "last_error": feed.last_error,
+            }
+            for name, feed in self._feeds.items()
+        }
+
+    async def refresh(self, feed: Feed):
+        try:
+            raw = await feed.fetch()
+            data = feed.transform(raw)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            feed.last_error = str(e) or type(e).__name__
+            logger.warning("Refreshing %s feed failed: %s", feed.name, feed.last_error)
+        else:
+            version = feed.snapshot.version if feed.snapshot else 0
+            # Transforms are memoized, so unchanged upstream data keeps the same object and version
+            if feed.snapshot is None or data is not feed.snapshot.data:
+                version += 1
+            feed.snapshot = FeedSnapshot(data=data, fetched_at=time.time(), version=version)
+            feed.last_error = None
+        finally:
+            feed.loaded.set()
+        if self.on_refresh is not None:
+            self.on_refresh(feed)
+
+    async def _run(self, feed: Feed):
+        while True:
+            await self.refresh(feed)
+            await asyncio.sleep(feed.interval)
@@ -0,0 +1,180 @@
+"""
+Feed snapshots published by a single fetcher process and read by every worker through mmap
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+from app.clients.metrolinx import decode_body
+from app.responses import dumps
+from app.services.refresher import Feed, FeedRefresher, FeedSnapshot
+
+logger = logging.getLogger(__name__)
+
+# magic, version, fetched_at, metadata length, body length
+_HEADER = struct.Struct("<8sQdII")
+_MAGIC = b"GOFEED01"
+
+
+@dataclass
+class Published:
+    version: int
+    fetched_at: float
+    content_type: str
+    error: Optional[str]
+    # View into the mapped file, copied only when a new version is decoded
+    body: memoryview
+
+
+def _path(directory: str, name: str) -> str:
+    return os.path.join(directory, f"{name}.snapshot")
+
+
+def _encode(raw: Any) -> Tuple[bytes, str]:
+    if hasattr(raw, "SerializeToString"):
+        return raw.SerializeToString(), "application/x-protobuf"
+    return dumps(raw), "application/json"
+
+
+class SnapshotWriter:
+    """Writes each feed to <directory>/<name>.snapshot, replacing the file atomically.
+
+    Versions continue from the files already present, so a restarted fetcher
+    does not make workers believe data went backwards. Point the directory at
+    tmpfs (e.g. /dev/shm) to keep snapshots in shared memory.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._versions: Dict[str, int] = {}
+        # name -> (refresher version, encoded body, content type)
+        self._encoded: Dict[str, Tuple[int, bytes, str]] = {}
+
+    def publish(self, feed: Feed):
+        """Refresh hook: rewrite the snapshot with its new fetch time, version and last error"""
+        snapshot = feed.snapshot
+        if snapshot is None:
+            return
+        encoded = self._encoded.get(feed.name)
+        if encoded is None or encoded[0] != snapshot.version:
+            body, content_type = _encode(snapshot.data)
+            encoded = self._encoded[feed.name] = (snapshot.version, body, content_type)
+            self._versions[feed.name] = self._published_version(feed.name) + 1
+        _, body, content_type = encoded
+        metadata = json.dumps({"content_type": content_type, "error": feed.last_error}).encode("utf-8")
+        header = _HEADER.pack(_MAGIC, self._versions[feed.name], snapshot.fetched_at, len(metadata), len(body))
+        try:
+            self._replace(_path(self.directory, feed.name), header + metadata + body)
+        except OSError as e:
+            logger.warning("Publishing %s snapshot failed: %s", feed.name, e)
+
+    def _published_version(self, name: str) -> int:
+        if name in self._versions:
+            return self._versions[name]
+        try:
+            with open(_path(self.directory, name), "rb") as handle:
+                magic, version, *_ = _HEADER.unpack(handle.read(_HEADER.size))
+        except (OSError, struct.error):
+            return 0
+        return version if magic == _MAGIC else 0
+
+    def _replace(self, path: str, content: bytes):
+        # Readers keep their mapping of the old file until they notice the new one
+        fd, temporary = tempfile.mkstemp(dir=self.directory, prefix=".publish-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(content)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+
+class SnapshotReader:
+    """Maps published snapshot files, remapping a feed only after the fetcher replaced it"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        # name -> ((inode, mtime), mapping)
+        self._maps: Dict[str, Tuple[Tuple[int, int], mmap.mmap]] = {}
+
+    def read(self, name: str) -> Optional[Published]:
+        path = _path(self.directory, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        identity = (stat.st_ino, stat.st_mtime_ns)
+        mapped = self._maps.get(name)
+        if mapped is None or mapped[0] != identity:
+            with open(path, "rb") as handle:
+                mapping = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            # The previous mapping is released once no decoded view refers to it
+            mapped = self._maps[name] = (identity, mapping)
+        mapping = mapped[1]
+        magic, version, fetched_at, metadata_length, body_length = _HEADER.unpack_from(mapping, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a feed snapshot")
+        start = _HEADER.size + metadata_length
+        metadata = json.loads(mapping[_HEADER.size:start])
+        return Published(
+            version=version,
+            fetched_at=fetched_at,
+            content_type=metadata["content_type"],
+            error=metadata["error"],
+            body=memoryview(mapping)[start:start + body_length]
+        )
+
+
+class SharedFeeds(FeedRefresher):
+    """Feeds served from snapshots published by the fetcher process (python -m app.fetcher).
+
+    Workers make no upstream calls for these feeds. Each get() only checks
+    the snapshot header; the body is decoded and transformed again only when
+    its version changes, so unchanged data keeps the same result object
+    (and the memoized ETag rendering) just as with in-process polling.
+    """
+
+    def __init__(self, reader: SnapshotReader, max_age: float):
+        super().__init__(max_age)
+        self.reader = reader
+
+    async def start(self):
+        pass
+
+    async def get(self, name: str) -> FeedSnapshot:
+        feed = self._feeds[name]
+        self._load(feed)
+        return self._current(feed)
+
+    def status(self) -> Dict[str, Any]:
+        for feed in self._feeds.values():
+            self._load(feed)
+        return super().status()
+
+    def _load(self, feed: Feed):
+        try:
+            published = self.reader.read(feed.name)
+        except (OSError, ValueError) as e:
+            feed.last_error = f"unreadable snapshot: {e}"
+            return
+        if published is None:
+            feed.last_error = "not published by the fetcher yet"
+            return
+        snapshot = feed.snapshot
+        if snapshot is None or snapshot.version != published.version:
+            try:
+                data = feed.transform(decode_body(bytes(published.body), published.content_type))
+            except Exception as e:
+                feed.last_error = str(e) or type(e).__name__
+                logger.warning("Loading %s snapshot version %d failed: %s", feed.name, published.version, feed.last_error)
+                return
+            feed.snapshot = FeedSnapshot(data=data, fetched_at=published.fetched_at, version=published.version)
+        elif snapshot.fetched_at != published.fetched_at:
+            feed.snapshot = FeedSnapshot(data=snapshot.data, fetched_at=published.fetched_at, version=snapshot.version)
+        feed.last_error = published.error
@@ -0,0 +1,155 @@
+"""
+In-memory stop index for name search and nearest-stop queries
+"""
+import asyncio
+import difflib
+import logging
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from app.clients.metrolinx import MetrolinxClient
+from app.clients.ratelimit import Priority
+from app.models.stops import Stop
+from app.services.geo import GridIndex
+from app import transformers as transform
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class StopIndexUnavailable(Exception):
+    """Raised when the stop index has not been built yet"""
+
+
+def _words(name: str) -> List[str]:
+    return _WORD.findall(name.lower())
+
+
+class StopIndex:
+    """Immutable snapshot of all stops, indexed by name and by location"""
+
+    def __init__(self, stops: List[Stop], coordinates: Dict[str, Tuple[float, float]]):
+        self.stops: Dict[str, Stop] = {stop.id: stop for stop in stops}
+        self.coordinates = {code: coords for code, coords in coordinates.items() if code in self.stops}
+
+        self._names = sorted((stop.name.lower(), stop.id) for stop in stops)
+        self._words = sorted({(word, stop.id) for stop in stops for word in _words(stop.name)})
+        # Fuzzy matching runs against whole names and single words ("unoin" -> "union")
+        self._ids_by_term: Dict[str, List[str]] = defaultdict(list)
+        for term, code in self._names + self._words:
+            self._ids_by_term[term].append(code)
+
+        self._grid: GridIndex[str] = GridIndex()
+        for code, (lat, lon) in self.coordinates.items():
+            self._grid.insert(code, lat, lon)
+
+    @property
+    def has_coordinates(self) -> bool:
+        return bool(self.coordinates)
+
+    def search(self, query: str, limit: int) -> List[Stop]:
+        """Stop code, then name prefix, then word prefix, then fuzzy name matches"""
+        q = query.strip().lower()
+        found: Dict[str, None] = {}
+
+        if q.upper() in self.stops:
+            found[q.upper()] = None
+        for sorted_keys in (self._names, self._words):
+            i = bisect_left(sorted_keys, (q, ""))
+            while i < len(sorted_keys) and sorted_keys[i][0].startswith(q) and len(found) < limit:
+                found.setdefault(sorted_keys[i][1])
+                i += 1
+        if len(found) < limit:
+            for term in difflib.get_close_matches(q, self._ids_by_term.keys(), n=limit, cutoff=0.6):
+                for code in self._ids_by_term[term]:
+                    found.setdefault(code)
+
+        return [self.stops[code] for code in list(found)[:limit]]
+
+    def nearby(self, lat: float, lon: float, radius_km: float, limit: int) -> List[Tuple[Stop, float, float, float]]:
+        """(stop, latitude, longitude, distance_km) for the nearest stops within radius_km"""
+        results = []
+        for code, distance in self._grid.nearest(lat, lon, limit, radius_km):
+            stop_lat, stop_lon = self.coordinates[code]
+            results.append((self.stops[code], stop_lat, stop_lon, distance))
+        return results
+
+
+class StopIndexManager:
+    """Builds the StopIndex in the background and rebuilds it periodically.
+
+    The name index is published as soon as Stop/All is loaded; coordinates
+    from Stop/Details follow once they have all been fetched.
+    """
+
+    def __init__(self, client: MetrolinxClient, refresh_interval: float, retry_interval: float, details_concurrency: int):
+        self.client = client
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.details_concurrency = details_concurrency
+        self.index: Optional[StopIndex] = None
+        self.last_error: Optional[str] = None
+        self._loaded = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run(), name="stop-index")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def get(self) -> StopIndex:
+        if self.index is None:
+            await self._loaded.wait()
+        if self.index is None:
+            raise StopIndexUnavailable(f"Stop index unavailable: {self.last_error}")
+        return self.index
+
+    async def build(self):
+        with self.client.priority(Priority.BACKGROUND):
+            raw = await self.client.get_stops_all()
+            stops = transform.transform_stops(raw)
+            # Keep serving the previous coordinates while the new ones load
+            previous = self.index.coordinates if self.index else {}
+            self.index = StopIndex(stops, previous)
+            self._loaded.set()
+            self.index = StopIndex(stops, await self._load_coordinates(stops))
+
+    async def _load_coordinates(self, stops: List[Stop]) -> Dict[str, Tuple[float, float]]:
+        semaphore = asyncio.Semaphore(self.details_concurrency)
+
+        async def load(code: str) -> Optional[Tuple[float, float]]:
+            try:
+                async with semaphore:
+                    raw = await self.client.get_stop_details(code)
+                details = transform.transform_stop_details(raw, code)
+            except Exception as e:
+                logger.debug("Skipping coordinates for stop %s: %s", code, e)
+                return None
+            if details.latitude is None or details.longitude is None:
+                return None
+            return details.latitude, details.longitude
+
+        codes = [stop.id for stop in stops if stop.id]
+        results = await asyncio.gather(*(load(code) for code in codes))
+        return {code: coords for code, coords in zip(codes, results) if coords is not None}
+
+    async def _run(self):
+        while True:
+            try:
+                await self.build()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e) or type(e).__name__
+                logger.warning("Building stop index failed: %s", self.last_error)
+                self._loaded.set()
+                await asyncio.sleep(self.retry_interval)
+            else:
+                self.last_error = None
+                await asyncio.sleep(self.refresh_interval)
@@ -0,0 +1,176 @@
+"""
+Server-sent event subscriptions: one poller per topic, fanning diffs out to every subscriber
+"""
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+from pydantic import BaseModel
+from app.clients.metrolinx import MetrolinxClient
+from app.responses import dumps
+from app.services import feeds as feed_names
+from app.services.refresher import FeedRefresher
+from app import transformers as transform
+
+logger = logging.getLogger(__name__)
+
+KEEPALIVE = b": keepalive\n\n"
+
+
+class TooManyTopics(Exception):
+    """Raised when a new topic would exceed the configured number of pollers"""
+
+
+def _event(kind: str, version: int, payload: Any) -> bytes:
+    return f"event: {kind}\nid: {version}\ndata: ".encode() + dumps(payload) + b"\n\n"
+
+
+class Topic:
+    """Polls one source and keeps its entries keyed, publishing changes as SSE events.
+
+    Every subscriber first receives a full snapshot, then diffs of the entries
+    that were added or changed and the keys that disappeared. Events are
+    rendered once and shared by all subscriber queues.
+    """
+
+    def __init__(self, name: str, fetch: Callable[[], Awaitable[List[BaseModel]]], key: Callable[[Any], str], interval: float, queue_size: int, on_idle: Callable[["Topic"], None]):
+        self.name = name
+        self.fetch = fetch
+        self.key = key
+        self.interval = interval
+        self.queue_size = queue_size
+        self.on_idle = on_idle
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.version = 0
+        self._entries: Dict[str, dict] = {}
+        self._last: Optional[List[BaseModel]] = None
+        self._snapshot_event: Optional[bytes] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name=f"subscription:{self.name}")
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        if self._snapshot_event is not None:
+            queue.put_nowait(self._snapshot_event)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+    def update(self, entries: List[BaseModel]):
+        # Memoized transforms and feed snapshots hand back the same list while nothing changed
+        if entries is self._last:
+            return
+        self._last = entries
+        current = {self.key(entry): entry.model_dump() for entry in entries}
+        changed = {key: entry for key, entry in current.items() if self._entries.get(key) != entry}
+        removed = [key for key in self._entries if key not in current]
+        first = self.version == 0
+        if not first and not changed and not removed:
+            return
+
+        self._entries = current
+        self.version += 1
+        self._snapshot_event = _event("snapshot", self.version, {"entries": current})
+        if first:
+            self._publish(self._snapshot_event)
+        else:
+            self._publish(_event("diff", self.version, {"changed": changed, "removed": removed}))
+
+    def _publish(self, event: bytes):
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow consumer: drop its backlog and resync it from the full snapshot
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self._snapshot_event)
+
+    async def _run(self):
+        idle_polls = 0
+        while True:
+            # Normally the last subscriber stops the topic; this catches streams that never started
+            idle_polls = idle_polls + 1 if not self.subscribers else 0
+            if idle_polls > 2:
+                self._task = None
+                self.on_idle(self)
+                return
+            try:
+                self.update(await self.fetch())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Polling %s for subscribers failed: %s", self.name, str(e) or type(e).__name__)
+            await asyncio.sleep(self.interval)
+
+
+def _next_service_key(line: Any) -> str:
+    return line.trip_number or f"{line.line_code}|{line.direction_name}|{line.scheduled_departure_time}"
+
+
+class SubscriptionHub:
+    """Topics are started by their first subscriber and stopped when the last one leaves"""
+
+    def __init__(self, client: MetrolinxClient, feeds: FeedRefresher, interval: float, heartbeat: float, queue_size: int, max_topics: int):
+        self.client = client
+        self.feeds = feeds
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.queue_size = queue_size
+        self.max_topics = max_topics
+        self._topics: Dict[str, Topic] = {}
+
+    def next_service(self, stop_code: str) -> AsyncIterator[bytes]:
+        async def fetch():
+            raw = await self.client.get_stop_next_service(stop_code)
+            return self.client.transform(raw, transform.transform_next_service, stop_code).lines
+        return self._stream(self._topic(f"next_service:{stop_code}", fetch, _next_service_key))
+
+    def union_departures(self) -> AsyncIterator[bytes]:
+        async def fetch():
+            return (await self.feeds.get(feed_names.UNION_DEPARTURES)).data
+        return self._stream(self._topic("union_departures", fetch, lambda departure: departure.trip_number))
+
+    async def stop(self):
+        for topic in self._topics.values():
+            topic.stop()
+        self._topics.clear()
+
+    def status(self) -> Dict[str, int]:
+        return {name: len(topic.subscribers) for name, topic in self._topics.items()}
+
+    def _topic(self, name: str, fetch: Callable[[], Awaitable[List[BaseModel]]], key: Callable[[Any], str]) -> Topic:
+        topic = self._topics.get(name)
+        if topic is None:
+            if len(self._topics) >= self.max_topics:
+                raise TooManyTopics(f"At most {self.max_topics} subscription topics can be active")
+            topic = Topic(name, fetch, key, self.interval, self.queue_size, self._remove)
+            self._topics[name] = topic
+            topic.start()
+        return topic
+
+    async def _stream(self, topic: Topic) -> AsyncIterator[bytes]:
+        queue = topic.subscribe()
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE
+        finally:
+            topic.unsubscribe(queue)
+            if not topic.subscribers:
+                topic.stop()
+                self._remove(topic)
+
+    def _remove(self, topic: Topic):
+        if self._topics.get(topic.name) is topic:
+            del self._topics[topic.name]
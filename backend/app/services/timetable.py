@@ -0,0 +1,208 @@
+"""
+Compact array-backed timetable loaded from a GTFS static zip
+"""
+import csv
+import io
+import zipfile
+from array import array
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+# GTFS route_type -> vehicle type code used by the Metrolinx journey API
+ROUTE_TYPE_VEHICLE = {2: "T", 3: "B"}
+
+_WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+
+def parse_gtfs_time(value: str) -> int:
+    """'HH:MM:SS' (hours may exceed 24) -> seconds after midnight of the service day"""
+    hours, minutes, seconds = value.strip().split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+def _read(archive: zipfile.ZipFile, name: str) -> Iterator[Dict[str, str]]:
+    if name not in archive.namelist():
+        return iter(())
+    handle = io.TextIOWrapper(archive.open(name), encoding="utf-8-sig", newline="")
+    return csv.DictReader(handle)
+
+
+class Timetable:
+    """Trips grouped into patterns (trips sharing the same stop sequence).
+
+    Times of a pattern are stored trip-major in flat int arrays, so the time
+    of trip slot t at stop position i is times[t * len(stops) + i]. Trips in a
+    pattern are ordered by their departure from the first stop.
+    """
+
+    def __init__(self):
+        self.stop_ids: List[str] = []
+        self.stop_names: List[str] = []
+        self.stop_lookup: Dict[str, int] = {}
+
+        self.route_short_names: List[str] = []
+        self.route_long_names: List[str] = []
+        self.route_types: List[int] = []
+        self.route_colors: List[Optional[str]] = []
+
+        self.trip_ids: List[str] = []
+        self.trip_numbers: List[str] = []
+        self.trip_headsigns: List[str] = []
+        self.trip_directions: List[str] = []
+        self.trip_routes = array("i")
+        self.trip_services = array("i")
+
+        self.pattern_stops: List[array] = []
+        self.pattern_trips: List[array] = []
+        self.pattern_arrivals: List[array] = []
+        self.pattern_departures: List[array] = []
+        # stop -> [(pattern, position in pattern)]
+        self.stop_patterns: List[List[Tuple[int, int]]] = []
+        # stop -> [(other stop, walking seconds)]
+        self.footpaths: List[List[Tuple[int, int]]] = []
+
+        self.service_ids: List[str] = []
+        self._calendar: Dict[int, Tuple[date, date, Tuple[bool, ...]]] = {}
+        self._added: Dict[date, Set[int]] = defaultdict(set)
+        self._removed: Dict[date, Set[int]] = defaultdict(set)
+        self._services_by_day: Dict[date, Set[int]] = {}
+
+    def services_on(self, day: date) -> Set[int]:
+        services = self._services_by_day.get(day)
+        if services is None:
+            weekday = day.weekday()
+            services = {
+                service
+                for service, (start, end, weekdays) in self._calendar.items()
+                if start <= day <= end and weekdays[weekday]
+            }
+            services |= self._added.get(day, set())
+            services -= self._removed.get(day, set())
+            self._services_by_day[day] = services
+        return services
+
+    def stop_index(self, stop_id: str) -> Optional[int]:
+        return self.stop_lookup.get(stop_id)
+
+
+def load_gtfs(path: str) -> Timetable:
+    tt = Timetable()
+    with zipfile.ZipFile(path) as archive:
+        _load_stops(tt, archive)
+        route_lookup = _load_routes(tt, archive)
+        service_lookup = _load_calendar(tt, archive)
+        trip_lookup = _load_trips(tt, archive, route_lookup, service_lookup)
+        _load_stop_times(tt, archive, trip_lookup)
+        _load_transfers(tt, archive)
+    return tt
+
+
+def _load_stops(tt: Timetable, archive: zipfile.ZipFile):
+    parents: Dict[str, str] = {}
+    for row in _read(archive, "stops.txt"):
+        stop_id = row["stop_id"]
+        parent = (row.get("parent_station") or "").strip()
+        if parent:
+            parents[stop_id] = parent
+            continue
+        tt.stop_lookup[stop_id] = len(tt.stop_ids)
+        tt.stop_ids.append(stop_id)
+        tt.stop_names.append(row.get("stop_name", ""))
+    # Platforms and entrances are collapsed onto their parent station
+    for stop_id, parent in parents.items():
+        if parent in tt.stop_lookup:
+            tt.stop_lookup[stop_id] = tt.stop_lookup[parent]
+    tt.stop_patterns = [[] for _ in tt.stop_ids]
+    tt.footpaths = [[] for _ in tt.stop_ids]
+
+
+def _load_routes(tt: Timetable, archive: zipfile.ZipFile) -> Dict[str, int]:
+    lookup = {}
+    for row in _read(archive, "routes.txt"):
+        lookup[row["route_id"]] = len(tt.route_short_names)
+        tt.route_short_names.append(row.get("route_short_name") or row["route_id"])
+        tt.route_long_names.append(row.get("route_long_name", ""))
+        tt.route_types.append(int(row.get("route_type") or 2))
+        tt.route_colors.append(row.get("route_color") or None)
+    return lookup
+
+
+def _service(tt: Timetable, lookup: Dict[str, int], service_id: str) -> int:
+    if service_id not in lookup:
+        lookup[service_id] = len(tt.service_ids)
+        tt.service_ids.append(service_id)
+    return lookup[service_id]
+
+
+def _load_calendar(tt: Timetable, archive: zipfile.ZipFile) -> Dict[str, int]:
+    lookup: Dict[str, int] = {}
+    for row in _read(archive, "calendar.txt"):
+        service = _service(tt, lookup, row["service_id"])
+        tt._calendar[service] = (
+            datetime.strptime(row["start_date"], "%Y%m%d").date(),
+            datetime.strptime(row["end_date"], "%Y%m%d").date(),
+            tuple(row.get(day) == "1" for day in _WEEKDAYS),
+        )
+    for row in _read(archive, "calendar_dates.txt"):
+        service = _service(tt, lookup, row["service_id"])
+        day = datetime.strptime(row["date"], "%Y%m%d").date()
+        if row.get("exception_type") == "1":
+            tt._added[day].add(service)
+        else:
+            tt._removed[day].add(service)
+    return lookup
+
+
+def _load_trips(tt: Timetable, archive: zipfile.ZipFile, route_lookup: Dict[str, int], service_lookup: Dict[str, int]) -> Dict[str, int]:
+    lookup = {}
+    for row in _read(archive, "trips.txt"):
+        if row["route_id"] not in route_lookup:
+            continue
+        lookup[row["trip_id"]] = len(tt.trip_ids)
+        tt.trip_ids.append(row["trip_id"])
+        tt.trip_numbers.append(row.get("trip_short_name") or row["trip_id"])
+        tt.trip_headsigns.append(row.get("trip_headsign", ""))
+        tt.trip_directions.append(row.get("direction_id", ""))
+        tt.trip_routes.append(route_lookup[row["route_id"]])
+        tt.trip_services.append(_service(tt, service_lookup, row["service_id"]))
+    return lookup
+
+
+def _load_stop_times(tt: Timetable, archive: zipfile.ZipFile, trip_lookup: Dict[str, int]):
+    rows: Dict[int, List[Tuple[int, int, int, int]]] = defaultdict(list)
+    for row in _read(archive, "stop_times.txt"):
+        trip = trip_lookup.get(row["trip_id"])
+        stop = tt.stop_lookup.get(row["stop_id"])
+        if trip is None or stop is None:
+            continue
+        arrival = row.get("arrival_time") or row.get("departure_time")
+        departure = row.get("departure_time") or arrival
+        if not arrival:
+            continue
+        rows[trip].append((int(row["stop_sequence"]), stop, parse_gtfs_time(arrival), parse_gtfs_time(departure)))
+
+    patterns: Dict[Tuple[int, ...], List[Tuple[int, List[Tuple[int, int, int, int]]]]] = defaultdict(list)
+    for trip, stop_times in rows.items():
+        stop_times.sort()
+        patterns[tuple(stop for _, stop, _, _ in stop_times)].append((trip, stop_times))
+
+    for stops, trips in patterns.items():
+        pattern = len(tt.pattern_stops)
+        trips.sort(key=lambda item: item[1][0][3])
+        tt.pattern_stops.append(array("i", stops))
+        tt.pattern_trips.append(array("i", (trip for trip, _ in trips)))
+        tt.pattern_arrivals.append(array("i", (arr for _, stop_times in trips for _, _, arr, _ in stop_times)))
+        tt.pattern_departures.append(array("i", (dep for _, stop_times in trips for _, _, _, dep in stop_times)))
+        for position, stop in enumerate(stops):
+            tt.stop_patterns[stop].append((pattern, position))
+
+
+def _load_transfers(tt: Timetable, archive: zipfile.ZipFile):
+    for row in _read(archive, "transfers.txt"):
+        from_stop = tt.stop_lookup.get(row["from_stop_id"])
+        to_stop = tt.stop_lookup.get(row["to_stop_id"])
+        if from_stop is None or to_stop is None or from_stop == to_stop:
+            continue
+        seconds = int(row.get("min_transfer_time") or 0)
+        tt.footpaths[from_stop].append((to_stop, seconds))
@@ -0,0 +1,175 @@
+"""
+Active trips from the ServiceataGlance feeds, kept in a keyed table updated by diffing each poll
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from app.models.trips import ActiveTrip, ActiveTripsResponse, LineStatus, FleetStatus
+from app.responses import memoized
+from app.services import feeds as feed_names
+from app.services.refresher import FeedRefresher, FeedUnavailable
+from app import transformers as transform
+
+# Feed name -> trip mode
+MODES = {
+    feed_names.SERVICE_TRAINS: "train",
+    feed_names.SERVICE_BUSES: "bus",
+    feed_names.SERVICE_UPX: "upx",
+}
+
+TripKey = Tuple[str, str]  # (mode, trip number)
+
+
+@dataclass
+class _LineTotals:
+    mode: str
+    trips: Dict[TripKey, ActiveTrip] = field(default_factory=dict)
+    delayed: int = 0
+    delay_total: int = 0
+
+
+class TripTable:
+    """Active trips keyed by (mode, trip number), with running per-line totals.
+
+    apply() compares a poll's raw trips with the previous ones, transforms
+    only trips whose raw data changed and adjusts the line totals for just
+    those. Responses are built at most once per table version.
+    """
+
+    def __init__(self, delay_threshold: int):
+        self.delay_threshold = delay_threshold
+        self.version = 0
+        self._raw: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(dict)
+        self._trips: Dict[TripKey, ActiveTrip] = {}
+        self._lines: Dict[str, _LineTotals] = {}
+        self._responses: Dict[Any, Any] = {}
+
+    def apply(self, mode: str, raw_trips: Dict[str, Dict[str, Any]]) -> int:
+        """Bring one mode up to date with a poll; returns the number of trips added, changed or removed"""
+        previous = self._raw[mode]
+        changed = 0
+        for number in previous.keys() - raw_trips.keys():
+            self._remove((mode, number))
+            changed += 1
+        for number, raw in raw_trips.items():
+            if previous.get(number) == raw:
+                continue
+            key = (mode, number)
+            self._remove(key)
+            self._add(key, transform.transform_active_trip(raw, mode))
+            changed += 1
+        self._raw[mode] = raw_trips
+        if changed:
+            self.version += 1
+            self._responses.clear()
+        return changed
+
+    def _add(self, key: TripKey, trip: ActiveTrip):
+        self._trips[key] = trip
+        line = self._lines.get(trip.line_code)
+        if line is None:
+            line = self._lines[trip.line_code] = _LineTotals(mode=trip.mode)
+        line.trips[key] = trip
+        line.delay_total += trip.delay_seconds
+        if trip.delay_seconds >= self.delay_threshold:
+            line.delayed += 1
+
+    def _remove(self, key: TripKey):
+        trip = self._trips.pop(key, None)
+        if trip is None:
+            return
+        line = self._lines[trip.line_code]
+        del line.trips[key]
+        line.delay_total -= trip.delay_seconds
+        if trip.delay_seconds >= self.delay_threshold:
+            line.delayed -= 1
+        if not line.trips:
+            del self._lines[trip.line_code]
+
+    def _memo(self, key: Any, build):
+        # Same object per version, so the ETag rendering is memoized too
+        response = self._responses.get(key)
+        if response is None:
+            response = self._responses[key] = build()
+        return memoized(response)
+
+    def status(self) -> FleetStatus:
+        return self._memo("status", self._build_status)
+
+    def _build_status(self) -> FleetStatus:
+        lines = [
+            LineStatus(
+                line_code=line_code,
+                mode=line.mode,
+                active_trips=len(line.trips),
+                delayed_trips=line.delayed,
+                average_delay_seconds=round(line.delay_total / len(line.trips), 1),
+                max_delay_seconds=max(trip.delay_seconds for trip in line.trips.values())
+            )
+            for line_code, line in sorted(self._lines.items())
+        ]
+        active = len(self._trips)
+        delay_total = sum(line.delay_total for line in self._lines.values())
+        return FleetStatus(
+            active_trips=active,
+            delayed_trips=sum(line.delayed for line in self._lines.values()),
+            average_delay_seconds=round(delay_total / active, 1) if active else 0.0,
+            delay_threshold_seconds=self.delay_threshold,
+            lines=lines
+        )
+
+    def all(self, mode: Optional[str] = None) -> ActiveTripsResponse:
+        def build():
+            trips = [trip for trip in self._trips.values() if mode is None or trip.mode == mode]
+            return ActiveTripsResponse(count=len(trips), trips=trips)
+        return self._memo(("all", mode), build)
+
+    def line(self, line_code: str) -> ActiveTripsResponse:
+        line_code = line_code.upper()
+
+        def build():
+            line = self._lines.get(line_code)
+            trips = list(line.trips.values()) if line else []
+            return ActiveTripsResponse(count=len(trips), trips=trips)
+        return self._memo(("line", line_code), build)
+
+    def line_status(self, line_code: str) -> Optional[LineStatus]:
+        line_code = line_code.upper()
+        return next((line for line in self.status().lines if line.line_code == line_code), None)
+
+    def trip(self, trip_number: str) -> Optional[ActiveTrip]:
+        for mode in MODES.values():
+            trip = self._trips.get((mode, trip_number))
+            if trip is not None:
+                return trip
+        return None
+
+
+class ActiveTrips:
+    """Applies new ServiceataGlance snapshots to a TripTable, once per feed version"""
+
+    def __init__(self, feeds: FeedRefresher, delay_threshold: int):
+        self.feeds = feeds
+        self.table = TripTable(delay_threshold)
+        self._versions: Dict[str, int] = {}
+
+    async def get(self) -> Tuple[TripTable, float]:
+        """(table, age in seconds of the oldest feed applied); raises FeedUnavailable when no feed is available"""
+        ages = []
+        errors = []
+        for name, mode in MODES.items():
+            try:
+                snapshot = await self.feeds.get(name)
+            except FeedUnavailable as e:
+                # Other modes are still worth serving; this one's trips are too old to show
+                errors.append(str(e))
+                if self._versions.pop(name, None) is not None:
+                    self.table.apply(mode, {})
+                continue
+            if self._versions.get(name) != snapshot.version:
+                self.table.apply(mode, snapshot.data)
+                self._versions[name] = snapshot.version
+            ages.append(snapshot.age)
+        if not ages:
+            raise FeedUnavailable("; ".join(errors))
+        return self.table, max(ages)
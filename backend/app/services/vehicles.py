@@ -0,0 +1,69 @@
+"""
+Live fleet: GTFS-realtime vehicle positions merged with trip delays and indexed for lookups
+"""
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from app.models.vehicles import Vehicle, VehiclesResponse
+from app.responses import memoized
+from app.services import feeds as feed_names
+from app.services.geo import GridIndex
+from app.services.refresher import FeedRefresher, FeedUnavailable
+
+
+class FleetSnapshot:
+    """Immutable view of every vehicle, indexed by line, trip and location"""
+
+    def __init__(self, positions: VehiclesResponse, delays: Dict[str, int]):
+        vehicles = [
+            vehicle.model_copy(update={"delay_seconds": delays[vehicle.trip_id]}) if vehicle.trip_id in delays else vehicle
+            for vehicle in positions.vehicles
+        ]
+        self.timestamp = positions.timestamp
+        # The whole-fleet response is built once per snapshot, not per request
+        self.all = memoized(VehiclesResponse(timestamp=self.timestamp, count=len(vehicles), vehicles=vehicles))
+
+        self._by_line: Dict[str, List[Vehicle]] = defaultdict(list)
+        self._by_trip: Dict[str, Vehicle] = {}
+        self._grid: GridIndex[int] = GridIndex()
+        for index, vehicle in enumerate(vehicles):
+            if vehicle.line_code:
+                self._by_line[vehicle.line_code].append(vehicle)
+            if vehicle.trip_id:
+                self._by_trip[vehicle.trip_id] = vehicle
+            self._grid.insert(index, vehicle.latitude, vehicle.longitude)
+
+    def _response(self, vehicles: List[Vehicle]) -> VehiclesResponse:
+        return VehiclesResponse(timestamp=self.timestamp, count=len(vehicles), vehicles=vehicles)
+
+    def line(self, line_code: str) -> VehiclesResponse:
+        return self._response(self._by_line.get(line_code.upper(), []))
+
+    def in_bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> VehiclesResponse:
+        indexes = sorted(index for index, _, _ in self._grid.in_bbox(min_lat, min_lon, max_lat, max_lon))
+        return self._response([self.all.vehicles[index] for index in indexes])
+
+    def trip(self, trip_id: str) -> Optional[Vehicle]:
+        return self._by_trip.get(trip_id)
+
+
+class Fleet:
+    """Builds a FleetSnapshot from the latest feed snapshots, once per feed version"""
+
+    def __init__(self, feeds: FeedRefresher):
+        self.feeds = feeds
+        self._snapshot: Optional[FleetSnapshot] = None
+        self._versions: Tuple[int, int] = (0, 0)
+
+    async def get(self) -> Tuple[FleetSnapshot, float]:
+        """(snapshot, age in seconds of the positions); raises FeedUnavailable without positions"""
+        positions = await self.feeds.get(feed_names.VEHICLE_POSITIONS)
+        try:
+            delays = await self.feeds.get(feed_names.TRIP_DELAYS)
+        except FeedUnavailable:
+            # Positions are still worth serving without delays
+            delays = None
+        versions = (positions.version, delays.version if delays else 0)
+        if self._snapshot is None or versions != self._versions:
+            self._snapshot = FleetSnapshot(positions.data, delays.data if delays else {})
+            self._versions = versions
+        return self._snapshot, positions.age
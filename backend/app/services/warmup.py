@@ -0,0 +1,129 @@
+"""
+Startup warm-up of upstream caches, indexes and feeds, gating readiness
+"""
+import asyncio
+import logging
+import time
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.clients.metrolinx import MetrolinxClient
+from app.services.departures import DepartureStore
+from app.services.refresher import FeedRefresher
+from app.services.stop_index import StopIndexManager
+from app import transformers as transform
+
+logger = logging.getLogger(__name__)
+
+
+class WarmUp:
+    """Runs named warm-up steps concurrently in the background after startup.
+
+    The app is ready once every step has finished, successfully or not, or
+    once timeout seconds have passed; an upstream outage then delays traffic
+    by at most the timeout instead of keeping workers out of the load
+    balancer. A timeout of 0 skips warm-up and reports ready at once.
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.ready = timeout <= 0
+        self._steps: Dict[str, Callable[[], Awaitable[Any]]] = {}
+        # name -> {"status": pending|ok|failed|timed out, "seconds": ..., "error": ...}
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, name: str, step: Callable[[], Awaitable[Any]]):
+        self._steps[name] = step
+
+    async def start(self):
+        if self.ready:
+            return
+        self._started_at = time.monotonic()
+        self._results = {name: {"status": "pending", "seconds": None, "error": None} for name in self._steps}
+        self._task = asyncio.create_task(self._run(), name="warmup")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        elapsed = None
+        if self._started_at is not None:
+            elapsed = round((self._finished_at or time.monotonic()) - self._started_at, 2)
+        return {"ready": self.ready, "elapsed": elapsed, "steps": self._results}
+
+    async def _run(self):
+        tasks = [asyncio.create_task(self._step(name, step), name=f"warmup:{name}") for name, step in self._steps.items()]
+        try:
+            _, pending = await asyncio.wait(tasks, timeout=self.timeout) if tasks else (set(), set())
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            raise
+        for name, result in self._results.items():
+            if result["status"] == "pending":
+                result["status"] = "timed out"
+        self._finished_at = time.monotonic()
+        self.ready = True
+        failed = [name for name, result in self._results.items() if result["status"] != "ok"]
+        if failed:
+            logger.warning("Warm-up finished in %.1fs without %s", self._finished_at - self._started_at, ", ".join(failed))
+        else:
+            logger.info("Warm-up finished in %.1fs", self._finished_at - self._started_at)
+
+    async def _step(self, name: str, step: Callable[[], Awaitable[Any]]):
+        started = time.monotonic()
+        try:
+            await step()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._results[name].update(status="failed", error=str(e) or type(e).__name__)
+        else:
+            self._results[name]["status"] = "ok"
+        finally:
+            self._results[name]["seconds"] = round(time.monotonic() - started, 2)
+
+
+async def _gather_all(label: str, calls: List[Awaitable[Any]]):
+    results = await asyncio.gather(*calls, return_exceptions=True)
+    errors = [str(result) or type(result).__name__ for result in results if isinstance(result, Exception)]
+    if errors:
+        raise RuntimeError(f"{len(errors)} of {len(calls)} {label} failed, e.g. {errors[0]}")
+
+
+def build_warmup(client: MetrolinxClient, feeds: FeedRefresher, stop_index: StopIndexManager, departures: DepartureStore, stop_codes: List[str], timeout: float) -> WarmUp:
+    """Preload what the first requests after a deploy would otherwise fetch cold.
+
+    Transformed results go through client.transform, so the first requests
+    also find their memoized response bodies and ETags.
+    """
+    warmup = WarmUp(timeout)
+
+    async def lines():
+        raw = await client.get_lines_all(date.today().strftime("%Y-%m-%d"))
+        client.transform(raw, transform.transform_lines)
+
+    async def stop_details(code: str):
+        raw = await client.get_stop_details(code)
+        client.transform(raw, transform.transform_stop_details, code)
+
+    async def stops():
+        raw = await client.get_stops_all()
+        client.transform(raw, transform.transform_stops)
+        # Search and nearby queries need the index, which loads Stop/All through the same cache
+        await stop_index.get()
+
+    warmup.add("stops", stops)
+    warmup.add("lines", lines)
+    warmup.add("stop_details", lambda: _gather_all("stop details", [stop_details(code) for code in stop_codes]))
+    warmup.add("feeds", lambda: _gather_all("feeds", [feeds.get(name) for name in feeds.names]))
+    warmup.add("departures", lambda: departures.get(date.today().isoformat()))
+    return warmup
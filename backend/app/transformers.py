@@ -1,11 +1,39 @@
 """
 Transform raw Metrolinx API responses into clean, frontend-friendly models
 """
+import re
 from typing import List, Dict, Any, Optional
 from app.models.stops import NextServiceLine, Stop, StopDetails, NextService
 from app.models.journeys import JourneyResponse, JourneyService, JourneyTrip, JourneyStop, Fare, FareResponse
 from app.models.alerts import Alert, ServiceException, UnionDeparture
-from app.models.schedules import Line, LineSchedule, TripSchedule, TripStop
+from app.models.schedules import Line, LineStop, ScheduleStop, ScheduleTrip, LineSchedule, TripSchedule, TripStop
+from app.models.vehicles import Vehicle, VehiclesResponse
+from app.models.trips import ActiveTrip
+
+_CLOCK_TIME = re.compile(r"(\d{1,2}):(\d{2})(?::(\d{2}))?")
+
+
+def _as_list(value: Any) -> List[Any]:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def parse_seconds(value: Any) -> Optional[int]:
+    """Seconds after midnight from 'HH:MM[:SS]', 'YYYY-MM-DD HH:MM:SS' or 'HHMM' strings"""
+    if value is None or value == "":
+        return None
+    text = str(value)
+    matches = _CLOCK_TIME.findall(text)
+    if matches:
+        hours, minutes, seconds = matches[-1]
+        return int(hours) * 3600 + int(minutes) * 60 + int(seconds or 0)
+    digits = "".join(ch for ch in text if ch.isdigit())
+    if len(digits) == 4:
+        return int(digits[:2]) * 3600 + int(digits[2:]) * 60
+    return None
 
 
 def transform_stops(raw_data: Dict[str, Any]) -> List[Stop]:
@@ -127,13 +155,6 @@ def transform_journey(raw_data: Dict[str, Any], from_stop: str, to_stop: str, da
     """Transform SchJourneys response into a compact frontend model."""
     journeys = []
 
-    def _as_list(value: Any) -> List[Any]:
-        if value is None:
-            return []
-        if isinstance(value, list):
-            return value
-        return [value]
-
     sch_journeys = _as_list(raw_data.get("SchJourneys"))
 
     response_date = date
@@ -315,3 +336,312 @@ def transform_union_departures(raw_data: Dict[str, Any]) -> List[UnionDeparture]
     
     return departures
 
+
+
+def _vehicle_type(line_data: Dict[str, Any]) -> str:
+    if line_data.get("IsTrain"):
+        return "Train"
+    if line_data.get("IsBus"):
+        return "Bus"
+    if str(line_data.get("Code", "")).upper() in ("UP", "UPX"):
+        return "UPX"
+    return line_data.get("Type") or "Train"
+
+
+def _schedule_lines(raw_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Line objects from the AllLines/Lines wrappers used by the Schedule endpoints"""
+    container = raw_data.get("AllLines") or raw_data.get("Lines")
+    if isinstance(container, dict) and "Code" not in container:
+        container = container.get("Line")
+    return [line for line in _as_list(container) if isinstance(line, dict)]
+
+
+def _schedule_stops(container: Dict[str, Any]) -> List[Dict[str, Any]]:
+    stops = container.get("Stops", container.get("Stop"))
+    if isinstance(stops, dict) and "Stop" in stops:
+        stops = stops.get("Stop")
+    return [stop for stop in _as_list(stops) if isinstance(stop, dict)]
+
+
+def transform_lines(raw_data: Dict[str, Any]) -> List[Line]:
+    """Transform lines in effect into one Line per line variant (direction)"""
+    lines = []
+
+    for line_data in _schedule_lines(raw_data):
+        code = line_data.get("Code", "")
+        name = line_data.get("Name", "")
+        vehicle_type = _vehicle_type(line_data)
+        variants = [variant for variant in _as_list(line_data.get("Variant")) if isinstance(variant, dict)]
+        if not variants:
+            variants = [{"Direction": line_data.get("Direction", "")}]
+
+        for variant in variants:
+            lines.append(Line(
+                code=variant.get("Code") or code,
+                name=variant.get("Display") or name,
+                direction=variant.get("Direction", ""),
+                vehicle_type=vehicle_type
+            ))
+
+    return lines
+
+
+def transform_line_stops(raw_data: Dict[str, Any]) -> List[LineStop]:
+    """Transform the stops of a line and direction into LineStop models"""
+    stops = []
+
+    for line_data in _schedule_lines(raw_data):
+        for index, stop in enumerate(_schedule_stops(line_data)):
+            stops.append(LineStop(
+                stop_code=stop.get("Code", ""),
+                stop_name=stop.get("Name", ""),
+                sequence=stop.get("Order") or stop.get("Sequence") or index + 1,
+                scheduled_time=parse_seconds(stop.get("Time"))
+            ))
+
+    return stops
+
+
+def transform_line_schedule(raw_data: Dict[str, Any], line_code: str, direction: str, date: str) -> LineSchedule:
+    """Transform a line schedule into a compact LineSchedule.
+
+    Stops are listed once in a stop table and every trip carries departure
+    times in seconds aligned with that table, instead of repeating stop
+    names and time strings per trip.
+    """
+    line_name = ""
+    stop_index: Dict[str, int] = {}
+    stops: List[ScheduleStop] = []
+    trip_times: List[Dict[int, Optional[int]]] = []
+    trips: List[ScheduleTrip] = []
+
+    for line_data in _schedule_lines(raw_data):
+        line_name = line_name or line_data.get("Name", "")
+        for trip in _as_list(line_data.get("Trip", line_data.get("Trips"))):
+            if isinstance(trip, dict) and "Trip" in trip:
+                nested = _as_list(trip.get("Trip"))
+            else:
+                nested = [trip]
+            for trip_data in nested:
+                if not isinstance(trip_data, dict):
+                    continue
+                times: Dict[int, Optional[int]] = {}
+                for stop in _schedule_stops(trip_data):
+                    code = stop.get("Code", "")
+                    if code not in stop_index:
+                        stop_index[code] = len(stops)
+                        stops.append(ScheduleStop(code=code, name=stop.get("Name", "")))
+                    times[stop_index[code]] = parse_seconds(stop.get("DepartureTime") or stop.get("Time") or stop.get("ArrivalTime"))
+                trip_times.append(times)
+                trips.append(ScheduleTrip(
+                    trip_number=str(trip_data.get("Number", "")),
+                    display=trip_data.get("Display")
+                ))
+
+    for trip, times in zip(trips, trip_times):
+        trip.times = [times.get(index) for index in range(len(stops))]
+
+    return LineSchedule(
+        line_code=line_code,
+        line_name=line_name,
+        direction=direction,
+        date=date,
+        stops=stops,
+        trips=trips
+    )
+
+
+def transform_trip_schedule(raw_data: Dict[str, Any], trip_number: str, date: str) -> TripSchedule:
+    """Transform a trip schedule into TripSchedule with times in seconds"""
+    trips = raw_data.get("Trips", raw_data.get("Trip"))
+    if isinstance(trips, dict) and "Trip" in trips:
+        trips = trips.get("Trip")
+    trip_list = [trip for trip in _as_list(trips) if isinstance(trip, dict)]
+    trip_data = trip_list[0] if trip_list else {}
+
+    raw_stops = _schedule_stops(trip_data)
+    raw_stops.sort(key=lambda stop: stop.get("Order", 0))
+
+    stops = []
+    for index, stop in enumerate(raw_stops):
+        arrival = parse_seconds(stop.get("ArrivalTime") or stop.get("Time"))
+        departure = parse_seconds(stop.get("DepartureTime"))
+        stops.append(TripStop(
+            stop_code=stop.get("Code", ""),
+            stop_name=stop.get("Name", ""),
+            sequence=stop.get("Order") or index + 1,
+            scheduled_arrival=arrival,
+            scheduled_departure=departure if departure is not None else arrival
+        ))
+
+    return TripSchedule(
+        trip_number=str(trip_data.get("Number") or trip_number),
+        line_code=trip_data.get("Line") or trip_data.get("LineCode", ""),
+        line_name=trip_data.get("LineName") or trip_data.get("Display", ""),
+        direction=trip_data.get("Direction", ""),
+        date=date,
+        stops=stops
+    )
+
+
+# ========== ServiceataGlance ==========
+
+
+def _optional_str(value: Any) -> Optional[str]:
+    return str(value) if value not in (None, "") else None
+
+
+def index_service_trips(raw_data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Raw ServiceataGlance trips keyed by trip number, for diffing against the previous poll"""
+    trips = {}
+    for trip in _as_list((raw_data.get("Trips") or {}).get("Trip")):
+        number = trip.get("TripNumber")
+        if number not in (None, ""):
+            trips[str(number)] = trip
+    return trips
+
+
+def transform_active_trip(trip: Dict[str, Any], mode: str) -> ActiveTrip:
+    """Transform one raw ServiceataGlance trip into an ActiveTrip model"""
+    return ActiveTrip(
+        trip_number=str(trip.get("TripNumber", "")),
+        mode=mode,
+        line_code=str(trip.get("LineCode") or trip.get("RouteNumber") or "").upper(),
+        route_number=_optional_str(trip.get("RouteNumber")),
+        direction=_optional_str(trip.get("VariantDir")),
+        display=_optional_str(trip.get("Display")),
+        start_time=_optional_str(trip.get("StartTime")),
+        end_time=_optional_str(trip.get("EndTime")),
+        latitude=trip.get("Latitude"),
+        longitude=trip.get("Longitude"),
+        in_motion=trip.get("IsInMotion"),
+        delay_seconds=int(trip.get("DelaySeconds") or 0),
+        course=trip.get("Course"),
+        first_stop_code=_optional_str(trip.get("FirstStopCode")),
+        last_stop_code=_optional_str(trip.get("LastStopCode")),
+        previous_stop_code=_optional_str(trip.get("PrevStopCode")),
+        next_stop_code=_optional_str(trip.get("NextStopCode")),
+        at_station_code=_optional_str(trip.get("AtStationCode")),
+        modified_at=_optional_str(trip.get("ModifiedDate"))
+    )
+
+
+# ========== GTFS-realtime ==========
+# Feeds arrive either as JSON (snake_case or camelCase field names) or as a
+# decoded protobuf FeedMessage; protobuf messages are read field by field
+# rather than converted to dicts first.
+
+
+def _pick(data: Dict[str, Any], snake: str, camel: str) -> Any:
+    value = data.get(snake)
+    return data.get(camel) if value is None else value
+
+
+def _line_code(route_id: Optional[str]) -> Optional[str]:
+    """Line code from a GTFS route_id such as '01260426-LW'"""
+    if not route_id:
+        return None
+    return route_id.rsplit("-", 1)[-1].upper()
+
+
+def _feed_timestamp(raw_data: Any) -> Optional[int]:
+    if isinstance(raw_data, dict):
+        timestamp = (raw_data.get("header") or {}).get("timestamp")
+        return int(timestamp) if timestamp is not None else None
+    return raw_data.header.timestamp if raw_data.header.HasField("timestamp") else None
+
+
+def _json_vehicle(entity: Dict[str, Any]) -> Optional[Vehicle]:
+    data = entity.get("vehicle")
+    position = data.get("position") if data else None
+    if not position or position.get("latitude") is None or position.get("longitude") is None:
+        return None
+    trip = data.get("trip") or {}
+    descriptor = data.get("vehicle") or {}
+    route_id = _pick(trip, "route_id", "routeId")
+    timestamp = data.get("timestamp")
+    return Vehicle(
+        vehicle_id=str(descriptor.get("id") or descriptor.get("label") or entity.get("id", "")),
+        label=descriptor.get("label"),
+        trip_id=_pick(trip, "trip_id", "tripId"),
+        route_id=route_id,
+        line_code=_line_code(route_id),
+        latitude=position["latitude"],
+        longitude=position["longitude"],
+        bearing=position.get("bearing"),
+        speed=position.get("speed"),
+        timestamp=int(timestamp) if timestamp is not None else None
+    )
+
+
+def _proto_vehicle(entity: Any) -> Optional[Vehicle]:
+    data = entity.vehicle
+    if not data.HasField("position"):
+        return None
+    position = data.position
+    route_id = data.trip.route_id or None
+    return Vehicle(
+        vehicle_id=data.vehicle.id or data.vehicle.label or entity.id,
+        label=data.vehicle.label or None,
+        trip_id=data.trip.trip_id or None,
+        route_id=route_id,
+        line_code=_line_code(route_id),
+        latitude=position.latitude,
+        longitude=position.longitude,
+        bearing=position.bearing if position.HasField("bearing") else None,
+        speed=position.speed if position.HasField("speed") else None,
+        timestamp=data.timestamp if data.HasField("timestamp") else None
+    )
+
+
+def transform_vehicle_positions(raw_data: Any) -> VehiclesResponse:
+    """Transform a GTFS-realtime VehiclePosition feed into VehiclesResponse"""
+    if isinstance(raw_data, dict):
+        entities = [entity for entity in _as_list(raw_data.get("entity")) if isinstance(entity, dict) and entity.get("vehicle")]
+        vehicles = [_json_vehicle(entity) for entity in entities]
+    else:
+        vehicles = [_proto_vehicle(entity) for entity in raw_data.entity if entity.HasField("vehicle")]
+    vehicles = [vehicle for vehicle in vehicles if vehicle is not None]
+    return VehiclesResponse(timestamp=_feed_timestamp(raw_data), count=len(vehicles), vehicles=vehicles)
+
+
+def transform_trip_delays(raw_data: Any) -> Dict[str, int]:
+    """Transform a GTFS-realtime TripUpdates feed into trip_id -> current delay in seconds.
+
+    The trip-level delay wins; otherwise the delay at the first updated stop
+    (the next stop the vehicle will reach) is used.
+    """
+    delays: Dict[str, int] = {}
+    if isinstance(raw_data, dict):
+        for entity in _as_list(raw_data.get("entity")):
+            update = _pick(entity, "trip_update", "tripUpdate") if isinstance(entity, dict) else None
+            if not update:
+                continue
+            trip_id = _pick(update.get("trip") or {}, "trip_id", "tripId")
+            delay = update.get("delay")
+            if delay is None:
+                for stop_update in _as_list(_pick(update, "stop_time_update", "stopTimeUpdate")):
+                    event = stop_update.get("arrival") or stop_update.get("departure") or {}
+                    delay = event.get("delay")
+                    if delay is not None:
+                        break
+            if trip_id and delay is not None:
+                delays[trip_id] = int(delay)
+        return delays
+
+    for entity in raw_data.entity:
+        if not entity.HasField("trip_update"):
+            continue
+        update = entity.trip_update
+        delay = update.delay if update.HasField("delay") else None
+        if delay is None:
+            for stop_update in update.stop_time_update:
+                for event in (stop_update.arrival, stop_update.departure):
+                    if event.HasField("delay"):
+                        delay = event.delay
+                        break
+                if delay is not None:
+                    break
+        if update.trip.trip_id and delay is not None:
+            delays[update.trip.trip_id] = delay
+    return delays
@@ -0,0 +1,109 @@
+"""
+Compare FastAPI's default response path with the FAST_RESPONSES path on the real routes.
+
+Starts benchmarks/stub_server.py as the upstream, runs app.main through its
+lifespan in this process and times GET /api/stops and /api/journeys over
+httpx's ASGITransport, so the numbers are the app's own cost per request
+(upstream answers come from the response cache after the first call). Each
+route is timed three ways, taking turns over several rounds:
+
+    default    FAST_RESPONSES off: FastAPI validates and encodes the models
+    orjson     FAST_RESPONSES on, but the rendered-body cache is emptied
+               before every request, so each one serializes with orjson
+    memoized   FAST_RESPONSES on: repeated content reuses its rendered body
+
+orjson alone is within run-to-run noise of the default path (0.9-1.5x on
+/api/stops, 0.9-1.1x on /api/journeys here); the gain comes from the
+memoized body (2.9-3.7x on /api/stops; journeys are small, so 1.0-1.2x).
+
+Run from backend/:
+
+    python -m benchmarks.bench_serialization [--requests 600] [--rounds 6] [--stub-port 8011]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.fixtures import TODAY_COMPACT
+
+ROUTES = ["/api/stops", f"/api/journeys/UN/AL/{TODAY_COMPACT}/0800"]
+
+
+def start_stub(port: int) -> subprocess.Popen:
+    stub = subprocess.Popen([sys.executable, "-m", "benchmarks.stub_server", "--port", str(port)])
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return stub
+        except OSError:
+            time.sleep(0.1)
+    stub.kill()
+    raise RuntimeError(f"stub server did not listen on port {port}")
+
+
+async def measure(client, path: str, requests: int, before=None) -> float:
+    elapsed = 0.0
+    for _ in range(requests):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        response = await client.get(path)
+        elapsed += time.perf_counter() - start
+        response.raise_for_status()
+    return elapsed / requests * 1000
+
+
+async def run(requests: int, rounds: int):
+    # Imported here so METROLINX_* point at the stub before app.config reads them
+    import httpx
+    from app import responses
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=30) as client:
+            deadline = time.monotonic() + 30
+            while (await client.get("/ready")).status_code != 200 and time.monotonic() < deadline:
+                await asyncio.sleep(0.1)
+            for path in ROUTES:
+                responses.FAST_RESPONSES = False
+                expected = (await client.get(path)).json()
+                responses.FAST_RESPONSES = True
+                assert (await client.get(path)).json() == expected, f"{path}: FAST_RESPONSES output differs"
+                # Variants take turns and the best round counts, so background feed refreshes skew none of them
+                best = {"default": float("inf"), "orjson": float("inf"), "memoized": float("inf")}
+                for _ in range(rounds):
+                    for variant in best:
+                        responses.FAST_RESPONSES = variant != "default"
+                        before = responses._rendered.clear if variant == "orjson" else None
+                        best[variant] = min(best[variant], await measure(client, path, requests // rounds, before))
+                route = path.split("/")[2]
+                default_ms, orjson_ms, memo_ms = best.values()
+                print(f"/api/{route:<9} default {default_ms:7.3f} ms/req   orjson {orjson_ms:7.3f} ms/req ({default_ms / orjson_ms:4.2f}x)"
+                      f"   memoized {memo_ms:7.3f} ms/req ({default_ms / memo_ms:4.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=600, help="Requests per route and variant")
+    parser.add_argument("--rounds", type=int, default=6)
+    parser.add_argument("--stub-port", type=int, default=8011)
+    args = parser.parse_args()
+
+    os.environ.setdefault("METROLINX_API_KEY", "benchmark")
+    os.environ["METROLINX_BASE_URL"] = f"http://127.0.0.1:{args.stub_port}/OpenDataAPI/api/V1"
+    stub = start_stub(args.stub_port)
+    try:
+        asyncio.run(run(args.requests, args.rounds))
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Microbenchmarks for every function in app/transformers.py.
+
+Each transformer runs against its recorded (or synthetic) fixture. Run from backend/:
+
+    python -m benchmarks.bench_transformers [--repeat 200] [--only transform_stops]
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("METROLINX_API_KEY", "benchmark")
+
+from app import transformers as transform
+from benchmarks import fixtures
+
+# (transformer, fixture name, extra args after raw_data)
+CASES = [
+    (transform.transform_stops, "stop_all", ()),
+    (transform.transform_stop_details, "stop_details", ("UN",)),
+    (transform.transform_next_service, "stop_next_service", ("UN",)),
+    (transform.transform_journey, "journey", ("UN", "AL", fixtures.TODAY_COMPACT, "0800")),
+    (transform.transform_fares, "fares", ("UN", "AL", None)),
+    (transform.transform_alerts, "service_alerts", ("Service",)),
+    (transform.transform_exceptions, "exceptions_all", ()),
+    (transform.transform_union_departures, "union_departures", ()),
+    (transform.transform_lines, "lines_all", ()),
+    (transform.transform_line_stops, "line_stops", ()),
+    (transform.transform_line_schedule, "line_schedule", ("LW", "W", fixtures.TODAY)),
+    (transform.transform_trip_schedule, "trip_schedule", ("1000", fixtures.TODAY)),
+    (transform.transform_vehicle_positions, "gtfs_vehicle_positions", ()),
+    (transform.transform_trip_delays, "gtfs_trip_updates", ()),
+    (transform.index_service_trips, "service_trains", ()),
+    (transform.transform_active_trip, "service_trains", ("train",)),
+]
+
+# Transformers that take one item of their fixture rather than the whole payload
+ITEM_OF = {
+    transform.transform_active_trip: lambda raw: next(iter(transform.index_service_trips(raw).values())),
+}
+
+
+def run(fn, raw, args, repeat: int) -> float:
+    fn(raw, *args)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(raw, *args)
+    return (time.perf_counter() - start) / repeat * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--only", default="", help="Comma-separated transformer names")
+    args = parser.parse_args()
+    only = {name for name in args.only.split(",") if name}
+
+    missing = {name for name in dir(transform) if name.startswith("transform_")} - {fn.__name__ for fn, _, _ in CASES}
+    if missing:
+        print(f"warning: no benchmark case for {', '.join(sorted(missing))}")
+
+    print(f"{'transformer':<30} {'fixture':<20} {'us/call':>10}")
+    for fn, fixture, extra in CASES:
+        if only and fn.__name__ not in only:
+            continue
+        raw = fixtures.load(fixture)
+        if fn in ITEM_OF:
+            raw = ITEM_OF[fn](raw)
+        micros = run(fn, raw, extra, args.repeat)
+        print(f"{fn.__name__:<30} {fixture:<20} {micros:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
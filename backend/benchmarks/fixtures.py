@@ -0,0 +1,214 @@
+"""
+Upstream response fixtures for benchmarks.
+
+Each MetrolinxClient method has a fixture name and an endpoint prefix. A
+recorded response (see benchmarks/record.py) in benchmarks/fixtures/<name>.json
+is used when present; otherwise a synthetic payload of realistic size and
+shape is generated.
+"""
+import json
+import os
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+TODAY = date.today().strftime("%Y-%m-%d")
+TODAY_COMPACT = date.today().strftime("%Y%m%d")
+
+LINES = [("LW", "Lakeshore West"), ("LE", "Lakeshore East"), ("KI", "Kitchener"), ("BR", "Barrie"),
+         ("RH", "Richmond Hill"), ("ST", "Stouffville"), ("MI", "Milton"), ("UP", "UP Express")]
+
+
+def _stations(count: int) -> List[Tuple[str, str]]:
+    named = [("UN", "Union Station"), ("AL", "Aldershot GO"), ("OR", "Oakville GO"), ("EX", "Exhibition GO"),
+             ("MI", "Mimico GO"), ("PO", "Port Credit GO"), ("CL", "Clarkson GO"), ("BU", "Burlington GO")]
+    return named + [(f"{i:05d}", f"Stop {i} at Main St") for i in range(count - len(named))]
+
+
+def stop_all(count: int = 1500) -> dict:
+    return {"Stations": {"Station": [
+        {"LocationCode": code, "LocationName": name, "LocationType": "Train Station" if len(code) == 2 else "Bus Stop",
+         "PublicStopId": code}
+        for code, name in _stations(count)
+    ]}}
+
+
+def stop_details(code: str = "UN") -> dict:
+    index = sum(map(ord, code))
+    return {"Stop": {"StopName": f"{code} Station", "ZoneCode": "02", "StreetNumber": "65", "StreetName": "Front St W",
+                     "City": "Toronto", "Latitude": str(43.45 + (index % 50) * 0.01),
+                     "Longitude": str(-79.9 + (index % 70) * 0.01)}}
+
+
+def stop_next_service(lines: int = 12) -> dict:
+    return {"NextService": {"Lines": [
+        {"LineCode": code, "LineName": name, "ServiceType": "T", "DirectionName": f"{name} - Westbound",
+         "ScheduledDepartureTime": f"{TODAY} 08:{i * 4:02d}:00", "ComputedDepartureTime": f"{TODAY} 08:{i * 4 + 1:02d}:00",
+         "DepartureStatus": "D", "ScheduledPlatform": "7", "ActualPlatform": "8", "TripOrder": i, "TripNumber": str(1000 + i),
+         "UpdateTime": f"{TODAY} 07:59:00", "Status": "S", "Latitude": 43.64 + i * 0.001, "Longitude": -79.38}
+        for i, (code, name) in enumerate((LINES * 2)[:lines])
+    ]}}
+
+
+def journey(journeys: int = 10, legs: int = 2, stops_per_leg: int = 15) -> dict:
+    services = []
+    for j in range(journeys):
+        trips = [{
+            "Number": f"{j}{leg}", "Display": "Lakeshore West", "Line": "LW", "Direction": "W", "Type": "T",
+            "departFromCode": "UN", "destinationStopCode": "AL",
+            "Stops": {"Stop": [{"Code": f"S{s}", "Order": s, "Time": f"08:{s:02d}", "IsMajor": s % 3 == 0}
+                               for s in range(stops_per_leg)]},
+        } for leg in range(legs)]
+        services.append({"StartTime": "08:00", "EndTime": "09:00", "Duration": "01:00", "Trips": {"Trip": trips}})
+    return {"SchJourneys": [{"Date": TODAY_COMPACT, "From": "UN", "To": "AL", "Time": "0800", "Services": services}]}
+
+
+def lines_all() -> dict:
+    return {"AllLines": {"Line": [
+        {"Code": code, "Name": name, "IsBus": False, "IsTrain": code != "UP",
+         "Variant": [{"Code": code, "Direction": "E", "Display": f"{name} Eastbound"},
+                     {"Code": code, "Direction": "W", "Display": f"{name} Westbound"}]}
+        for code, name in LINES
+    ]}}
+
+
+def line_schedule(trips: int = 80, stops: int = 14) -> dict:
+    stations = _stations(stops)
+    return {"Lines": {"Line": [{"Code": "LW", "Name": "Lakeshore West", "Direction": "W", "Trip": [
+        {"Number": str(1000 + t), "Display": "Aldershot GO", "Stops": {"Stop": [
+            {"Code": code, "Name": name, "Time": f"{5 + (t * 15 + s * 4) // 60:02d}:{(t * 15 + s * 4) % 60:02d}:00"}
+            for s, (code, name) in enumerate(stations)
+        ]}}
+        for t in range(trips)
+    ]}]}}
+
+
+def line_stops(stops: int = 14) -> dict:
+    return {"Lines": {"Line": [{"Code": "LW", "Name": "Lakeshore West", "Direction": "W", "Stop": [
+        {"Code": code, "Name": name, "Order": i + 1} for i, (code, name) in enumerate(_stations(stops))
+    ]}]}}
+
+
+def trip_schedule(stops: int = 14) -> dict:
+    return {"Trips": {"Trip": [{"Number": "1000", "Line": "LW", "LineName": "Lakeshore West", "Direction": "W",
+                                "Stops": {"Stop": [
+                                    {"Code": code, "Name": name, "Order": i + 1, "ArrivalTime": f"08:{i * 4:02d}:00",
+                                     "DepartureTime": f"08:{i * 4 + 1:02d}:00"}
+                                    for i, (code, name) in enumerate(_stations(stops))
+                                ]}}]}}
+
+
+def fares() -> dict:
+    return {"Fares": {"Fare": [{"FareType": kind, "Price": price, "Currency": "CAD"}
+                               for kind, price in (("Adult", "8.15"), ("Senior", "4.08"), ("Youth", "4.08"), ("Child", "0"))]}}
+
+
+def alerts(count: int = 25) -> dict:
+    return {"Alerts": {"Alert": [
+        {"AlertId": str(i), "Title": f"Alert {i}", "Description": "Trains are delayed due to a signal problem. " * 4,
+         "Severity": ("High", "Medium", "Low")[i % 3],
+         "AffectedLines": {"Line": [{"LineCode": LINES[i % len(LINES)][0]}]},
+         "AffectedStops": {"Stop": [{"StopCode": code} for code, _ in _stations(8)[i % 4:i % 4 + 3]]},
+         "StartTime": f"{TODAY} 06:00:00", "EndTime": f"{TODAY} 23:00:00",
+         "CreatedAt": f"{TODAY} 05:55:00", "UpdatedAt": f"{TODAY} 07:30:00"}
+        for i in range(count)
+    ]}}
+
+
+def exceptions(count: int = 40) -> dict:
+    return {"Exceptions": {"Exception": [
+        {"TripNumber": str(2000 + i), "LineCode": LINES[i % len(LINES)][0], "LineName": LINES[i % len(LINES)][1],
+         "Direction": "E" if i % 2 else "W", "ExceptionType": "Cancelled",
+         "AffectedStops": {"Stop": [{"StopCode": code} for code, _ in _stations(6)]},
+         "ScheduledDate": TODAY, "ScheduledTime": f"{6 + i % 12:02d}:15", "Reason": "Crew availability"}
+        for i in range(count)
+    ]}}
+
+
+def union_departures(count: int = 30) -> dict:
+    return {"Departures": {"Departure": [
+        {"TripNumber": str(3000 + i), "LineCode": LINES[i % len(LINES)][0], "LineName": LINES[i % len(LINES)][1],
+         "Direction": "W", "Destination": "Aldershot GO", "ScheduledDeparture": f"{TODAY} 08:{i:02d}:00",
+         "PredictedDeparture": f"{TODAY} 08:{i:02d}:30", "Platform": str(3 + i % 10), "VehicleType": "Train",
+         "Status": "On Time"}
+        for i in range(count)
+    ]}}
+
+
+def service_at_a_glance(count: int = 60) -> dict:
+    return {"Trips": {"Trip": [
+        {"TripNumber": str(4000 + i), "LineCode": LINES[i % len(LINES)][0], "RouteNumber": LINES[i % len(LINES)][0],
+         "VariantDir": "W", "Display": LINES[i % len(LINES)][1], "StartTime": "07:00", "EndTime": "09:00",
+         "Latitude": 43.4 + i * 0.005, "Longitude": -79.9 + i * 0.01, "IsInMotion": True,
+         "DelaySeconds": (i % 7) * 60, "Course": 270, "FirstStopCode": "UN", "LastStopCode": "AL",
+         "PrevStopCode": "EX", "NextStopCode": "MI", "AtStationCode": None, "ModifiedDate": f"{TODAY} 07:59:30"}
+        for i in range(count)
+    ]}}
+
+
+def gtfs_feed(kind: str = "vehicle", count: int = 150) -> dict:
+    entities = []
+    for i in range(count):
+        trip = {"trip_id": f"{TODAY_COMPACT}-LW-{5000 + i}", "route_id": LINES[i % len(LINES)][0]}
+        entity: Dict[str, Any] = {"id": str(i)}
+        if kind == "vehicle":
+            entity["vehicle"] = {"trip": trip, "vehicle": {"id": f"V{i}", "label": str(5000 + i)},
+                                 "position": {"latitude": 43.4 + i * 0.002, "longitude": -79.9 + i * 0.004,
+                                              "bearing": 270.0, "speed": 20.0},
+                                 "timestamp": 1760700000 + i}
+        elif kind == "trip_update":
+            entity["trip_update"] = {"trip": trip, "delay": (i % 9) * 30,
+                                     "stop_time_update": [{"stop_id": "UN", "arrival": {"delay": (i % 9) * 30}}]}
+        else:
+            entity["alert"] = {"informed_entity": [{"route_id": trip["route_id"]}],
+                               "header_text": {"translation": [{"text": f"Alert {i}", "language": "en"}]}}
+        entities.append(entity)
+    return {"header": {"gtfs_realtime_version": "2.0", "timestamp": 1760700000}, "entity": entities}
+
+
+# (fixture name, endpoint prefix, client method, sample args, synthetic generator); most specific prefix first
+FIXTURES: List[Tuple[str, str, str, tuple, Callable[[], dict]]] = [
+    ("stop_all", "Stop/All", "get_stops_all", (), stop_all),
+    ("stop_next_service", "Stop/NextService/", "get_stop_next_service", ("UN",), stop_next_service),
+    ("stop_details", "Stop/Details/", "get_stop_details", ("UN",), stop_details),
+    ("journey", "Schedule/Journey/", "get_journey", ("UN", "AL", TODAY_COMPACT, "0800"), journey),
+    ("lines_all", "Schedule/Line/All/", "get_lines_all", (TODAY,), lines_all),
+    ("line_stops", "Schedule/Line/Stop/", "get_line_stops", (TODAY, "LW", "W"), line_stops),
+    ("line_schedule", "Schedule/Line/", "get_line_schedule", (TODAY, "LW", "W"), line_schedule),
+    ("trip_schedule", "Schedule/Trip/", "get_trip_schedule", (TODAY, "1000"), trip_schedule),
+    ("fares", "Fares/", "get_fares", ("UN", "AL"), fares),
+    ("service_alerts", "ServiceUpdate/ServiceAlert/", "get_service_alerts", (), alerts),
+    ("information_alerts", "ServiceUpdate/InformationAlert/", "get_information_alerts", (), alerts),
+    ("union_departures", "ServiceUpdate/UnionDepartures/", "get_union_departures", (), union_departures),
+    ("exceptions_train", "ServiceUpdate/Exceptions/Train", "get_exceptions_train", (), exceptions),
+    ("exceptions_bus", "ServiceUpdate/Exceptions/Bus", "get_exceptions_bus", (), exceptions),
+    ("exceptions_all", "ServiceUpdate/Exceptions/All", "get_exceptions_all", (), exceptions),
+    ("service_buses", "ServiceataGlance/Buses/", "get_service_buses", (), service_at_a_glance),
+    ("service_trains", "ServiceataGlance/Trains/", "get_service_trains", (), service_at_a_glance),
+    ("service_upx", "ServiceataGlance/UPX/", "get_service_upx", (), service_at_a_glance),
+    ("gtfs_alerts", "Gtfs/Feed/Alerts", "get_gtfs_alerts", (), lambda: gtfs_feed("alert")),
+    ("gtfs_trip_updates", "Gtfs/Feed/TripUpdates", "get_gtfs_trip_updates", (), lambda: gtfs_feed("trip_update")),
+    ("gtfs_vehicle_positions", "Gtfs/Feed/VehiclePosition", "get_gtfs_vehicle_positions", (), lambda: gtfs_feed("vehicle")),
+]
+
+
+def fixture_for(endpoint: str) -> Optional[str]:
+    for name, prefix, _, _, _ in FIXTURES:
+        if endpoint.startswith(prefix):
+            return name
+    return None
+
+
+def load(name: str, fixtures_dir: str = FIXTURES_DIR) -> Any:
+    """Recorded fixture if present, synthetic payload otherwise"""
+    path = os.path.join(fixtures_dir, f"{name}.json")
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as handle:
+            return json.load(handle)
+    generators = {fixture: generator for fixture, _, _, _, generator in FIXTURES}
+    return generators[name]()
+
+
+def load_all(fixtures_dir: str = FIXTURES_DIR) -> Dict[str, Any]:
+    return {name: load(name, fixtures_dir) for name, _, _, _, _ in FIXTURES}
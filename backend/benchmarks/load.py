@@ -0,0 +1,118 @@
+"""
+End-to-end load driver for the API.
+
+Runs closed-loop workers against a running app (ideally backed by
+benchmarks/stub_server.py) and reports p50/p95/p99 latency, throughput and
+errors for each route. Run from backend/:
+
+    python -m benchmarks.load --base-url http://127.0.0.1:8000 --concurrency 32 --duration 20
+    python -m benchmarks.load --routes /api/stops,/api/alerts/all
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from collections import defaultdict
+from typing import Dict, List
+import httpx
+from benchmarks.fixtures import TODAY, TODAY_COMPACT
+
+# One representative request per GET route in app/main.py
+DEFAULT_ROUTES = [
+    "/health",
+    "/ready",
+    "/api/stops",
+    "/api/stops/UN/next-service",
+    "/api/stops/UN/details",
+    "/api/stops/search?q=union",
+    "/api/stops/nearby?lat=43.645&lon=-79.38",
+    "/api/stops/next-service?codes=UN,EX,MI,PO,CL,OR,BU,AL",
+    f"/api/journeys/UN/AL/{TODAY_COMPACT}/0800",
+    "/api/journeys/fares?from_stop=UN&to_stop=AL",
+    "/api/alerts/service",
+    "/api/alerts/information",
+    "/api/alerts/all",
+    "/api/alerts/exceptions/train",
+    "/api/alerts/exceptions/bus",
+    "/api/alerts/exceptions/all",
+    "/api/alerts/union/departures",
+    "/api/alerts?line=LW&stop=UN",
+    f"/api/alerts/exceptions?line=LW&date={TODAY}",
+    f"/api/schedules/lines?schedule_date={TODAY}",
+    f"/api/schedules/lines/LW/W?schedule_date={TODAY}",
+    f"/api/schedules/lines/LW/W/stops?schedule_date={TODAY}",
+    f"/api/schedules/trips/1000?schedule_date={TODAY}",
+    f"/api/schedules/stops/OR/departures?schedule_date={TODAY}&start=0700&line=LW",
+    "/api/vehicles",
+    "/api/vehicles/lines/LW",
+    "/api/vehicles/bbox?min_lat=43.4&min_lon=-79.9&max_lat=43.7&max_lon=-79.3",
+    f"/api/vehicles/trips/{TODAY_COMPACT}-LW-5000",
+    "/api/fleet/status",
+    "/api/fleet/trips",
+    "/api/fleet/lines/LW",
+    "/api/fleet/trips/4000",
+]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run(base_url: str, routes: List[str], concurrency: int, duration: float, timeout: float):
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    route_cycle = itertools.cycle(routes)
+    deadline = time.perf_counter() + duration
+
+    async def worker(http: httpx.AsyncClient):
+        while time.perf_counter() < deadline:
+            route = next(route_cycle)
+            start = time.perf_counter()
+            try:
+                response = await http.get(route)
+                await response.aread()
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            elapsed = (time.perf_counter() - start) * 1000
+            if failed:
+                errors[route] += 1
+            else:
+                latencies[route].append(elapsed)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(http) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(f"{'route':<58} {'ok':>6} {'err':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    total_ok = total_err = 0
+    for route in routes:
+        values = sorted(latencies[route])
+        total_ok += len(values)
+        total_err += errors[route]
+        print(f"{route[:58]:<58} {len(values):>6} {errors[route]:>5} {len(values) / elapsed:>8.1f} "
+              f"{percentile(values, 0.50):>8.1f} {percentile(values, 0.95):>8.1f} {percentile(values, 0.99):>8.1f}")
+    everything = sorted(value for values in latencies.values() for value in values)
+    print(f"{'all routes':<58} {total_ok:>6} {total_err:>5} {total_ok / elapsed:>8.1f} "
+          f"{percentile(everything, 0.50):>8.1f} {percentile(everything, 0.95):>8.1f} {percentile(everything, 0.99):>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--routes", default="", help="Comma-separated paths (default: every route)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10, help="Seconds")
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+    routes = [route for route in args.routes.split(",") if route] or DEFAULT_ROUTES
+    asyncio.run(run(args.base_url, routes, args.concurrency, args.duration, args.timeout))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Record real api.openmetrolinx.com responses as benchmark fixtures.
+
+Calls every MetrolinxClient method once with the sample arguments listed in
+benchmarks/fixtures.py and writes the JSON to benchmarks/fixtures/<name>.json
+(GTFS-RT protobuf feeds in their JSON form).
+Needs METROLINX_API_KEY; costs one upstream call per fixture. Run from backend/:
+
+    python -m benchmarks.record [--only stop_all,journey]
+"""
+import argparse
+import asyncio
+import json
+import os
+from typing import Any
+from app.clients.metrolinx import MetrolinxClient
+from benchmarks.fixtures import FIXTURES, FIXTURES_DIR
+
+
+def _as_json(data: Any) -> Any:
+    """GTFS-RT feeds arrive as protobuf messages; fixtures keep them in the feed's JSON form"""
+    if hasattr(data, "SerializeToString"):
+        from google.protobuf.json_format import MessageToDict
+        return MessageToDict(data, preserving_proto_field_name=True)
+    return data
+
+
+async def record(only):
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    client = MetrolinxClient()
+    await client.start()
+    try:
+        for name, _, method, args, _ in FIXTURES:
+            if only and name not in only:
+                continue
+            try:
+                data = await getattr(client, method)(*args)
+            except Exception as e:
+                print(f"{name:<24} failed: {e}")
+                continue
+            try:
+                # Serialize first so a payload that is not JSON leaves no truncated fixture behind
+                text = json.dumps(_as_json(data))
+            except (TypeError, ValueError) as e:
+                print(f"{name:<24} skipped: not JSON ({e})")
+                continue
+            with open(os.path.join(FIXTURES_DIR, f"{name}.json"), "w", encoding="utf-8") as handle:
+                handle.write(text)
+            print(f"{name:<24} recorded")
+    finally:
+        await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default="", help="Comma-separated fixture names")
+    args = parser.parse_args()
+    asyncio.run(record({name for name in args.only.split(",") if name}))
+
+
+if __name__ == "__main__":
+    main()
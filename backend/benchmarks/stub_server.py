@@ -0,0 +1,67 @@
+"""
+Local stand-in for api.openmetrolinx.com that replays fixtures.
+
+Serves every MetrolinxClient endpoint under /OpenDataAPI/api/V1 from
+benchmarks/fixtures.py with configurable latency and error injection, and
+answers If-None-Match with 304 unless --no-etags is given. Point
+the app at it with METROLINX_BASE_URL. Run from backend/:
+
+    python -m benchmarks.stub_server --port 8001 --latency-ms 80 --jitter-ms 40 --error-rate 0.01
+    METROLINX_BASE_URL=http://127.0.0.1:8001/OpenDataAPI/api/V1 uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+from fastapi import FastAPI, Request, Response
+from benchmarks import fixtures
+
+
+def build_app(latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0, error_status: int = 503,
+              fixtures_dir: str = fixtures.FIXTURES_DIR, etags: bool = True) -> FastAPI:
+    bodies = {name: json.dumps(data).encode("utf-8") for name, data in fixtures.load_all(fixtures_dir).items()}
+    tags = {name: f'"{hashlib.sha1(body).hexdigest()}"' for name, body in bodies.items()}
+    app = FastAPI(title="Metrolinx stub")
+    app.state.requests = 0
+
+    @app.get("/OpenDataAPI/api/V1/{endpoint:path}")
+    async def replay(endpoint: str, request: Request):
+        app.state.requests += 1
+        delay = latency_ms + random.uniform(0, jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if error_rate and random.random() < error_rate:
+            return Response(status_code=error_status, content=b'{"error":"injected"}', media_type="application/json")
+        name = fixtures.fixture_for(endpoint)
+        if name is None:
+            return Response(status_code=404, content=b'{"error":"unknown endpoint"}', media_type="application/json")
+        if not etags:
+            return Response(content=bodies[name], media_type="application/json")
+        if request.headers.get("if-none-match") == tags[name]:
+            return Response(status_code=304, headers={"ETag": tags[name]})
+        return Response(content=bodies[name], media_type="application/json", headers={"ETag": tags[name]})
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Base delay added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Extra uniform random delay")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--fixtures-dir", default=fixtures.FIXTURES_DIR)
+    parser.add_argument("--no-etags", action="store_true", help="Never send ETags or answer 304")
+    args = parser.parse_args()
+
+    app = build_app(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status, args.fixtures_dir, not args.no_etags)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
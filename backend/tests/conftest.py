@@ -0,0 +1,4 @@
+import os
+
+# app.config refuses to import without an API key; tests never reach upstream
+os.environ.setdefault("METROLINX_API_KEY", "test")
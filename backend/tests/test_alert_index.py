@@ -0,0 +1,80 @@
+import asyncio
+from app.models.alerts import Alert, ServiceException
+from app.services import feeds as feed_names
+from app.services.alert_index import ALERT_FACETS, EXCEPTION_FACETS, AlertIndexes, InvertedIndex
+from app.services.refresher import FeedSnapshot
+
+
+def alert(title, lines=(), stops=(), severity="Low", alert_type="Service"):
+    return Alert(title=title, description="", alert_type=alert_type, severity=severity, affected_lines=list(lines), affected_stops=list(stops))
+
+
+def exception(trip, line, date, stops=()):
+    return ServiceException(trip_number=trip, line_code=line, line_name=line, direction="W", exception_type="Cancelled",
+                            affected_stops=list(stops), scheduled_date=date)
+
+
+ALERTS = [
+    alert("LW delay at UN", lines=["LW"], stops=["UN"], severity="High"),
+    alert("Network elevator notice", alert_type="Information"),
+    alert("LE platform change", lines=["LE"], stops=["UN", "PI"]),
+    alert("LW at Exhibition", lines=["lw"], stops=["EX"], severity="High"),
+]
+
+
+def titles(results):
+    return [item.title for item in results]
+
+
+def test_filters_intersect_and_network_wide_alerts_match_any_line_or_stop():
+    index = InvertedIndex(ALERTS, ALERT_FACETS)
+    assert titles(index.query(line="lw")) == ["LW delay at UN", "Network elevator notice", "LW at Exhibition"]
+    assert titles(index.query(line="LW", stop="UN")) == ["LW delay at UN", "Network elevator notice"]
+    assert titles(index.query(severity="High", stop="EX")) == ["LW at Exhibition"]
+    assert titles(index.query(alert_type="Information", line="LE")) == ["Network elevator notice"]
+    assert index.query(severity="Medium") == []
+
+
+def test_no_filters_return_every_item_and_results_are_memoized():
+    index = InvertedIndex(ALERTS, ALERT_FACETS)
+    assert index.query(line=None, stop=None) is ALERTS
+    assert index.query(line="LW", stop="UN") is index.query(stop="un", line="lw")
+
+
+def test_exception_dates_match_in_any_format_and_unscoped_items_do_not_match():
+    index = InvertedIndex([
+        exception("101", "LW", "2026-10-17", ["UN"]),
+        exception("102", "LW", "20261018"),
+        exception("201", "LE", "2026-10-17 00:00:00", ["PI"]),
+    ], EXCEPTION_FACETS)
+    assert [item.trip_number for item in index.query(date="20261017")] == ["101", "201"]
+    assert [item.trip_number for item in index.query(line="LW", date="2026-10-18")] == ["102"]
+    assert [item.trip_number for item in index.query(stop="UN")] == ["101"]
+
+
+class Feeds:
+    def __init__(self):
+        self.snapshots = {
+            feed_names.SERVICE_ALERTS: FeedSnapshot(ALERTS[:1], 0, 1),
+            feed_names.INFORMATION_ALERTS: FeedSnapshot(ALERTS[1:], 0, 1),
+        }
+
+    async def get(self, name):
+        return self.snapshots[name]
+
+
+def test_indexes_are_rebuilt_only_when_a_feed_version_changes():
+    feeds = Feeds()
+    indexes = AlertIndexes(feeds)
+
+    async def run():
+        first, _ = await indexes.alerts()
+        same, _ = await indexes.alerts()
+        feeds.snapshots[feed_names.INFORMATION_ALERTS] = FeedSnapshot(ALERTS[1:2], 0, 2)
+        rebuilt, _ = await indexes.alerts()
+        return first, same, rebuilt
+
+    first, same, rebuilt = asyncio.run(run())
+    assert same is first
+    assert rebuilt is not first
+    assert titles(rebuilt.query()) == ["LW delay at UN", "Network elevator notice"]
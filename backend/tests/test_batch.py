@@ -0,0 +1,78 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+from app.routes import batch
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(batch, "BATCH_ITEM_TIMEOUT", 0.05)
+    monkeypatch.setattr(batch, "BATCH_MAX_ITEMS", 5)
+    app = FastAPI()
+    app.include_router(batch.router)
+
+    @app.get("/api/stops/{stop_code}/details")
+    async def details(stop_code: str, verbose: str = "no"):
+        if stop_code == "ZZ":
+            raise HTTPException(status_code=404, detail="Stop ZZ not found")
+        return {"code": stop_code, "verbose": verbose}
+
+    @app.get("/api/slow")
+    async def slow():
+        await asyncio.sleep(1)
+        return {}
+
+    @app.get("/api/stops/{stop_code}/next-service/stream")
+    async def stream(stop_code: str):
+        raise AssertionError("streaming routes must not be dispatched")
+
+    return app
+
+
+async def post(app, items):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        return await http.post("/api/batch", json={"requests": items})
+
+
+def test_results_keep_request_order_with_their_own_status(app):
+    response = asyncio.run(post(app, [
+        {"id": "a", "path": "/api/stops/UN/details", "params": {"verbose": "yes"}},
+        {"id": "b", "path": "/api/stops/ZZ/details"},
+        {"id": "c", "path": "/health"},
+        {"id": "d", "path": "/api/batch"},
+    ]))
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [(result["id"], result["status"]) for result in results] == [("a", 200), ("b", 404), ("c", 400), ("d", 400)]
+    assert results[0]["body"] == {"code": "UN", "verbose": "yes"}
+    assert results[1]["error"] == "Stop ZZ not found"
+
+
+@pytest.mark.parametrize("path", [
+    "/api/stops/UN/next-service/stream",
+    "/api/stops/UN/next-service/stream/",
+    "/api/stops/UN/next-service/stream?lines=LW",
+    "/api/stops/next-service",
+])
+def test_streaming_routes_are_rejected_without_dispatch(app, path):
+    result = asyncio.run(post(app, [{"path": path}])).json()["results"][0]
+    assert (result["status"], result["error"]) == (400, "streaming routes cannot be batched")
+
+
+def test_slow_sub_request_times_out_without_holding_the_batch(app):
+    async def run():
+        started = asyncio.get_running_loop().time()
+        response = await post(app, [{"path": "/api/slow"}, {"path": "/api/stops/UN/details"}])
+        return response, asyncio.get_running_loop().time() - started
+
+    response, elapsed = asyncio.run(run())
+    slow, fast = response.json()["results"]
+    assert (slow["status"], slow["error"]) == (504, "Sub-request timed out after 0.05s")
+    assert fast["status"] == 200
+    assert elapsed < 0.5
+
+
+def test_too_many_items_are_rejected(app):
+    response = asyncio.run(post(app, [{"path": "/api/stops/UN/details"}] * 6))
+    assert response.status_code == 422
@@ -0,0 +1,80 @@
+import asyncio
+import httpx
+import pytest
+from app.clients import cache as cache_module
+from app.clients.cache import ResponseCache
+from app.clients.metrolinx import MetrolinxClient
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_their_ttl(clock):
+    cache = ResponseCache(max_bytes=1000)
+    cache.set("a", "A", 10, ttl=30)
+    clock[0] += 29
+    assert cache.get("a") == "A"
+    clock[0] += 1
+    assert cache.get("a") is None
+    # Expired entries stay around for revalidation until evicted
+    assert cache.peek("a").value == "A"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted_first(clock):
+    cache = ResponseCache(max_bytes=1000, max_entries=2)
+    cache.set("a", "A", 10, ttl=30)
+    cache.set("b", "B", 10, ttl=30)
+    cache.get("a")
+    cache.set("c", "C", 10, ttl=30)
+    assert cache.peek("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.evictions == 1
+
+
+def test_byte_cap_evicts_until_the_new_entry_fits(clock):
+    cache = ResponseCache(max_bytes=100)
+    for key in "abc":
+        cache.set(key, key.upper(), 40, ttl=30)
+    assert cache.peek("a") is None
+    assert cache.stats()["bytes"] == 80
+    # Replacing an entry releases its old size first, so 40 + 60 still fits
+    cache.set("b", "B2", 60, ttl=30)
+    assert cache.peek("c").value == "C"
+    assert cache.stats()["bytes"] == 100
+    cache.set("d", "D", 10, ttl=30)
+    assert cache.peek("c") is None
+    assert cache.stats()["bytes"] == 70
+
+
+def test_oversized_and_uncacheable_entries_are_not_stored(clock):
+    cache = ResponseCache(max_bytes=100)
+    cache.set("big", "X", 101, ttl=30)
+    cache.set("zero", "Z", 1, ttl=0)
+    assert cache.stats()["entries"] == 0
+
+
+def test_client_serves_repeated_calls_from_the_cache():
+    requests = []
+
+    def handle(request):
+        requests.append(request)
+        return httpx.Response(200, json={"Stations": {"Station": []}})
+
+    async def calls():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handle), base_url="http://upstream") as http:
+            client = MetrolinxClient(http=http, cache=ResponseCache(1_000_000))
+            await client.start()
+            first = await client.get_stops_all()
+            second = await client.get_stops_all()
+            await client.close()
+            return first, second, client.cache.stats()
+
+    first, second, stats = asyncio.run(calls())
+    assert second is first
+    assert len(requests) == 1
+    assert (stats["entries"], stats["hits"]) == (1, 1)
@@ -0,0 +1,50 @@
+import asyncio
+import httpx
+import pytest
+from app.clients.metrolinx import MetrolinxClient
+
+
+def upstream(requests):
+    def handle(request):
+        requests.append(request)
+        return httpx.Response(200, json={"Stations": {"Station": []}})
+    return httpx.MockTransport(handle)
+
+
+def test_calls_before_start_are_rejected():
+    with pytest.raises(RuntimeError, match="before start"):
+        asyncio.run(MetrolinxClient().get_stops_all())
+
+
+def test_start_opens_one_pooled_client_and_close_releases_it():
+    async def lifecycle():
+        client = MetrolinxClient()
+        await client.start()
+        http = client._http
+        await client.start()
+        assert client._http is http
+        await client.close()
+        return http, client._http
+
+    http, after_close = asyncio.run(lifecycle())
+    assert http.is_closed
+    assert after_close is None
+
+
+def test_injected_client_is_shared_and_left_open():
+    requests = []
+
+    async def calls():
+        http = httpx.AsyncClient(transport=upstream(requests), base_url="http://upstream")
+        client = MetrolinxClient(http=http)
+        await client.start()
+        await client.get_stop_details("UN")
+        await client.get_stop_details("EX")
+        await client.close()
+        closed = http.is_closed
+        await http.aclose()
+        return closed
+
+    assert asyncio.run(calls()) is False
+    assert [request.url.path for request in requests] == ["/Stop/Details/UN", "/Stop/Details/EX"]
+    assert all(request.url.params["key"] == "test" for request in requests)
@@ -0,0 +1,106 @@
+import asyncio
+from datetime import date
+import httpx
+import pytest
+from fastapi import FastAPI
+from app.dependencies import get_departures
+from app.models.schedules import LineSchedule, ScheduleStop, ScheduleTrip
+from app.services import departures
+from app.routes import schedules
+from app.services.departures import DepartureBoard
+
+
+def schedule(code, direction, stops, trips):
+    return LineSchedule(
+        line_code=code,
+        line_name=f"{code} line",
+        direction=direction,
+        date="2026-10-17",
+        stops=[ScheduleStop(code=stop, name=stop.title()) for stop in stops],
+        trips=[ScheduleTrip(trip_number=number, display=f"To {stops[-1]}", times=times) for number, times in trips]
+    )
+
+
+SCHEDULES = [
+    schedule("LW", "W", ["UN", "EX", "OR"], [
+        ("100", [21600, 22200, 23400]),
+        ("102", [25200, None, 27000]),
+        ("104", [28800, 29400, 30600]),
+    ]),
+    schedule("LE", "E", ["EX", "UN", "PI"], [
+        ("200", [22000, 22600, 24400]),
+        ("202", [86000, 86600, 88400]),
+    ]),
+]
+
+
+@pytest.fixture(params=["numpy", "array"])
+def board(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(departures, "np", None)
+    return DepartureBoard("2026-10-17", SCHEDULES)
+
+
+def times(result):
+    return [(departure.departure_time, departure.trip_number) for departure in result.departures]
+
+
+def test_window_across_lines_is_ordered(board):
+    result = board.departures("UN", 0, 30000, None, 50)
+    assert times(result) == [(21600, "100"), (22600, "200"), (25200, "102"), (28800, "104")]
+    assert result.stop_name == "Un"
+
+
+def test_window_is_start_inclusive_end_exclusive(board):
+    assert times(board.departures("UN", 22600, 28800, None, 50)) == [(22600, "200"), (25200, "102")]
+
+
+def test_line_filter_and_unknown_line(board):
+    assert [d.line_code for d in board.departures("ex", 0, 90000, "le", 50).departures] == ["LE", "LE"]
+    assert board.departures("EX", 0, 90000, "ZZ", 50).departures == []
+
+
+def test_last_stop_and_skipped_stops_are_not_departures(board):
+    # OR is the terminus of every LW trip; 102 does not call at EX
+    assert board.departures("OR", 0, 90000, None, 50).departures == []
+    assert times(board.departures("EX", 0, 30000, "LW", 50)) == [(22200, "100"), (29400, "104")]
+
+
+def test_times_past_midnight_and_limit(board):
+    assert times(board.departures("UN", 86400, 90000, None, 50)) == [(86600, "202")]
+    assert len(board.departures("UN", 0, 90000, None, 2).departures) == 2
+
+
+def test_unknown_stop_and_memoized_results(board):
+    assert board.departures("ZZ", 0, 90000, None, 50) is None
+    assert board.departures("UN", 0, 90000, None, 50) is board.departures("un", 0, 90000, None, 50)
+
+
+class BoardStore:
+    def __init__(self, board):
+        self.board = board
+
+    async def get(self, service_date):
+        return self.board
+
+
+async def get_departures_route(path):
+    app = FastAPI()
+    app.include_router(schedules.router)
+    app.dependency_overrides[get_departures] = lambda: BoardStore(DepartureBoard(date.today().isoformat(), SCHEDULES))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        return await http.get(path)
+
+
+@pytest.mark.parametrize("query, status", [
+    ("start=06:00&end=07:00", 200),
+    ("start=23:00&end=25:00", 200),
+    ("start=06:00&end=06:00", 200),
+    ("start=07:00&end=06:00", 422),
+    ("start=23:00&end=01:00", 422),
+])
+def test_route_rejects_window_ending_before_start(query, status):
+    response = asyncio.run(get_departures_route(f"/api/schedules/stops/UN/departures?{query}"))
+    assert response.status_code == status
@@ -0,0 +1,102 @@
+import asyncio
+import json
+from contextlib import contextmanager
+from datetime import date, timedelta
+import httpx
+from fastapi import FastAPI
+from app.dependencies import get_fare_matrix
+from app.routes import journeys
+from app.services.fares import FareMatrix
+
+DAY = "2099-01-05"
+
+
+class FareClient:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+
+    async def get_fares(self, from_stop, to_stop, operational_day=None):
+        self.calls.append((from_stop, to_stop, operational_day))
+        if (from_stop, to_stop) in self.failing:
+            raise RuntimeError(f"no fare for {from_stop}-{to_stop}")
+        return {"Fares": {"Fare": [{"FareType": "Adult", "Price": "10.45"}, {"FareType": "Senior", "Price": "5.20"}]}}
+
+    def transform(self, raw, fn, *args):
+        return fn(raw, *args)
+
+    @contextmanager
+    def priority(self, priority):
+        yield
+
+
+def matrix(client, path=None, stops=()):
+    return FareMatrix(client, path, save_interval=3600, warmup_stops=list(stops), concurrency=2)
+
+
+def prices(response):
+    return [(fare.fare_type, fare.price, fare.currency) for fare in response.fares]
+
+
+def test_priced_pairs_are_answered_from_the_matrix():
+    client = FareClient()
+    fares = matrix(client)
+
+    async def run():
+        return await fares.get("UN", "OR", DAY), await fares.get("UN", "OR", DAY)
+
+    first, second = asyncio.run(run())
+    assert client.calls == [("UN", "OR", DAY)]
+    assert prices(first) == prices(second) == [("Adult", 10.45, "CAD"), ("Senior", 5.2, "CAD")]
+    assert (second.from_stop, second.to_stop, second.operational_day) == ("UN", "OR", DAY)
+
+
+def test_get_many_keeps_order_and_returns_failures():
+    fares = matrix(FareClient(failing={("UN", "EX")}))
+    results = asyncio.run(fares.get_many([("UN", "OR"), ("UN", "EX"), ("OR", "UN")], DAY))
+    assert [type(result).__name__ for result in results] == ["FareResponse", "RuntimeError", "FareResponse"]
+    assert len(fares) == 2
+
+
+def test_warm_up_prices_every_ordered_pair():
+    client = FareClient()
+    fares = matrix(client)
+    asyncio.run(fares.warm_up(["UN", "OR", "EX"], DAY))
+    assert len(client.calls) == len(fares) == 6
+
+
+def test_save_and_load_round_trip_drops_past_days(tmp_path):
+    path = str(tmp_path / "fares.json")
+    fares = matrix(FareClient(), path)
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+
+    async def run():
+        await fares.get("UN", "OR", DAY)
+        await fares.get("UN", "EX", yesterday)
+        await fares.save()
+
+    asyncio.run(run())
+    with open(path, encoding="utf-8") as handle:
+        assert [entry[:3] for entry in json.load(handle)["fares"]] == [["UN", "OR", DAY]]
+
+    client = FareClient()
+    loaded = matrix(client, path)
+    loaded._load()
+    assert prices(asyncio.run(loaded.get("UN", "OR", DAY))) == [("Adult", 10.45, "CAD"), ("Senior", 5.2, "CAD")]
+    assert client.calls == []
+
+
+def test_bulk_route_reports_each_pair():
+    app = FastAPI()
+    app.include_router(journeys.router)
+    app.dependency_overrides[get_fare_matrix] = lambda: matrix(FareClient(failing={("UN", "EX")}))
+
+    async def post(pairs):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+            return await http.post("/api/journeys/fares/bulk", json={"pairs": pairs, "operational_day": DAY})
+
+    response = asyncio.run(post([{"from_stop": "UN", "to_stop": "OR"}, {"from_stop": "UN", "to_stop": "EX"}]))
+    assert response.status_code == 200
+    ok, failed = response.json()["results"]
+    assert [fare["price"] for fare in ok["fares"]] == [10.45, 5.2]
+    assert failed["fares"] == [] and failed["error"] == "Error fetching fares: no fare for UN-EX"
@@ -0,0 +1,43 @@
+import random
+from app.services.geo import GridIndex, haversine_km
+
+
+def build(count=500, seed=7):
+    rng = random.Random(seed)
+    grid = GridIndex()
+    points = [(index, 43.2 + rng.random() * 0.8, -80.2 + rng.random() * 1.2) for index in range(count)]
+    for key, lat, lon in points:
+        grid.insert(key, lat, lon)
+    return grid, points
+
+
+def test_bbox_matches_linear_scan():
+    grid, points = build()
+    boxes = [(43.5, -79.6, 43.7, -79.3), (43.0, -81.0, 44.5, -78.0), (-90, -180, 90, 180), (10, 10, 11, 11)]
+    for min_lat, min_lon, max_lat, max_lon in boxes:
+        found = sorted(key for key, _, _ in grid.in_bbox(min_lat, min_lon, max_lat, max_lon))
+        expected = sorted(key for key, lat, lon in points if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon)
+        assert found == expected
+
+
+def test_empty_index():
+    grid = GridIndex()
+    assert list(grid.in_bbox(-90, -180, 90, 180)) == []
+    assert grid.nearest(43.6, -79.4, 5, 50) == []
+
+
+def test_within_is_sorted_and_bounded():
+    grid, points = build()
+    hits = grid.within(43.65, -79.38, 5)
+    distances = [distance for _, distance in hits]
+    assert distances == sorted(distances)
+    assert all(distance <= 5 for distance in distances)
+    expected = {key for key, lat, lon in points if haversine_km(43.65, -79.38, lat, lon) <= 5}
+    assert {key for key, _ in hits} == expected
+
+
+def test_nearest_returns_k_closest():
+    grid, points = build()
+    nearest = grid.nearest(43.65, -79.38, 3, 100)
+    expected = sorted(points, key=lambda point: haversine_km(43.65, -79.38, point[1], point[2]))[:3]
+    assert [key for key, _ in nearest] == [key for key, _, _ in expected]
@@ -0,0 +1,130 @@
+import asyncio
+from contextlib import contextmanager
+import pytest
+from app.clients.ratelimit import Priority
+from app.services import journey_cache as journey_cache_module
+from app.services.journey_cache import JourneyCache
+
+DATE = "20261014"
+# Departures every 20 minutes from 05:00 to 00:40 the next morning, in minutes since midnight
+DEPARTURES = list(range(5 * 60, 24 * 60 + 41, 20))
+
+
+def clock(minutes):
+    return f"{minutes // 60 % 24:02d}:{minutes % 60:02d}"
+
+
+class JourneyClient:
+    """Upstream that echoes stop codes upper-cased and lists departures after midnight last"""
+
+    def __init__(self):
+        self.calls = []
+        self.priorities = []
+        self._priority = None
+
+    async def get_journey(self, from_stop_code, to_stop_code, date, start_time, max_journeys):
+        self.calls.append((from_stop_code, to_stop_code, start_time, max_journeys))
+        self.priorities.append(self._priority)
+        start = int(start_time[:2]) * 60 + int(start_time[2:])
+        services = [{"StartTime": clock(departs), "EndTime": clock(departs + 50)} for departs in DEPARTURES if departs >= start]
+        return {"SchJourneys": [{"Date": date, "From": from_stop_code.upper(), "To": to_stop_code.upper(), "Time": start_time,
+                                 "Services": services[:max_journeys]}]}
+
+    def transform(self, raw, fn, *args):
+        return fn(raw, *args)
+
+    @contextmanager
+    def priority(self, priority):
+        self._priority = priority
+        try:
+            yield
+        finally:
+            self._priority = None
+
+
+def cache(client, fetch_size=10, prefetch_hits=100):
+    return JourneyCache(client, bucket_minutes=30, ttl=300, fetch_size=fetch_size, prefetch_hits=prefetch_hits, max_entries=100)
+
+
+def starts(response):
+    return [journey.start_time for journey in response.journeys]
+
+
+def test_requests_in_one_bucket_share_its_superset():
+    client = JourneyClient()
+    journeys = cache(client)
+
+    async def run():
+        return await journeys.get("UN", "AL", DATE, "0810", 3), await journeys.get("UN", "AL", DATE, "0825", 2)
+
+    first, second = asyncio.run(run())
+    assert client.calls == [("UN", "AL", "0800", 10)]
+    assert starts(first) == ["08:20", "08:40", "09:00"]
+    assert starts(second) == ["08:40", "09:00"]
+    assert (first.start_time, second.start_time) == ("0810", "0825")
+    assert (journeys.hits, journeys.misses) == (1, 1)
+
+
+def test_callers_get_their_own_stop_codes_back():
+    client = JourneyClient()
+    journeys = cache(client)
+
+    async def run():
+        return await journeys.get("UN", "AL", DATE, "0800", 1), await journeys.get("un", "al", DATE, "0800", 1)
+
+    first, second = asyncio.run(run())
+    assert len(client.calls) == 1
+    assert (first.from_stop, first.to_stop) == ("UN", "AL")
+    assert (second.from_stop, second.to_stop) == ("un", "al")
+
+
+def test_departures_after_midnight_follow_a_late_evening_search():
+    client = JourneyClient()
+    response = asyncio.run(cache(client).get("UN", "AL", DATE, "2350", 3))
+    assert client.calls == [("UN", "AL", "2330", 10)]
+    assert starts(response) == ["00:00", "00:20", "00:40"]
+
+
+def test_superset_cut_short_by_the_page_size_goes_upstream_as_asked():
+    client = JourneyClient()
+    journeys = cache(client, fetch_size=3)
+    response = asyncio.run(journeys.get("UN", "AL", DATE, "0825", 3))
+    assert client.calls == [("UN", "AL", "0800", 3), ("UN", "AL", "0825", 3)]
+    assert starts(response) == ["08:40", "09:00", "09:20"]
+    assert journeys.bypassed == 1
+
+
+def test_hot_bucket_prefetches_the_next_one_in_the_background():
+    client = JourneyClient()
+    journeys = cache(client, prefetch_hits=2)
+
+    async def run():
+        await journeys.get("UN", "AL", DATE, "0805", 1)
+        await journeys.get("UN", "AL", DATE, "0815", 1)
+        await asyncio.gather(*journeys._tasks)
+        await journeys.get("UN", "AL", DATE, "0845", 1)
+
+    asyncio.run(run())
+    assert client.calls == [("UN", "AL", "0800", 10), ("UN", "AL", "0830", 10)]
+    assert client.priorities == [None, Priority.BACKGROUND]
+    assert (journeys.prefetches, journeys.hits) == (1, 2)
+
+
+def test_expired_bucket_is_fetched_again(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(journey_cache_module.time, "monotonic", lambda: now[0])
+    client = JourneyClient()
+    journeys = cache(client)
+
+    async def run():
+        await journeys.get("UN", "AL", DATE, "0800", 1)
+        now[0] += 301
+        await journeys.get("UN", "AL", DATE, "0800", 1)
+
+    asyncio.run(run())
+    assert len(client.calls) == 2
+
+
+@pytest.mark.parametrize("start_time, bucket", [("0000", "0000"), ("0829", "0800"), ("0830", "0830"), ("2359", "2330")])
+def test_bucket_start(start_time, bucket):
+    assert cache(JourneyClient()).bucket(start_time) == bucket
@@ -0,0 +1,55 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import FastAPI
+from app.dependencies import get_client, get_journey_cache, get_planner
+from app.models.journeys import JourneyResponse
+from app.routes import journeys
+
+
+class BrokenPlanner:
+    def plan(self, *args):
+        raise AttributeError("'_WalkLabel' object has no attribute 'leg'")
+
+
+class UpstreamCache:
+    def __init__(self):
+        self.calls = []
+
+    async def get(self, from_stop, to_stop, journey_date, start_time, max_journeys):
+        self.calls.append((from_stop, to_stop, journey_date, start_time, max_journeys))
+        return JourneyResponse(from_stop=from_stop, to_stop=to_stop, date=journey_date, start_time=start_time, journeys=[])
+
+
+def build_app(cache):
+    app = FastAPI()
+    app.include_router(journeys.router)
+    app.dependency_overrides[get_client] = lambda: None
+    app.dependency_overrides[get_planner] = BrokenPlanner
+    app.dependency_overrides[get_journey_cache] = lambda: cache
+    return app
+
+
+async def get(app, path):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        return await http.get(path)
+
+
+def test_planner_failure_falls_back_to_upstream():
+    cache = UpstreamCache()
+    app = build_app(cache)
+
+    response = asyncio.run(get(app, "/api/journeys/UN/OR/2026-10-14/08:00"))
+    assert response.status_code == 200
+    assert response.json()["from_stop"] == "UN"
+    assert cache.calls == [("UN", "OR", "20261014", "0800", 5)]
+
+
+@pytest.mark.parametrize("start_time", ["9999", "24:00", "08:60", "8am"])
+def test_invalid_start_time_is_rejected_before_planning(start_time):
+    cache = UpstreamCache()
+    app = build_app(cache)
+
+    response = asyncio.run(get(app, f"/api/journeys/UN/OR/2026-10-14/{start_time}"))
+    assert response.status_code == 422
+    assert cache.calls == []
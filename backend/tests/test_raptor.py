@@ -0,0 +1,135 @@
+import csv
+import io
+import zipfile
+from datetime import date
+import pytest
+from app.services.raptor import RaptorPlanner
+from app.services.timetable import load_gtfs
+
+WEEKDAY = date(2026, 10, 14)
+SATURDAY = date(2026, 10, 17)
+HOLIDAY = date(2026, 10, 12)
+
+FEED = {
+    "stops.txt": [
+        {"stop_id": "A", "stop_name": "Alpha", "parent_station": ""},
+        {"stop_id": "B", "stop_name": "Bravo", "parent_station": ""},
+        {"stop_id": "C", "stop_name": "Charlie", "parent_station": ""},
+        {"stop_id": "C1", "stop_name": "Charlie platform 1", "parent_station": "C"},
+        {"stop_id": "D", "stop_name": "Delta", "parent_station": ""},
+        {"stop_id": "E", "stop_name": "Echo", "parent_station": ""},
+    ],
+    "routes.txt": [
+        {"route_id": "R1", "route_short_name": "R1", "route_long_name": "Red", "route_type": "2"},
+        {"route_id": "R2", "route_short_name": "R2", "route_long_name": "Blue", "route_type": "3"},
+    ],
+    "calendar.txt": [
+        {"service_id": "WK", "monday": "1", "tuesday": "1", "wednesday": "1", "thursday": "1", "friday": "1",
+         "saturday": "0", "sunday": "0", "start_date": "20260101", "end_date": "20261231"},
+    ],
+    "calendar_dates.txt": [
+        {"service_id": "WK", "date": "20261012", "exception_type": "2"},
+    ],
+    "trips.txt": [
+        {"route_id": "R1", "service_id": "WK", "trip_id": "r1-800", "trip_short_name": "800"},
+        {"route_id": "R1", "service_id": "WK", "trip_id": "r1-900", "trip_short_name": "900"},
+        {"route_id": "R2", "service_id": "WK", "trip_id": "r2-822", "trip_short_name": "822"},
+        {"route_id": "R2", "service_id": "WK", "trip_id": "r2-830", "trip_short_name": "830"},
+    ],
+    "stop_times.txt": [
+        {"trip_id": trip, "stop_id": stop, "stop_sequence": str(sequence), "arrival_time": time, "departure_time": time}
+        for trip, stops in (
+            ("r1-800", (("A", "08:00:00"), ("B", "08:10:00"), ("C1", "08:20:00"))),
+            ("r1-900", (("A", "09:00:00"), ("B", "09:10:00"), ("C1", "09:20:00"))),
+            ("r2-822", (("C", "08:22:00"), ("D", "08:32:00"))),
+            ("r2-830", (("C", "08:30:00"), ("D", "08:40:00"))),
+        )
+        for sequence, (stop, time) in enumerate(stops, start=1)
+    ],
+    "transfers.txt": [
+        {"from_stop_id": "D", "to_stop_id": "E", "transfer_type": "2", "min_transfer_time": "300"},
+    ],
+}
+
+
+def build_planner(path, feed):
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, rows in feed.items():
+            handle = io.StringIO()
+            writer = csv.DictWriter(handle, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+            archive.writestr(name, handle.getvalue())
+    return RaptorPlanner(load_gtfs(str(path)), max_transfers=2, min_transfer_seconds=180)
+
+
+@pytest.fixture(scope="module")
+def planner(tmp_path_factory):
+    return build_planner(tmp_path_factory.mktemp("gtfs") / "feed.zip", FEED)
+
+
+def trip_ids(planner, journey):
+    tt = planner.tt
+    return [tt.trip_ids[tt.pattern_trips[leg.pattern][leg.trip_slot]] for leg in journey.legs]
+
+
+def test_single_trip(planner):
+    journeys = planner.plan("A", "B", WEEKDAY, 7 * 3600, 1)
+    assert [(j.departure, j.arrival) for j in journeys] == [(8 * 3600, 8 * 3600 + 600)]
+    assert trip_ids(planner, journeys[0]) == ["r1-800"]
+
+
+def test_transfer_respects_minimum_change_time(planner):
+    # Arriving at C at 08:20 misses the 08:22 connection (3 minute change) and takes the 08:30
+    journey = planner.plan("A", "D", WEEKDAY, 7 * 3600, 1)[0]
+    assert trip_ids(planner, journey) == ["r1-800", "r2-830"]
+    assert journey.arrival == 8 * 3600 + 40 * 60
+
+
+def test_platform_collapses_onto_parent_station(planner):
+    assert planner.tt.stop_index("C1") == planner.tt.stop_index("C")
+
+
+def test_footpath_to_final_stop(planner):
+    journey = planner.plan("A", "E", WEEKDAY, 7 * 3600, 1)[0]
+    assert journey.arrival == 8 * 3600 + 45 * 60
+
+
+def test_successive_journeys_depart_later(planner):
+    journeys = planner.plan("A", "C", WEEKDAY, 7 * 3600, 5)
+    assert [j.departure for j in journeys] == [8 * 3600, 9 * 3600]
+
+
+def test_no_service_on_weekend_or_removed_date(planner):
+    assert planner.plan("A", "B", SATURDAY, 7 * 3600, 1) == []
+    assert planner.plan("A", "B", HOLIDAY, 7 * 3600, 1) == []
+
+
+def test_unknown_or_same_stop(planner):
+    assert planner.plan("A", "ZZ", WEEKDAY, 0, 1) == []
+    assert planner.plan("A", "A", WEEKDAY, 0, 1) == []
+
+
+def test_no_connection_after_last_trip(planner):
+    assert planner.plan("A", "D", WEEKDAY, 8 * 3600 + 60, 1) == []
+
+
+def test_footpaths_from_walked_stop_do_not_chain(tmp_path):
+    feed = {
+        **FEED,
+        "trips.txt": [{"route_id": "R1", "service_id": "WK", "trip_id": "r1-800", "trip_short_name": "800"}],
+        "stop_times.txt": [
+            {"trip_id": "r1-800", "stop_id": stop, "stop_sequence": str(sequence), "arrival_time": time, "departure_time": time}
+            for sequence, (stop, time) in enumerate((("A", "08:00:00"), ("B", "08:10:00"), ("C", "08:30:00")), start=1)
+        ],
+        "transfers.txt": [
+            {"from_stop_id": "B", "to_stop_id": "C", "transfer_type": "2", "min_transfer_time": "60"},
+            {"from_stop_id": "C", "to_stop_id": "D", "transfer_type": "2", "min_transfer_time": "60"},
+        ],
+    }
+    planner = build_planner(tmp_path / "feed.zip", feed)
+    # C is reached sooner on foot from B, but D is walked to from the trip's own arrival at C
+    assert planner.plan("A", "C", WEEKDAY, 7 * 3600, 1)[0].arrival == 8 * 3600 + 11 * 60
+    journey = planner.plan("A", "D", WEEKDAY, 7 * 3600, 1)[0]
+    assert trip_ids(planner, journey) == ["r1-800"]
+    assert (journey.departure, journey.arrival) == (8 * 3600, 8 * 3600 + 31 * 60)
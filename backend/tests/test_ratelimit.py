@@ -0,0 +1,79 @@
+import asyncio
+import time
+import pytest
+from app.clients.ratelimit import Priority, QueueTimeout, RateLimiter
+
+WAITS = {Priority.INTERACTIVE: 1.0, Priority.NORMAL: 1.0, Priority.BACKGROUND: 1.0}
+
+
+def test_burst_is_free_then_calls_are_paced():
+    async def run():
+        limiter = RateLimiter(rate=20, burst=3, max_wait=WAITS)
+        start = time.monotonic()
+        for _ in range(3):
+            await limiter.acquire(Priority.NORMAL)
+        burst = time.monotonic() - start
+        for _ in range(2):
+            await limiter.acquire(Priority.NORMAL)
+        return burst, time.monotonic() - start
+
+    burst, total = asyncio.run(run())
+    assert burst < 0.02
+    # Two more tokens at 20/s take about 100ms
+    assert 0.08 <= total < 0.5
+
+
+def test_queued_callers_are_served_by_priority():
+    async def run():
+        limiter = RateLimiter(rate=20, burst=1, max_wait=WAITS)
+        await limiter.acquire(Priority.NORMAL)
+        order = []
+
+        async def call(name, priority):
+            await limiter.acquire(priority)
+            order.append(name)
+
+        tasks = [asyncio.create_task(call("background", Priority.BACKGROUND))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call("normal", Priority.NORMAL)))
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call("interactive", Priority.INTERACTIVE)))
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(run()) == ["interactive", "normal", "background"]
+
+
+def test_waiting_too_long_raises_and_is_counted():
+    async def run():
+        limiter = RateLimiter(rate=1, burst=1, max_wait={**WAITS, Priority.BACKGROUND: 0.05})
+        await limiter.acquire(Priority.NORMAL)
+        with pytest.raises(QueueTimeout):
+            await limiter.acquire(Priority.BACKGROUND)
+        return limiter.stats()
+
+    stats = asyncio.run(run())
+    assert stats["timeouts"] == 1
+    assert stats["waiting_background"] == 0
+
+
+def test_pause_empties_the_bucket():
+    async def run():
+        limiter = RateLimiter(rate=100, burst=5, max_wait=WAITS)
+        limiter.pause(0.1)
+        assert not limiter.try_acquire()
+        start = time.monotonic()
+        await limiter.acquire(Priority.INTERACTIVE)
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.09
+
+
+def test_zero_rate_disables_limiting():
+    async def run():
+        limiter = RateLimiter(rate=0, burst=1, max_wait=WAITS)
+        for _ in range(100):
+            await limiter.acquire(Priority.BACKGROUND)
+        return limiter.try_acquire()
+
+    assert asyncio.run(run())
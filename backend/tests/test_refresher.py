@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from app.services import refresher as refresher_module
+from app.services.refresher import FeedRefresher, FeedUnavailable
+
+
+class Upstream:
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    async def fetch(self):
+        self.calls += 1
+        outcome = self.outcomes[min(self.calls, len(self.outcomes)) - 1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(refresher_module.time, "time", lambda: now[0])
+    return now
+
+
+def registered(upstream, max_age=60, on_refresh=None):
+    feeds = FeedRefresher(max_age=max_age, on_refresh=on_refresh)
+    feeds.register("alerts", upstream.fetch, lambda raw: raw, interval=30)
+    return feeds, feeds._feeds["alerts"]
+
+
+def test_stale_snapshot_is_served_on_failure_until_max_age(clock):
+    data = ["alert"]
+    feeds, feed = registered(Upstream(data, RuntimeError("upstream down")))
+
+    async def run():
+        await feeds.refresh(feed)
+        await feeds.refresh(feed)
+        clock[0] += 60
+        served = await feeds.get("alerts")
+        clock[0] += 1
+        with pytest.raises(FeedUnavailable, match="61s old: upstream down"):
+            await feeds.get("alerts")
+        return served
+
+    served = asyncio.run(run())
+    assert served.data is data
+    assert feed.last_error == "upstream down"
+
+
+def test_unchanged_data_keeps_its_version(clock):
+    same, changed = ["alert"], ["alert", "another"]
+    refreshed = []
+    feeds, feed = registered(Upstream(same, same, changed), on_refresh=lambda feed: refreshed.append(feed.snapshot.version))
+
+    async def run():
+        for _ in range(3):
+            await feeds.refresh(feed)
+
+    asyncio.run(run())
+    assert refreshed == [1, 1, 2]
+    assert feeds.status()["alerts"] == {"age": 0.0, "version": 2, "last_error": None}
+
+
+def test_readers_wait_only_for_the_first_load_and_never_fetch():
+    upstream = Upstream(["alert"])
+    feeds, _ = registered(upstream)
+
+    async def run():
+        await feeds.start()
+        snapshots = await asyncio.gather(*(feeds.get("alerts") for _ in range(20)))
+        await feeds.stop()
+        return snapshots
+
+    snapshots = asyncio.run(run())
+    assert all(snapshot is snapshots[0] for snapshot in snapshots)
+    assert upstream.calls == 1
+
+
+def test_failed_first_load_is_unavailable():
+    feeds, _ = registered(Upstream(RuntimeError("timeout")))
+
+    async def run():
+        await feeds.start()
+        try:
+            with pytest.raises(FeedUnavailable, match="alerts feed unavailable: timeout"):
+                await feeds.get("alerts")
+        finally:
+            await feeds.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,85 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import FastAPI, Response
+from app import responses
+from app.responses import ConditionalMiddleware, etag_matches, memoized, respond
+
+SNAPSHOT = [{"code": "UN", "name": "Union Station"}]
+
+
+def build_app():
+    app = FastAPI()
+    app.add_middleware(ConditionalMiddleware)
+
+    @app.get("/memoized")
+    def get_memoized(response: Response):
+        response.headers["Age"] = "7"
+        return respond(memoized(SNAPSHOT), response)
+
+    @app.get("/per-request")
+    def get_per_request():
+        return respond([{"code": "UN", "name": "Union Station"}])
+
+    return app
+
+
+async def get(app, path, etag=None):
+    headers = {"If-None-Match": etag} if etag else {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        return await http.get(path, headers=headers)
+
+
+@pytest.fixture(params=[False, True], ids=["default", "fast"])
+def app(request, monkeypatch):
+    monkeypatch.setattr(responses, "FAST_RESPONSES", request.param)
+    return build_app()
+
+
+def test_memoized_content_is_rendered_once_and_answers_304(app):
+    first = asyncio.run(get(app, "/memoized"))
+    assert first.status_code == 200
+    assert first.json() == SNAPSHOT
+    etag = first.headers["etag"]
+    assert responses._rendered[id(SNAPSHOT)][2] == etag
+
+    not_modified = asyncio.run(get(app, "/memoized", etag))
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["age"] == "7"
+
+
+def test_per_request_content_is_hashed_by_the_middleware_and_not_held(app):
+    memoized_etag = asyncio.run(get(app, "/memoized")).headers["etag"]
+    held = (len(responses._memoized), len(responses._rendered))
+    first = asyncio.run(get(app, "/per-request"))
+    assert first.status_code == 200
+    # Same data in a new object: the middleware hashes FastAPI's body to the same ETag
+    assert first.headers["etag"] == memoized_etag
+    assert asyncio.run(get(app, "/per-request", first.headers["etag"])).status_code == 304
+    assert (len(responses._memoized), len(responses._rendered)) == held
+
+
+def test_memoized_registry_is_bounded(monkeypatch):
+    monkeypatch.setattr(responses, "_MEMOIZED_MAX_ENTRIES", 2)
+    monkeypatch.setattr(responses, "_memoized", responses.OrderedDict())
+    first, second, third = [1], [2], [3]
+    memoized(first)
+    memoized(second)
+    memoized(first)
+    memoized(third)
+    assert list(responses._memoized.values()) == [first, third]
+
+
+def test_respond_outside_a_conditional_request_returns_content(monkeypatch):
+    monkeypatch.setattr(responses, "FAST_RESPONSES", False)
+    assert respond(SNAPSHOT) is SNAPSHOT
+
+
+def test_etag_matching():
+    assert etag_matches('W/"abc"', 'W/"abc"')
+    assert etag_matches('"abc"', 'W/"abc"')
+    assert etag_matches('"x", W/"abc"', 'W/"abc"')
+    assert etag_matches("*", 'W/"abc"')
+    assert not etag_matches(None, 'W/"abc"')
+    assert not etag_matches('W/"abd"', 'W/"abc"')
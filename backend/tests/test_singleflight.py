@@ -0,0 +1,83 @@
+import asyncio
+import httpx
+from app.clients.cache import ResponseCache
+from app.clients.metrolinx import MetrolinxClient
+from app.clients.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": 1}
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(10)))
+        return flight, results
+
+    flight, results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert (flight.calls, flight.coalesced, flight.in_flight()) == (1, 9, 0)
+
+
+def test_failure_is_shared_and_releases_the_key():
+    attempts = []
+
+    async def fetch():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise RuntimeError("upstream down")
+        return "ok"
+
+    async def run():
+        flight = SingleFlight()
+        first = await asyncio.gather(flight.do("key", fetch), flight.do("key", fetch), return_exceptions=True)
+        return first, await flight.do("key", fetch)
+
+    first, retry = asyncio.run(run())
+    assert [str(outcome) for outcome in first] == ["upstream down", "upstream down"]
+    assert retry == "ok"
+    assert len(attempts) == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    async def run():
+        flight = SingleFlight()
+        impatient = asyncio.ensure_future(flight.do("key", fetch))
+        patient = asyncio.ensure_future(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        impatient.cancel()
+        return await patient, impatient
+
+    result, impatient = asyncio.run(run())
+    assert result == "ok"
+    assert impatient.cancelled()
+
+
+def test_client_coalesces_identical_upstream_requests():
+    requests = []
+
+    async def handle(request):
+        requests.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"NextService": {"Lines": []}})
+
+    async def calls():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handle), base_url="http://upstream") as http:
+            # A zero-byte cache keeps the response cache from answering the callers instead
+            client = MetrolinxClient(http=http, cache=ResponseCache(0))
+            await client.start()
+            await asyncio.gather(*(client.get_stop_next_service("UN") for _ in range(5)), client.get_stop_next_service("EX"))
+            await client.close()
+
+    asyncio.run(calls())
+    assert sorted(request.url.path for request in requests) == ["/Stop/NextService/EX", "/Stop/NextService/UN"]
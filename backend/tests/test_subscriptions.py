@@ -0,0 +1,86 @@
+import asyncio
+import json
+import pytest
+from pydantic import BaseModel
+from app.services.subscriptions import KEEPALIVE, SubscriptionHub, Topic, TooManyTopics
+
+
+class Departure(BaseModel):
+    trip_number: str
+    platform: str
+
+
+def departures(*pairs):
+    return [Departure(trip_number=trip, platform=platform) for trip, platform in pairs]
+
+
+def parse(event: bytes):
+    fields = dict(line.split(": ", 1) for line in event.decode().strip().split("\n"))
+    return fields["event"], int(fields["id"]), json.loads(fields["data"])
+
+
+def topic(queue_size=10):
+    return Topic("union", None, lambda departure: departure.trip_number, interval=1, queue_size=queue_size, on_idle=lambda topic: None)
+
+
+def test_subscribers_get_a_snapshot_then_diffs():
+    union = topic()
+    queue = union.subscribe()
+    first = departures(("101", "5"), ("102", "6"))
+    union.update(first)
+    union.update(first)
+    union.update(departures(("101", "5"), ("102", "6")))
+    union.update(departures(("101", "7"), ("103", "8")))
+
+    events = [parse(queue.get_nowait()) for _ in range(queue.qsize())]
+    assert events == [
+        ("snapshot", 1, {"entries": {"101": {"trip_number": "101", "platform": "5"}, "102": {"trip_number": "102", "platform": "6"}}}),
+        ("diff", 2, {"changed": {"101": {"trip_number": "101", "platform": "7"}, "103": {"trip_number": "103", "platform": "8"}},
+                     "removed": ["102"]}),
+    ]
+
+
+def test_late_subscriber_starts_from_the_latest_snapshot():
+    union = topic()
+    union.update(departures(("101", "5")))
+    union.update(departures(("101", "6")))
+    kind, version, data = parse(union.subscribe().get_nowait())
+    assert (kind, version) == ("snapshot", 2)
+    assert data["entries"]["101"]["platform"] == "6"
+
+
+def test_slow_subscriber_is_resynced_from_the_snapshot():
+    union = topic(queue_size=2)
+    queue = union.subscribe()
+    for platform in "1234":
+        union.update(departures(("101", platform)))
+    events = [parse(queue.get_nowait()) for _ in range(queue.qsize())]
+    assert [(kind, version) for kind, version, _ in events] == [("snapshot", 3), ("diff", 4)]
+
+
+class Feeds:
+    def __init__(self, *snapshots):
+        self.snapshots = list(snapshots)
+
+    async def get(self, name):
+        data = self.snapshots.pop(0) if len(self.snapshots) > 1 else self.snapshots[0]
+        return type("Snapshot", (), {"data": data})
+
+
+def test_hub_streams_union_departures_and_stops_with_the_last_subscriber():
+    hub = SubscriptionHub(None, Feeds(departures(("101", "5")), departures(("101", "6"))), interval=0.01, heartbeat=0.05, queue_size=10, max_topics=1)
+
+    async def run():
+        stream = hub.union_departures()
+        events = [await stream.__anext__() for _ in range(3)]
+        with pytest.raises(TooManyTopics):
+            hub.next_service("UN")
+        running = hub.status()
+        await stream.aclose()
+        return events, running, hub.status()
+
+    events, running, after = asyncio.run(run())
+    assert [parse(event)[:2] for event in events[:2]] == [("snapshot", 1), ("diff", 2)]
+    assert events[2] == KEEPALIVE
+    assert running == {"union_departures": 1}
+    assert after == {}
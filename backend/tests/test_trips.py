@@ -0,0 +1,69 @@
+import random
+from app.services.trips import TripTable
+
+THRESHOLD = 300
+
+
+def raw_trip(number, line, delay, **extra):
+    return {"TripNumber": number, "LineCode": line, "DelaySeconds": delay, **extra}
+
+
+def test_apply_counts_only_changes():
+    table = TripTable(THRESHOLD)
+    assert table.apply("train", {"1": raw_trip("1", "LW", 0), "2": raw_trip("2", "LE", 600)}) == 2
+    version = table.version
+    assert table.apply("train", {"1": raw_trip("1", "LW", 0), "2": raw_trip("2", "LE", 600)}) == 0
+    assert table.version == version
+    assert table.apply("train", {"1": raw_trip("1", "LW", 420)}) == 2
+    assert table.version == version + 1
+
+
+def test_line_totals_follow_changes():
+    table = TripTable(THRESHOLD)
+    table.apply("train", {"1": raw_trip("1", "LW", 0), "2": raw_trip("2", "LW", 600)})
+    status = table.line_status("lw")
+    assert (status.active_trips, status.delayed_trips, status.max_delay_seconds) == (2, 1, 600)
+    table.apply("train", {"1": raw_trip("1", "LW", 900)})
+    status = table.line_status("LW")
+    assert (status.active_trips, status.delayed_trips, status.average_delay_seconds) == (1, 1, 900.0)
+    table.apply("train", {})
+    assert table.line_status("LW") is None
+    assert table.status().active_trips == 0
+
+
+def test_modes_are_independent():
+    table = TripTable(THRESHOLD)
+    table.apply("train", {"1": raw_trip("1", "LW", 0)})
+    table.apply("bus", {"1": raw_trip("1", "21", 0)})
+    table.apply("train", {})
+    assert table.all().count == 1
+    assert table.trip("1").mode == "bus"
+
+
+def test_responses_are_memoized_per_version():
+    table = TripTable(THRESHOLD)
+    table.apply("train", {"1": raw_trip("1", "LW", 0)})
+    assert table.status() is table.status()
+    assert table.line("LW") is table.line("lw")
+    before = table.status()
+    table.apply("train", {"1": raw_trip("1", "LW", 0)})
+    assert table.status() is before
+    table.apply("train", {"1": raw_trip("1", "LW", 60)})
+    assert table.status() is not before
+
+
+def test_incremental_apply_matches_rebuild():
+    rng = random.Random(11)
+    table = TripTable(THRESHOLD)
+    for _ in range(50):
+        polls = {}
+        for mode, lines in (("train", ["LW", "LE", "KI"]), ("bus", ["21", "40"])):
+            polls[mode] = {
+                str(number): raw_trip(str(number), rng.choice(lines), rng.choice([0, 120, 300, 900]))
+                for number in rng.sample(range(40), rng.randint(0, 25))
+            }
+            table.apply(mode, polls[mode])
+        fresh = TripTable(THRESHOLD)
+        for mode, trips in polls.items():
+            fresh.apply(mode, trips)
+        assert table.status() == fresh.status()